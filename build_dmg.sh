@@ -86,6 +86,7 @@ pyinstaller --noconfirm --name "$APP_NAME" --windowed --contents-directory "." \
     --hidden-import="PyQt6.QtGui" \
     --collect-all="openai_whisper" \
     --collect-all="ui" \
+    --collect-all="core" \
     --runtime-hook="qt_runtime_hook.py" \
     --osx-bundle-identifier "com.lishuai.$APP_NAME" \
     main.py
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+AUDIO_CACHE_DIR = os.path.expanduser("~/.cache/macwhisper/audio")
+SAMPLE_RATE = 16000  # What Whisper resamples everything to
+
+# Disk budget for decoded audio (16 kHz s16le mono is ~115 MB per hour)
+DEFAULT_BUDGET_MB = 2048
+
+
+class AudioCache:
+    """Decoded 16 kHz mono PCM, kept on disk and reused across transcription runs.
+
+    Files are keyed by (absolute path, size, mtime), so an edited or replaced
+    input is decoded again. Audio is stored as raw s16le and memory-mapped on
+    load; the least recently used files are deleted beyond the budget,
+    except those a caller holds through lease().
+    """
+
+    def __init__(self, directory=AUDIO_CACHE_DIR, budget_mb=DEFAULT_BUDGET_MB):
+        self.directory = directory
+        self.budget_bytes = int(budget_mb) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._decode_locks = {}  # key -> Lock, so one file is never decoded twice at once
+        self._pins = {}  # PCM path -> number of leases; evict() leaves these alone
+        self.hits = 0
+        self.misses = 0
+        self.decode_seconds = 0.0
+
+    def set_budget(self, budget_mb):
+        with self._lock:
+            self.budget_bytes = int(budget_mb) * 1024 * 1024
+        self.evict()
+
+    @staticmethod
+    def key_for(file_path):
+        st = os.stat(file_path)
+        raw = f"{os.path.abspath(file_path)}\x1f{st.st_size}\x1f{st.st_mtime_ns}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+    def pcm_path_for(self, file_path):
+        return os.path.join(self.directory, self.key_for(file_path) + ".s16le")
+
+    def load(self, file_path, log=None):
+        """Return the audio as a float32 NumPy array, as whisper.load_audio would."""
+        import numpy as np
+
+        with self.lease(file_path, log) as pcm_path:
+            if os.path.getsize(pcm_path) == 0:
+                return np.zeros(0, dtype=np.float32)
+            samples = np.memmap(pcm_path, dtype=np.int16, mode='r')
+            # Same scaling as whisper.load_audio, so results match decoding from the container
+            return samples.astype(np.float32) / 32768.0
+
+    @contextmanager
+    def lease(self, file_path, log=None):
+        """The cached PCM path for `file_path`, safe from eviction until the block exits."""
+        pcm_path = self.pcm_path_for(file_path)
+        with self._lock:
+            self._pins[pcm_path] = self._pins.get(pcm_path, 0) + 1
+        try:
+            yield self.pcm_file(file_path, log)
+        finally:
+            with self._lock:
+                if self._pins[pcm_path] > 1:
+                    self._pins[pcm_path] -= 1
+                else:
+                    del self._pins[pcm_path]
+
+    def pcm_file(self, file_path, log=None):
+        """Path of the cached PCM for `file_path`, decoding it first on a miss.
+
+        Nothing stops a later evict() from deleting the file; use lease() to
+        hold on to it while it is being read.
+        """
+        key = self.key_for(file_path)
+        pcm_path = os.path.join(self.directory, key + ".s16le")
+        with self._lock:
+            decode_lock = self._decode_locks.setdefault(key, threading.Lock())
+
+        with decode_lock:
+            if os.path.exists(pcm_path):
+                os.utime(pcm_path)  # Most recently used
+                with self._lock:
+                    self.hits += 1
+                if log: log(f"Using cached audio for {os.path.basename(file_path)}.")
+                return pcm_path
+
+            if log: log(f"Decoding audio for {os.path.basename(file_path)}...")
+            os.makedirs(self.directory, exist_ok=True)
+            partial = pcm_path + f".{os.getpid()}.partial"
+            start = time.time()
+            try:
+                result = subprocess.run(
+                    ["ffmpeg", "-nostdin", "-y", "-loglevel", "error", "-threads", "0", "-i", file_path,
+                     "-vn", "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), partial],
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+                )
+                if result.returncode != 0:
+                    raise RuntimeError(f"Failed to load audio: {result.stderr.strip()}")
+                os.replace(partial, pcm_path)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+            elapsed = time.time() - start
+
+            with self._lock:
+                self.misses += 1
+                self.decode_seconds += elapsed
+            if log: log(f"Decoded in {elapsed:.1f}s ({os.path.getsize(pcm_path) / 1024 / 1024:.0f} MB cached).")
+
+        self.evict(keep=pcm_path)
+        return pcm_path
+
+    def evict(self, keep=None):
+        """Delete least recently used files until the cache fits the budget."""
+        with self._lock:
+            budget = self.budget_bytes
+            try:
+                entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                           if name.endswith(".s16le")]
+            except OSError:
+                return 0
+            files = []
+            for path in entries:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # Removed by another process
+                files.append((st.st_mtime, st.st_size, path))
+            files.sort()
+            used = sum(size for _, size, _ in files)
+            removed = 0
+            for _, size, path in files:
+                if used <= budget:
+                    break
+                if path == keep or path in self._pins:
+                    continue  # Just decoded for the current job, or still being read
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                used -= size
+                removed += 1
+            return removed
+
+    def clear(self):
+        with self._lock:
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                if name.endswith(".s16le"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def usage_bytes(self):
+        try:
+            return sum(os.path.getsize(os.path.join(self.directory, name))
+                       for name in os.listdir(self.directory) if name.endswith(".s16le"))
+        except OSError:
+            return 0
+
+    def stats_line(self):
+        with self._lock:
+            hits, misses, decode_seconds, budget = self.hits, self.misses, self.decode_seconds, self.budget_bytes
+        return (f"Audio cache: {hits} hits / {misses} misses, {decode_seconds:.1f}s spent decoding, "
+                f"{self.usage_bytes() / 1024 / 1024:.0f}/{budget / 1024 / 1024:.0f} MB used")
+
+
+AUDIO_CACHE = AudioCache()
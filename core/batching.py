@@ -0,0 +1,84 @@
+import threading
+import unicodedata
+
+# (context window, max output tokens) by model-name prefix; longest prefix wins
+MODEL_LIMITS = {
+    "gpt-3.5-turbo": (16385, 4096),
+    "gpt-4o": (128000, 16384),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4.1": (1000000, 32768),
+    "gpt-4": (8192, 4096),
+    "deepseek-chat": (64000, 8192),
+    "deepseek-coder": (64000, 8192),
+    "llama2": (4096, 2048),
+    "mistral": (32000, 4096),
+    "mixtral": (32000, 4096),
+}
+DEFAULT_LIMITS = (8192, 4096)
+
+# JSON id, quotes and separators around each cue
+CUE_OVERHEAD_TOKENS = 8
+
+
+def model_limits(model):
+    model = (model or "").lower()
+    best = None
+    for prefix in MODEL_LIMITS:
+        if model.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return MODEL_LIMITS[best] if best else DEFAULT_LIMITS
+
+
+def estimate_tokens(text):
+    """Cheap token estimate: ~1 token per CJK/kana/hangul char, ~4 chars per token otherwise."""
+    wide = sum(1 for ch in text if unicodedata.east_asian_width(ch) in ("W", "F"))
+    return wide + (len(text) - wide + 3) // 4
+
+
+class AdaptiveBatcher:
+    """Packs cues into batches by estimated tokens and adapts the batch size.
+
+    Batches never exceed `max_cues` (the per-service setting) or the token
+    budget derived from the model's context/output limits. The cue limit grows
+    by one after each clean reply and halves when a reply is truncated or the
+    request times out (relative to the size of the batch that failed).
+    """
+
+    def __init__(self, model, max_cues, prompt_tokens=0, start_cues=10):
+        context, max_output = model_limits(model)
+        # The reply is about as long as the request (longer for some scripts), so
+        # leave room for it in the context and stay well under the output cap.
+        self.token_budget = max(256, int(min((context - prompt_tokens) / 2, max_output) * 0.6))
+        self.max_cues = max(1, int(max_cues))
+        self.cue_limit = max(1, min(self.max_cues, start_cues))
+        self._lock = threading.Lock()
+
+    def next_batch(self, queue):
+        """Pop the next batch of (block index, text) cues from a deque, or return None."""
+        with self._lock:
+            limit = self.cue_limit
+        batch = []
+        tokens = 0
+        while queue and len(batch) < limit:
+            cost = estimate_tokens(queue[0][1]) + CUE_OVERHEAD_TOKENS
+            if batch and tokens + cost > self.token_budget:
+                break
+            batch.append(queue.popleft())
+            tokens += cost
+        return batch or None
+
+    def grow(self):
+        with self._lock:
+            if self.cue_limit < self.max_cues:
+                self.cue_limit += 1
+                return self.cue_limit
+        return None
+
+    def shrink(self, failed_size):
+        # Halve relative to the batch that failed, so several in-flight failures
+        # of the same size don't compound into repeated halving
+        with self._lock:
+            new_limit = max(1, min(self.cue_limit, failed_size // 2))
+            changed = new_limit != self.cue_limit
+            self.cue_limit = new_limit
+            return new_limit if changed else None
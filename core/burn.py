@@ -0,0 +1,515 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from core.media import probe_duration, probe_audio_codec, probe_video_size
+from core.encoders import (select_encoder, encoder_settings, is_hardware, probe_capabilities,
+                           container_tag_args, FALLBACK_ENCODER, DEFAULT_PRESET)
+
+# Audio codecs each output container can carry as-is; anything else is transcoded to AAC
+COPYABLE_AUDIO = {
+    ".mp4": {"aac", "mp3", "alac", "ac3", "eac3"},
+    ".m4v": {"aac", "mp3", "alac", "ac3", "eac3"},
+    ".mov": {"aac", "mp3", "alac", "ac3", "eac3", "pcm_s16le", "pcm_s24le", "pcm_f32le"},
+    ".avi": {"mp3", "ac3", "pcm_s16le"},
+    ".mkv": None, # Matroska takes anything
+}
+
+
+def ass_color(hex_color):
+    # "#RRGGBB" -> FFmpeg/ASS format: &HBBGGRR&
+    hex_color = hex_color.lstrip('#')
+    r, g, b = hex_color[0:2], hex_color[2:4], hex_color[4:6]
+    return f"&H{b}{g}{r}&".upper()
+
+
+def build_style(config):
+    # Escape font name
+    font_family = config.get('font_family', 'Arial')
+    font_family_safe = font_family.replace(":", "\\:").replace("'", "")
+
+    return (f"FontName={font_family_safe},FontSize={config.get('font_size', 24)},"
+            f"PrimaryColour={ass_color(config.get('font_color', '#FFFFFF'))},"
+            f"Alignment={config.get('alignment', 2)},MarginV={config.get('margin_v', 10)},"
+            f"Outline={config.get('outline', 1)},Shadow={config.get('shadow', 1)}")
+
+
+def subtitles_filter(subtitle_path, style):
+    # Escape paths
+    srt_path_escaped = subtitle_path.replace(":", "\\:").replace("'", "'\\''")
+    return f"subtitles='{srt_path_escaped}':force_style='{style}'"
+
+
+def render_preview(video_path, subtitle_path, config, at_seconds, image_path, timeout=30):
+    """Render the single frame at `at_seconds` with the burn style applied, as an image file.
+
+    Input seeking (-ss before -i) jumps straight to the nearest keyframe, and
+    -copyts keeps the original timestamps so the subtitles filter shows the
+    cue that is on screen at that moment.
+    """
+    vf_string = subtitles_filter(subtitle_path, build_style(config))
+    cmd = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-ss", f"{max(0.0, at_seconds):.3f}", "-copyts", "-i", video_path,
+        "-map", "0:v:0", "-an", "-sn",
+        "-vf", vf_string,
+        "-frames:v", "1",
+        image_path
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+    if result.returncode != 0 or not os.path.exists(image_path):
+        raise RuntimeError(result.stderr.strip() or f"FFmpeg finished with error code {result.returncode}")
+    return image_path
+
+
+def probe_keyframes(file_name):
+    """Return the video keyframe timestamps in seconds (reads packet headers, no decoding)."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", file_name],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+    except FileNotFoundError:
+        return []
+    times = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(',')
+        if 'K' in flags:
+            try:
+                times.append(float(pts))
+            except ValueError:
+                pass  # N/A pts
+    return sorted(times)
+
+
+def plan_segments(keyframes, duration, count):
+    """Split [0, duration) into up to `count` (start, length) pieces that begin on keyframes."""
+    cuts = [0.0]
+    for i in range(1, count):
+        target = duration * i / count
+        # First keyframe at or after the even split point
+        cut = next((k for k in keyframes if k >= target), None)
+        if cut is None or cut >= duration:
+            break
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    bounds = cuts + [duration]
+    return [(start, end - start) for start, end in zip(bounds, bounds[1:])]
+
+
+def concat_list_entry(path):
+    # concat demuxer quoting: ' -> '\''
+    return "file '" + path.replace("'", "'\\''") + "'\n"
+
+
+def audio_codec_args(codec, output_path):
+    """Return (ffmpeg audio args, log note) for a source audio codec and output file."""
+    if codec is None:
+        return ["-an"], "No audio stream in source"
+    ext = os.path.splitext(output_path)[1].lower()
+    allowed = COPYABLE_AUDIO.get(ext, set())
+    if allowed is None or codec in allowed:
+        return ["-c:a", "copy"], f"Audio: copying {codec} stream (no re-encode)"
+    return ["-c:a", "aac", "-b:a", "192k"], f"Audio: {codec} can't go into {ext or 'this container'} as-is, transcoding to AAC"
+
+
+def partial_path_for(output_path):
+    # Hidden sibling with the same extension (ffmpeg picks the muxer from it); being in
+    # the same directory keeps the final rename on one filesystem, hence atomic
+    folder, name = os.path.split(os.path.abspath(output_path))
+    stem, ext = os.path.splitext(name)
+    return os.path.join(folder, f".{stem}.partial{ext}")
+
+
+def parse_speed(value):
+    # "1.23x" -> 1.23; "N/A" or garbage -> 0.0
+    try:
+        return float(value.strip().rstrip('x'))
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+class FFmpegJob:
+    """Runs ffmpeg processes that can be stopped from another thread.
+
+    Progress comes from ffmpeg's machine-readable `-progress` stream and is
+    reported as `progress(percent, fps=, speed=, eta=, out_seconds=, duration=)`;
+    percent is -1 when the input duration is unknown.
+    """
+
+    def __init__(self, output_path, log=None, progress=None):
+        self.output_path = output_path
+        # ffmpeg writes here; renamed to output_path only once the job succeeds
+        self.write_path = partial_path_for(output_path)
+        self.log = log or (lambda msg: None)
+        self.progress = progress or (lambda pct, **stats: None)
+        self.is_running = True
+        self.processes = []
+        self._lock = threading.Lock()
+
+    def run_staged(self, job):
+        """Run `job()` (returns True/False like run()) and move the finished file into place."""
+        try:
+            ok = job()
+        except BaseException:
+            self.discard_partial()
+            raise
+        if ok:
+            os.replace(self.write_path, self.output_path)
+        else:
+            self.discard_partial()
+        return ok
+
+    def discard_partial(self):
+        try:
+            os.remove(self.write_path)
+        except OSError:
+            pass
+
+    def run_ffmpeg(self, cmd, on_block=None):
+        """Run one ffmpeg process, feeding each -progress block to `on_block(block, final)`.
+
+        Returns True on success, False if stopped; raises RuntimeError on failure.
+        """
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        with self._lock:
+            self.processes.append(process)
+            if not self.is_running:
+                process.terminate() # Stopped while we were starting
+
+        # Drain stderr on the side so a chatty ffmpeg can't block on a full pipe;
+        # keep the tail for the error message
+        stderr_tail = deque(maxlen=20)
+        def drain():
+            for line in process.stderr:
+                stderr_tail.append(line.rstrip())
+        drain_thread = threading.Thread(target=drain, daemon=True)
+        drain_thread.start()
+
+        block = {}
+        try:
+            for line in process.stdout:
+                if not self.is_running:
+                    # Kill gracefully then forceful
+                    process.terminate()
+                    try:
+                        process.wait(timeout=1)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                    return False
+
+                key, _, value = line.strip().partition('=')
+                if key != "progress":
+                    block[key] = value
+                    continue
+                # "progress=continue|end" closes a block
+                if on_block is not None:
+                    on_block(block, value == "end")
+                block = {}
+
+            ret_code = process.wait()
+            drain_thread.join(timeout=1)
+        finally:
+            with self._lock:
+                self.processes.remove(process)
+
+        if ret_code == 0:
+            return True
+        if ret_code in (-15, -9) or not self.is_running: # SIGTERM/SIGKILL (user stop)
+            return False
+        detail = "\n".join(stderr_tail)
+        raise RuntimeError(f"FFmpeg finished with error code {ret_code}" + (f":\n{detail}" if detail else ""))
+
+    def report(self, out_seconds, duration, fps, speed, started, final=False):
+        elapsed = time.monotonic() - started
+        if not speed and out_seconds and elapsed:
+            speed = out_seconds / elapsed
+        if duration > 0:
+            percent = 100 if final else min(99, int(out_seconds / duration * 100))
+            eta = (duration - out_seconds) / speed if speed else None
+        else:
+            percent, eta = -1, None
+        self.progress(percent, fps=round(fps, 1), speed=round(speed, 2),
+                      eta=None if eta is None else round(eta, 1),
+                      out_seconds=round(out_seconds, 2), duration=duration)
+
+    @staticmethod
+    def block_stats(block):
+        # (output seconds, fps, speed) from one -progress block; "N/A" before the first frame
+        try:
+            out_seconds = int(block.get("out_time_us", 0)) / 1_000_000
+        except ValueError:
+            out_seconds = 0.0
+        try:
+            fps = float(block.get("fps", 0))
+        except ValueError:
+            fps = 0.0
+        return out_seconds, fps, parse_speed(block.get("speed"))
+
+    def stop(self):
+        self.is_running = False
+        # If waiting on IO, we might need to kill from here too if thread is blocked
+        self.kill_processes()
+
+    def kill_processes(self):
+        with self._lock:
+            for process in self.processes:
+                if process.poll() is None:
+                    process.terminate()
+
+
+class SubtitleBurner(FFmpegJob):
+    """Burns a subtitle file into a video with ffmpeg's subtitles filter.
+
+    `config` holds the style params (font_family, font_size, font_color as
+    "#RRGGBB", alignment, margin_v, outline, shadow) and optionally
+    `segments`: when > 1 the video is split at keyframes and the pieces are
+    encoded by that many ffmpeg processes at once, then joined with the
+    concat demuxer (no second encode). Audio is taken from the source in the
+    join step so segment boundaries can't click.
+
+    `encoder` ("auto" or a name from core.encoders.ENCODERS) and
+    `encoder_preset` (fast/balanced/quality) pick the video encoder; if a
+    hardware encoder fails the job is redone once with x264.
+
+    With `overlay` set, the subtitles are rendered once to cached transparent
+    images (core.overlay) and composited only while a cue is on screen,
+    instead of running libass on every frame. Single-pass encodes only.
+    """
+
+    def __init__(self, video_path, subtitle_path, output_path, config, log=None, progress=None):
+        super().__init__(output_path, log, progress)
+        self.video_path = video_path
+        self.subtitle_path = subtitle_path
+        self.config = config
+        self._audio_args = None
+        self.encoder = None
+        self.overlays = None
+
+    def select_encoder(self):
+        caps = probe_capabilities()
+        if caps["filters"] and "subtitles" not in caps["filters"]:
+            raise RuntimeError("This ffmpeg build has no 'subtitles' filter (it needs to be built with libass).")
+        self.encoder, note = select_encoder(self.config.get('encoder', 'auto'),
+                                            self.config.get('encoder_preset', DEFAULT_PRESET), caps)
+        self.log(note)
+
+    def video_args(self, vf_string):
+        # -vf / -c:v / pix_fmt for the chosen encoder; hardware encoders may need an upload step
+        if self.encoder['upload']:
+            vf_string += "," + self.encoder['upload']
+        return ["-vf", vf_string] + self.encoder_args()
+
+    def encoder_args(self):
+        args = ["-c:v", self.encoder['name']] + self.encoder['args']
+        if self.encoder['pix_fmt']:
+            args += ["-pix_fmt", self.encoder['pix_fmt']] # Essential for compatibility
+        return args
+
+    def prepare_overlays(self):
+        from core.overlay import prepare_overlays
+
+        size = probe_video_size(self.video_path)
+        if size is None:
+            self.log("Could not read the video size; using the subtitles filter.")
+            return
+        try:
+            self.overlays = prepare_overlays(self, self.subtitle_path, build_style(self.config), size)
+        except (RuntimeError, OSError) as e:
+            if not self.is_running:
+                raise
+            # e.g. an older ffmpeg without subtitles=alpha or -fps_mode
+            self.log(f"Could not pre-render subtitles ({str(e).splitlines()[-1]}); using the subtitles filter.")
+            self.overlays = None
+
+    def audio_args(self):
+        # Probed once per job
+        if self._audio_args is None:
+            self._audio_args, note = audio_codec_args(probe_audio_codec(self.video_path), self.output_path)
+            self.log(note)
+        return self._audio_args
+
+    def build_command(self):
+        style = build_style(self.config)
+        vf_string = subtitles_filter(self.subtitle_path, style)
+
+        self.log(f"Using Font: {self.config.get('font_family', 'Arial')}")
+        self.log(f"Font Size: {self.config.get('font_size', 24)}")
+        self.log(f"Style Config: {style}")
+
+        cmd = [
+            "ffmpeg",
+            "-y", # Overwrite output
+            "-nostats", "-loglevel", "error", # Human-readable noise off...
+            "-progress", "pipe:1", # ...key=value progress blocks on stdout instead
+        ] + self.encoder['input'] + [
+            "-i", self.video_path,
+        ]
+        if self.overlays is not None:
+            upload = "," + self.encoder['upload'] if self.encoder['upload'] else ""
+            cmd += ["-f", "concat", "-safe", "0", "-i", self.overlays.sprite_list,
+                    "-filter_complex", self.overlays.filter_graph(upload),
+                    "-map", "[v]", "-map", "0:a:0?"] + self.encoder_args()
+        else:
+            cmd += ["-map", "0:v:0", "-map", "0:a:0?"] + self.video_args(vf_string) # The audio stream we probed
+        return cmd + self.tag_args() + self.audio_args() + [
+            self.write_path
+        ]
+
+    def tag_args(self):
+        # Only on the final file: segment pieces are .mkv, which rejects the hvc1 tag
+        return container_tag_args(self.encoder['name'], self.output_path)
+
+    def build_segment_command(self, start, length, segment_path, threads):
+        # The subtitles filter renders by frame timestamp, so shift each piece back to
+        # its place in the original timeline for the filter and rebase it afterwards
+        style = build_style(self.config)
+        vf_string = (f"setpts=PTS+{start:.6f}/TB,{subtitles_filter(self.subtitle_path, style)},"
+                     f"setpts=PTS-STARTPTS")
+        return [
+            "ffmpeg", "-y", "-nostats", "-loglevel", "error", "-progress", "pipe:1",
+        ] + self.encoder['input'] + [
+            "-ss", f"{start:.6f}", "-i", self.video_path, # Input seek lands on the keyframe
+            "-t", f"{length:.6f}",
+            "-map", "0:v:0", "-an", "-sn", # Audio is muxed from the source when joining
+        ] + self.video_args(vf_string) + [
+            "-threads", str(threads),
+            segment_path
+        ]
+
+    def build_concat_command(self, list_path):
+        return [
+            "ffmpeg", "-y", "-nostats", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-i", self.video_path,
+            "-map", "0:v:0", "-map", "1:a:0?",
+            "-c:v", "copy",
+        ] + self.tag_args() + self.audio_args() + [
+            self.write_path
+        ]
+
+    def run(self):
+        """Return True on success, False if stopped by the user; raise on ffmpeg failure."""
+        self.log("Starting subtitle burning...")
+        duration = probe_duration(self.video_path)
+        if duration <= 0:
+            self.log("Could not determine input duration; progress will be indeterminate.")
+
+        started = time.monotonic()
+        self.select_encoder()
+        ok = self.run_staged(lambda: self.run_encode_with_fallback(duration, started))
+        if not ok:
+            self.log("Process stopped by user.")
+            return False
+        elapsed = time.monotonic() - started
+        if duration > 0 and elapsed:
+            self.log(f"Encoded {duration:.1f}s of video in {elapsed:.1f}s "
+                     f"({duration / elapsed:.2f}x realtime).")
+        return True
+
+    def run_encode_with_fallback(self, duration, started):
+        try:
+            return self.run_encode(duration, started)
+        except RuntimeError as e:
+            # Listed by `ffmpeg -encoders` doesn't mean the GPU/driver is really there
+            if not self.is_running or not is_hardware(self.encoder['name']):
+                raise
+            self.log(f"{self.encoder['label']} failed ({str(e).splitlines()[-1]}); retrying with x264.")
+            self.encoder = encoder_settings(FALLBACK_ENCODER, self.config.get('encoder_preset', DEFAULT_PRESET))
+            return self.run_encode(duration, started)
+
+    def run_encode(self, duration, started):
+        segments = int(self.config.get('segments', 1) or 1)
+        if segments > 1 and duration > 0:
+            return self.run_segmented(duration, segments, started)
+        return self.run_single(duration, started)
+
+    def run_single(self, duration, started):
+        if self.config.get('overlay') and self.overlays is None:
+            self.prepare_overlays()
+            if not self.is_running:
+                return False
+        cmd = self.build_command()
+        self.log(f"Executing: {' '.join(cmd)}")
+        done = [0.0]
+
+        def on_block(block, final):
+            out_seconds, fps, speed = self.block_stats(block)
+            done[0] = max(done[0], out_seconds)
+            self.report(done[0], duration, fps, speed, started, final)
+
+        return self.run_ffmpeg(cmd, on_block)
+
+    def run_segmented(self, duration, segments, started):
+        keyframes = probe_keyframes(self.video_path)
+        plan = plan_segments(keyframes, duration, segments)
+        if len(plan) < 2:
+            self.log("Not enough keyframes to split this video; encoding in one piece.")
+            return self.run_single(duration, started)
+
+        if self.config.get('overlay'):
+            self.log("Subtitle pre-rendering only applies to single-pass encodes; segments use the subtitles filter.")
+        cpus = os.cpu_count() or 1
+        threads = max(1, cpus // len(plan))
+        self.log(f"Splitting at keyframes into {len(plan)} segments "
+                 f"({threads} encoder threads each)...")
+        self.log(f"Style Config: {build_style(self.config)}")
+
+        work_dir = tempfile.mkdtemp(prefix=".burn_segments_", dir=os.path.dirname(os.path.abspath(self.output_path)))
+        segment_paths = [os.path.join(work_dir, f"seg{i:04d}.mkv") for i in range(len(plan))]
+        seg_done = [0.0] * len(plan)
+        seg_fps = [0.0] * len(plan)
+        stats_lock = threading.Lock()
+
+        def burn_segment(i):
+            start, length = plan[i]
+
+            def on_block(block, final):
+                out_seconds, fps, _ = self.block_stats(block)
+                with stats_lock:
+                    seg_done[i] = length if final else min(length, out_seconds)
+                    seg_fps[i] = 0.0 if final else fps
+                    total, total_fps = sum(seg_done), sum(seg_fps)
+                # Overall speed is wall-clock based; per-process speeds don't add up cleanly
+                self.report(min(total, duration), duration, total_fps, 0.0, started)
+
+            return self.run_ffmpeg(self.build_segment_command(start, length, segment_paths[i], threads), on_block)
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(plan)) as executor:
+                futures = [executor.submit(burn_segment, i) for i in range(len(plan))]
+                results = []
+                for future in as_completed(futures):
+                    try:
+                        results.append(future.result())
+                    except Exception:
+                        # One piece failed: don't leave the others running
+                        for other in futures:
+                            other.cancel()
+                        self.kill_processes()
+                        raise
+            if not all(results):
+                return False
+
+            list_path = os.path.join(work_dir, "segments.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for path in segment_paths:
+                    f.write(concat_list_entry(path))
+            self.log("Joining segments...")
+            if not self.run_ffmpeg(self.build_concat_command(list_path)):
+                return False
+            self.report(duration, duration, 0.0, 0.0, started, final=True)
+            return True
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
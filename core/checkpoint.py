@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import re
+
+CHECKPOINT_VERSION = 1
+# Used when neither the output folder nor the source folder is writable
+FALLBACK_CHECKPOINT_DIR = os.path.expanduser("~/.cache/macwhisper/checkpoints")
+
+
+def checkpoint_path_for(file_path, target_lang, output_dir=None):
+    """Journal path for translating `file_path`: in `output_dir` when given, else next to the source."""
+    slug = re.sub(r'[^\w.-]+', '_', target_lang).strip('_') or "lang"
+    name = f"{os.path.basename(file_path)}.{slug}.ckpt"
+    directory = output_dir or os.path.dirname(os.path.abspath(file_path))
+    if not os.access(directory, os.W_OK):
+        # Keyed by the full source path so same-named files from different folders don't share a journal
+        digest = hashlib.sha256(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:12]
+        os.makedirs(FALLBACK_CHECKPOINT_DIR, exist_ok=True)
+        return os.path.join(FALLBACK_CHECKPOINT_DIR, f"{digest}-{name}")
+    return os.path.join(directory, name)
+
+
+class TranslationCheckpoint:
+    """Append-only journal of finished cues for one translation job.
+
+    The first line identifies the job (source content, language, model,
+    prompt); every following line is one translated block. Each batch is
+    flushed and fsync'd so a crash loses at most the batch being written.
+    A journal whose header doesn't match the current job is discarded.
+    """
+
+    def __init__(self, path, content, target_lang, model, prompt):
+        self.path = path
+        self.header = {
+            "version": CHECKPOINT_VERSION,
+            "source_sha256": hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            "target_lang": target_lang,
+            "model": model,
+            "prompt_sha256": hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+        }
+        self._file = None
+
+    def load(self):
+        """Return {block index: translated text} from a matching journal, or {}."""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')
+        try:
+            if json.loads(lines[0]) != self.header:
+                return done
+        except (ValueError, IndexError):
+            return done
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+                done[int(entry["b"])] = entry["t"]
+            except (ValueError, KeyError, TypeError):
+                continue  # torn write from a crash
+        return done
+
+    def open(self, resume):
+        if resume and os.path.exists(self.path):
+            self._file = open(self.path, 'a', encoding='utf-8')
+            # Terminate a possibly torn last line so new entries parse cleanly
+            self._file.write('\n')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._file.write(json.dumps(self.header) + '\n')
+        self._sync()
+
+    def append(self, entries):
+        """Journal an iterable of (block index, translated text)."""
+        for block_idx, text in entries:
+            self._file.write(json.dumps({"b": block_idx, "t": text}, ensure_ascii=False) + '\n')
+        self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,324 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_CONNECTIONS = 4
+MIN_SPLIT_BYTES = 32 * 1024 * 1024  # Smaller files (or what's left of them) use a single connection
+MAX_RETRIES = 5  # Per range, reset whenever a retry makes progress
+PROGRESS_INTERVAL = 0.25  # Seconds between progress callbacks
+STATE_INTERVAL = 1.0  # Seconds between writes of the resume state
+TIMEOUT = (10, 60)  # connect, read
+
+# Standard Whisper URLs look like .../models/<sha256>/<name>.pt
+_SHA256_SEGMENT = re.compile(r"/([0-9a-fA-F]{64})/[^/]+$")
+
+
+def expected_sha256(url):
+    """The SHA-256 embedded in a model URL, or None."""
+    match = _SHA256_SEGMENT.search(url.split("?")[0].split("#")[0])
+    return match.group(1).lower() if match else None
+
+
+def part_path(target_path):
+    return target_path + ".part"
+
+
+def state_path(target_path):
+    # Byte ranges still missing from the .part file
+    return target_path + ".part.json"
+
+
+def split_ranges(start, end, count):
+    """[start, end) cut into `count` [start, end, done] ranges of about the same size."""
+    count = max(1, min(count, (end - start) // MIN_SPLIT_BYTES or 1))
+    step = (end - start) // count
+    bounds = [start + i * step for i in range(count)] + [end]
+    return [[lo, hi, 0] for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+
+class _RangeIgnored(Exception):
+    """The server answered a Range request with the whole file."""
+
+
+class ModelDownloader:
+    """Downloads a model file so that an interrupted download can pick up where it stopped.
+
+    Data goes to `<target>.part` and is renamed onto `target_path` only once
+    it is complete and, when the SHA-256 is known (given, or embedded in the
+    URL), verified. When the server honours Range requests, a later run
+    resumes from the .part file, and a large file is fetched over
+    `connections` parallel ranges; the ranges still missing are kept in
+    `<target>.part.json`. Servers without Range support get a plain download.
+
+    Progress is reported as `progress(percent, downloaded=, total=, speed=, eta=)`
+    at most every PROGRESS_INTERVAL seconds; percent is -1 when the size is unknown.
+    """
+
+    def __init__(self, url, target_path, sha256=None, connections=DEFAULT_CONNECTIONS,
+                 chunk_size=CHUNK_SIZE, log=None, progress=None):
+        self.url = url
+        self.target_path = target_path
+        self.part_path = part_path(target_path)
+        self.state_path = state_path(target_path)
+        self.sha256 = (sha256 or expected_sha256(url) or "").lower() or None
+        self.connections = max(1, int(connections))
+        self.chunk_size = max(64 * 1024, int(chunk_size))
+        self.log = log or (lambda msg: None)
+        self.progress = progress or (lambda pct, **stats: None)
+        self.is_running = True
+
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()  # One writer of the state file at a time
+        self._failed = False
+        self.total = 0
+        self.downloaded = 0
+        self._started = None
+        self._start_bytes = 0
+        self._last_report = 0.0
+        self._last_state = 0.0
+
+    def stop(self):
+        self.is_running = False
+
+    def run(self):
+        """Returns the target path, or None if stopped (the .part file is kept for a resume)."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.target_path)), exist_ok=True)
+        self.log(f"Connecting to {self.url}...")
+        url, size, validator = self.probe()
+
+        finished = False
+        if size:
+            state = self.load_state(size, validator)
+            try:
+                finished = self.fetch_ranges(url, size, validator, state)
+            except _RangeIgnored:
+                self.log("The server ignored the Range request; downloading the whole file again.")
+                self.discard_state()
+                finished = self.fetch_whole(url)
+        else:
+            if os.path.exists(self.part_path):
+                self.log("The server doesn't support resuming; starting over.")
+            finished = self.fetch_whole(url)
+
+        if not finished:
+            self.log("Download stopped." + (" It will resume from here next time." if size else ""))
+            return None
+        self.finish(size)
+        return self.target_path
+
+    # --- Probing and resume state ---------------------------------------------
+
+    def probe(self):
+        """(final url, size, validator); size is 0 unless Range requests work."""
+        with requests.get(self.url, headers={"Range": "bytes=0-0"}, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            url = response.url  # Follow redirects once rather than on every range
+            if response.status_code != 206:
+                return url, 0, None
+            # Content-Range: bytes 0-0/<size>
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            if not total.isdigit():
+                return url, 0, None
+            etag = response.headers.get("ETag", "")
+            # If-Range only works with a strong validator
+            validator = etag if etag and not etag.startswith("W/") else response.headers.get("Last-Modified")
+            return url, int(total), validator
+
+    def load_state(self, size, validator):
+        if not os.path.exists(self.part_path):
+            return None
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        if state is not None:
+            if state.get('url') == self.url and state.get('size') == size and state.get('validator') == validator:
+                return state
+            self.log("The file on the server changed since the last attempt; starting over.")
+            self.discard_state()
+            return None
+        # A .part without state was written front to back by a single stream
+        have = min(os.path.getsize(self.part_path), size)
+        if have:
+            return {'url': self.url, 'size': size, 'validator': validator, 'ranges': [[0, have, have]]}
+        return None
+
+    def save_state(self, state, force=False):
+        with self._state_lock:
+            now = time.monotonic()
+            if not force and now - self._last_state < STATE_INTERVAL:
+                return
+            self._last_state = now
+            with self._lock:
+                data = json.dumps(state)
+            tmp = self.state_path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self.state_path)
+
+    def discard_state(self):
+        for path in (self.state_path, self.part_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # --- Fetching -------------------------------------------------------------
+
+    def fetch_ranges(self, url, size, validator, state):
+        if state is None:
+            state = {'url': self.url, 'size': size, 'validator': validator,
+                     'ranges': split_ranges(0, size, self.connections)}
+            open(self.part_path, 'wb').close()
+        else:
+            # Whatever no range covers yet (a single-stream .part) gets split afresh
+            covered = max(r[1] for r in state['ranges'])
+            if covered < size:
+                state['ranges'] += split_ranges(covered, size, self.connections)
+            done = sum(r[2] for r in state['ranges'])
+            self.log(f"Resuming at {done / 1024 / 1024:.1f} of {size / 1024 / 1024:.1f} MB.")
+        # State first: a full-size .part without it would pass for a single-stream download
+        self.save_state(state, force=True)
+        if os.path.getsize(self.part_path) < size:
+            with open(self.part_path, 'r+b') as f:
+                f.truncate(size)  # Preallocated so each range can write at its offset
+
+        self.total = size
+        self.downloaded = sum(r[2] for r in state['ranges'])
+        pending = [r for r in state['ranges'] if r[2] < r[1] - r[0]]
+        if len(pending) > 1:
+            self.log(f"Downloading {size / 1024 / 1024:.1f} MB over {len(pending)} connections...")
+        else:
+            self.log(f"Downloading {size / 1024 / 1024:.1f} MB...")
+        self.start_clock()
+
+        try:
+            with ThreadPoolExecutor(max(1, len(pending)), thread_name_prefix="download") as pool:
+                futures = [pool.submit(self.fetch_range, url, validator, r, state) for r in pending]
+                errors = []
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors.append(e)
+        finally:
+            self.save_state(state, force=True)
+        if errors:
+            raise next((e for e in errors if isinstance(e, _RangeIgnored)), errors[0])
+        self.report(force=True)
+        return all(r[2] >= r[1] - r[0] for r in state['ranges'])
+
+    def fetch_range(self, url, validator, r, state):
+        length = r[1] - r[0]
+        attempts = 0
+        # Unbuffered, so the state file never claims bytes that are still in a buffer
+        with requests.Session() as session, open(self.part_path, 'r+b', buffering=0) as f:
+            while r[2] < length and self.is_running and not self._failed:
+                start = r[0] + r[2]
+                headers = {"Range": f"bytes={start}-{r[1] - 1}"}
+                if validator:
+                    headers["If-Range"] = validator  # A changed file comes back whole (200) instead
+                before = r[2]
+                try:
+                    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+                        if response.status_code == 200:
+                            raise _RangeIgnored()
+                        response.raise_for_status()
+                        f.seek(start)
+                        for chunk in response.iter_content(self.chunk_size):
+                            if not self.is_running or self._failed:
+                                return
+                            chunk = chunk[:length - r[2]]
+                            f.write(chunk)
+                            with self._lock:
+                                r[2] += len(chunk)
+                                self.downloaded += len(chunk)
+                            self.report()
+                            self.save_state(state)
+                            if r[2] >= length:
+                                break
+                    if r[2] >= length:
+                        return
+                    raise IOError("connection closed early")
+                except _RangeIgnored:
+                    self._failed = True
+                    raise
+                except (requests.RequestException, OSError) as e:
+                    status = getattr(getattr(e, 'response', None), 'status_code', None)
+                    attempts = 1 if r[2] > before else attempts + 1
+                    if (status is not None and 400 <= status < 500) or attempts > MAX_RETRIES:
+                        self._failed = True
+                        raise
+                    delay = min(2 ** attempts, 30)
+                    self.log(f"Connection lost at {start / 1024 / 1024:.1f} MB ({e}); retrying in {delay}s...")
+                    deadline = time.monotonic() + delay
+                    while time.monotonic() < deadline and self.is_running and not self._failed:
+                        time.sleep(0.2)
+
+    def fetch_whole(self, url):
+        # No Range support: one stream from the start, nothing to resume from
+        with requests.get(url, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            self.total = int(response.headers.get('content-length', 0) or 0)
+            self.downloaded = 0
+            size_text = f"{self.total / 1024 / 1024:.1f} MB" if self.total else "unknown size"
+            self.log(f"Downloading ({size_text})...")
+            self.start_clock()
+            with open(self.part_path, 'wb') as f:
+                for chunk in response.iter_content(self.chunk_size):
+                    if not self.is_running:
+                        return False
+                    f.write(chunk)
+                    self.downloaded += len(chunk)
+                    self.report()
+        if self.total and self.downloaded != self.total:
+            raise IOError(f"Download incomplete: got {self.downloaded} of {self.total} bytes.")
+        self.report(force=True)
+        return True
+
+    # --- Finishing ------------------------------------------------------------
+
+    def finish(self, size):
+        actual = os.path.getsize(self.part_path)
+        if size and actual != size:
+            raise IOError(f"Download incomplete: got {actual} of {size} bytes.")
+        if self.sha256:
+            self.log("Verifying SHA-256...")
+            digest = hashlib.sha256()
+            with open(self.part_path, 'rb') as f:
+                for block in iter(lambda: f.read(8 * 1024 * 1024), b""):
+                    digest.update(block)
+            if digest.hexdigest() != self.sha256:
+                self.discard_state()
+                raise ValueError(f"Checksum mismatch (expected {self.sha256}, got {digest.hexdigest()}); "
+                                 f"the download was discarded.")
+            self.log("Checksum OK.")
+        os.replace(self.part_path, self.target_path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    # --- Progress -------------------------------------------------------------
+
+    def start_clock(self):
+        self._started = time.monotonic()
+        self._start_bytes = self.downloaded
+        self._last_report = 0.0
+
+    def report(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < PROGRESS_INTERVAL:
+                return
+            self._last_report = now
+            downloaded = self.downloaded
+        elapsed = now - self._started if self._started else 0
+        speed = (downloaded - self._start_bytes) / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - downloaded) / speed if self.total and speed > 0 else None
+        percent = min(100, int(downloaded * 100 / self.total)) if self.total else -1
+        self.progress(percent, downloaded=downloaded, total=self.total, speed=speed, eta=eta)
@@ -0,0 +1,284 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import threading
+
+CAPABILITY_CACHE_PATH = os.path.expanduser("~/.cache/macwhisper/ffmpeg_capabilities.json")
+
+PRESETS = ("fast", "balanced", "quality")
+DEFAULT_PRESET = "balanced"
+
+# Video encoders the burner knows how to drive, in "auto" preference order.
+#   args:     per-preset encoder options
+#   hwaccel:  entry that must appear in `ffmpeg -hwaccels` for the hardware to be usable
+#   input:    extra args placed before -i (device setup)
+#   upload:   filter appended after the subtitles filter to move frames to the GPU
+#   pix_fmt:  output pixel format (None when the upload filter sets it)
+ENCODERS = {
+    "h264_videotoolbox": {
+        "label": "H.264 (Apple VideoToolbox)",
+        "hwaccel": "videotoolbox",
+        "args": {"fast": ["-b:v", "5000k", "-realtime", "1"], "balanced": ["-b:v", "6000k"],
+                 "quality": ["-b:v", "10000k"]},
+    },
+    "hevc_videotoolbox": {
+        "label": "HEVC (Apple VideoToolbox)",
+        "hwaccel": "videotoolbox",
+        "args": {"fast": ["-b:v", "3500k", "-realtime", "1"],
+                 "balanced": ["-b:v", "4000k"],
+                 "quality": ["-b:v", "7000k"]},
+    },
+    "h264_nvenc": {
+        "label": "H.264 (NVIDIA NVENC)",
+        "hwaccel": "cuda",
+        "args": {"fast": ["-preset", "p2", "-cq", "23"], "balanced": ["-preset", "p4", "-cq", "23"],
+                 "quality": ["-preset", "p6", "-cq", "20"]},
+    },
+    "hevc_nvenc": {
+        "label": "HEVC (NVIDIA NVENC)",
+        "hwaccel": "cuda",
+        "args": {"fast": ["-preset", "p2", "-cq", "26"],
+                 "balanced": ["-preset", "p4", "-cq", "26"],
+                 "quality": ["-preset", "p6", "-cq", "24"]},
+    },
+    "h264_qsv": {
+        "label": "H.264 (Intel Quick Sync)",
+        "hwaccel": "qsv",
+        "pix_fmt": "nv12",
+        "args": {"fast": ["-preset", "veryfast", "-global_quality", "23"],
+                 "balanced": ["-preset", "medium", "-global_quality", "23"],
+                 "quality": ["-preset", "slower", "-global_quality", "20"]},
+    },
+    "hevc_qsv": {
+        "label": "HEVC (Intel Quick Sync)",
+        "hwaccel": "qsv",
+        "pix_fmt": "nv12",
+        "args": {"fast": ["-preset", "veryfast", "-global_quality", "26"],
+                 "balanced": ["-preset", "medium", "-global_quality", "26"],
+                 "quality": ["-preset", "slower", "-global_quality", "24"]},
+    },
+    "h264_vaapi": {
+        "label": "H.264 (VAAPI)",
+        "hwaccel": "vaapi",
+        "input": ["-vaapi_device", "/dev/dri/renderD128"],
+        "upload": "format=nv12,hwupload",
+        "pix_fmt": None,
+        "args": {"fast": ["-qp", "24"], "balanced": ["-qp", "23"], "quality": ["-qp", "20"]},
+    },
+    "hevc_vaapi": {
+        "label": "HEVC (VAAPI)",
+        "hwaccel": "vaapi",
+        "input": ["-vaapi_device", "/dev/dri/renderD128"],
+        "upload": "format=nv12,hwupload",
+        "pix_fmt": None,
+        "args": {"fast": ["-qp", "27"], "balanced": ["-qp", "26"],
+                 "quality": ["-qp", "23"]},
+    },
+    "libx264": {
+        "label": "H.264 (x264, CPU)",
+        # CRF 23 is standard for high quality, preset fast for speed
+        "args": {"fast": ["-crf", "23", "-preset", "veryfast"], "balanced": ["-crf", "23", "-preset", "fast"],
+                 "quality": ["-crf", "20", "-preset", "slow"]},
+    },
+    "libx265": {
+        "label": "HEVC (x265, CPU)",
+        "args": {"fast": ["-crf", "26", "-preset", "veryfast"],
+                 "balanced": ["-crf", "26", "-preset", "fast"],
+                 "quality": ["-crf", "24", "-preset", "slow"]},
+    },
+    "libsvtav1": {
+        "label": "AV1 (SVT-AV1, CPU)",
+        "args": {"fast": ["-crf", "35", "-preset", "10"], "balanced": ["-crf", "32", "-preset", "8"],
+                 "quality": ["-crf", "30", "-preset", "6"]},
+    },
+}
+
+# Always tried last: every ffmpeg build we support has it
+FALLBACK_ENCODER = "libx264"
+
+# Containers where Apple players need HEVC tagged hvc1 (Matroska rejects the tag)
+HVC1_CONTAINERS = (".mp4", ".m4v", ".mov")
+
+# Hardware encoders are compiled into stock builds whether or not the device
+# exists, so each one must get through a one-frame encode of this to count
+TEST_SOURCE = "color=s=256x256:d=0.1"
+TEST_TIMEOUT = 15
+
+_lock = threading.Lock()
+_capabilities = {}  # ffmpeg binary identity -> capabilities
+
+
+def parse_encoders(output):
+    names = set()
+    started = False
+    for line in output.splitlines():
+        if line.strip().startswith("------"):
+            started = True  # The legend ends here
+            continue
+        parts = line.split()
+        if started and len(parts) >= 2:
+            names.add(parts[1])
+    return names
+
+
+def parse_hwaccels(output):
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    return {line for line in lines if not line.endswith(":")}
+
+
+def parse_filters(output):
+    names = set()
+    for line in output.splitlines():
+        parts = line.split()
+        # " T.C subtitles  V->V  Render text subtitles..."
+        if len(parts) >= 3 and "->" in parts[2]:
+            names.add(parts[1])
+    return names
+
+
+def test_encode(ffmpeg, name):
+    """True if `name` can encode one frame on this machine."""
+    settings = encoder_settings(name, "fast")
+    vf = ["-vf", settings['upload']] if settings['upload'] else []
+    pix_fmt = ["-pix_fmt", settings['pix_fmt']] if settings['pix_fmt'] else []
+    cmd = ([ffmpeg, "-hide_banner", "-loglevel", "error"] + settings['input']
+           + ["-f", "lavfi", "-i", TEST_SOURCE] + vf
+           + ["-frames:v", "1", "-c:v", name] + settings['args'] + pix_fmt + ["-f", "null", "-"])
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=TEST_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0
+
+
+def binary_identity(ffmpeg):
+    # A different or upgraded binary gets probed again
+    path = shutil.which(ffmpeg)
+    if path is None:
+        return None
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    return f"{path}:{st.st_size}:{int(st.st_mtime)}"
+
+
+def probe_capabilities(ffmpeg="ffmpeg"):
+    """Return {"encoders", "hwaccels", "filters", "working"} (sets) for an ffmpeg binary.
+
+    "working" holds the hardware encoders that passed a test encode. Probed
+    once per binary and cached in memory and on disk; empty sets when ffmpeg
+    is missing.
+    """
+    identity = binary_identity(ffmpeg)
+    if identity is None:
+        return {"encoders": set(), "hwaccels": set(), "filters": set(), "working": set()}
+
+    with _lock:
+        if identity in _capabilities:
+            return _capabilities[identity]
+
+        disk = {}
+        try:
+            with open(CAPABILITY_CACHE_PATH, 'r', encoding='utf-8') as f:
+                disk = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if "working" in disk.get(identity, {}):  # Entries from before test encodes are probed again
+            caps = {key: set(values) for key, values in disk[identity].items()}
+        else:
+            def query(flag):
+                result = subprocess.run([ffmpeg, "-hide_banner", flag],
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                return result.stdout
+            caps = {
+                "encoders": parse_encoders(query("-encoders")),
+                "hwaccels": parse_hwaccels(query("-hwaccels")),
+                "filters": parse_filters(query("-filters")),
+            }
+            caps["working"] = {name for name in ENCODERS
+                               if is_hardware(name) and is_present(name, caps) and test_encode(ffmpeg, name)}
+            disk[identity] = {key: sorted(values) for key, values in caps.items()}
+            try:
+                os.makedirs(os.path.dirname(CAPABILITY_CACHE_PATH), exist_ok=True)
+                with open(CAPABILITY_CACHE_PATH, 'w', encoding='utf-8') as f:
+                    json.dump(disk, f)
+            except OSError:
+                pass  # Cache is best effort
+
+        _capabilities[identity] = caps
+        return caps
+
+
+def is_present(name, caps):
+    # Built in, and the platform/device it needs looks to be there
+    profile = ENCODERS.get(name)
+    if profile is None or name not in caps["encoders"]:
+        return False
+    hwaccel = profile.get("hwaccel")
+    if hwaccel == "videotoolbox" and platform.system() != "Darwin":
+        return False
+    if hwaccel == "vaapi" and not os.path.exists(profile["input"][-1]):
+        return False
+    return hwaccel is None or hwaccel in caps["hwaccels"]
+
+
+def is_usable(name, caps):
+    if not is_present(name, caps):
+        return False
+    return not is_hardware(name) or name in caps.get("working", set())
+
+
+def available_encoders(caps=None):
+    """Names of the encoders this ffmpeg build (and machine) can use, in preference order."""
+    caps = caps if caps is not None else probe_capabilities()
+    return [name for name in ENCODERS if is_usable(name, caps)]
+
+
+def is_hardware(name):
+    return ENCODERS.get(name, {}).get("hwaccel") is not None
+
+
+def is_hevc(name):
+    return name.startswith("hevc_") or name == "libx265"
+
+
+def container_tag_args(name, output_path):
+    """-tag:v hvc1 for HEVC going into an MP4/MOV file, so QuickTime and iOS will play it."""
+    if is_hevc(name) and os.path.splitext(output_path)[1].lower() in HVC1_CONTAINERS:
+        return ["-tag:v", "hvc1"]
+    return []
+
+
+def encoder_settings(name, preset=DEFAULT_PRESET):
+    """Resolve an encoder + preset to {"name", "args", "input", "upload", "pix_fmt", "label"}."""
+    profile = ENCODERS[name]
+    preset = preset if preset in PRESETS else DEFAULT_PRESET
+    return {
+        "name": name,
+        "label": profile["label"],
+        "args": list(profile["args"][preset]),
+        "input": list(profile.get("input", [])),
+        "upload": profile.get("upload"),
+        "pix_fmt": profile.get("pix_fmt", "yuv420p"),
+    }
+
+
+def select_encoder(requested="auto", preset=DEFAULT_PRESET, caps=None):
+    """Pick the encoder for a job. Returns (settings, note).
+
+    "auto" takes the first hardware encoder that passed its test encode, else x264. A requested
+    encoder that this build/machine can't use falls back the same way.
+    """
+    caps = caps if caps is not None else probe_capabilities()
+    usable = available_encoders(caps)
+    if requested and requested != "auto":
+        if requested in usable:
+            return encoder_settings(requested, preset), f"Encoder: {ENCODERS[requested]['label']} ({preset})"
+        note = f"{requested} is not available in this ffmpeg build, falling back. "
+    else:
+        note = ""
+    hardware = [name for name in usable if is_hardware(name)]
+    name = hardware[0] if hardware else FALLBACK_ENCODER
+    return encoder_settings(name, preset), note + f"Encoder: {ENCODERS[name]['label']} ({preset}, auto)"
@@ -0,0 +1,152 @@
+import importlib.util
+import threading
+from contextlib import contextmanager
+
+try:
+    import httpx
+except ImportError:  # openai brings httpx in; keep the module importable without it
+    httpx = None
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# Tunables (see configure); read when a pooled client is first created
+settings = {
+    "timeout": 60.0,
+    "connect_timeout": 10.0,
+    "max_connections": 20,
+    "max_keepalive": 10,
+    "keepalive_expiry": 120.0,
+}
+
+_lock = threading.Lock()
+_pool = {}  # (base_url, api_key) -> PooledClient
+
+
+class PooledClient:
+    """One keep-alive HTTP connection pool plus the OpenAI client built on it."""
+
+    def __init__(self, base_url, api_key):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.http = None
+        if httpx is not None:
+            self.http = httpx.Client(
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+                limits=httpx.Limits(
+                    max_connections=settings["max_connections"],
+                    max_keepalive_connections=settings["max_keepalive"],
+                    keepalive_expiry=settings["keepalive_expiry"],
+                ),
+            )
+        self._openai = None
+        self._openai_lock = threading.Lock()
+        self.users = 0  # Jobs/requests using it right now (guarded by _lock)
+        self.retired = False  # Dropped by configure(); closed when the last user lets go
+
+    @property
+    def openai(self):
+        with self._openai_lock:
+            if self._openai is None:
+                from openai import OpenAI
+                client_args = {"api_key": self.api_key, "max_retries": 0, "timeout": settings["timeout"]}
+                if self.base_url:
+                    client_args["base_url"] = self.base_url
+                if self.http is not None:
+                    client_args["http_client"] = self.http
+                self._openai = OpenAI(**client_args)
+            return self._openai
+
+    @contextmanager
+    def hold(self):
+        with _lock:
+            self.users += 1
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def release(self):
+        with _lock:
+            self.users -= 1
+            close = self.retired and self.users == 0
+        if close:
+            self.close()
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        if self.http is not None:
+            with self.hold():
+                return self.http.post(url, headers=headers, json=json, timeout=timeout or settings["timeout"])
+        import requests
+        return requests.post(url, headers=headers, json=json, timeout=timeout or settings["timeout"])
+
+    def prewarm(self):
+        """Open a connection in the background so the first real request skips DNS/TLS."""
+        if self.http is None:
+            return
+
+        def warm():
+            try:
+                with self.hold():
+                    self.http.head(self.base_url or DEFAULT_BASE_URL, timeout=settings["connect_timeout"])
+            except Exception:
+                pass
+
+        threading.Thread(target=warm, daemon=True).start()
+
+    def close(self):
+        if self.http is not None:
+            self.http.close()
+
+
+def _get_locked(api_key, base_url):
+    key = ((base_url or "").strip().rstrip('/'), api_key)
+    client = _pool.get(key)
+    if client is None:
+        client = PooledClient(key[0] or None, api_key)
+        _pool[key] = client
+    return client
+
+
+def get_client(api_key, base_url=None):
+    """Shared client for (base_url, api_key); created on first use."""
+    with _lock:
+        return _get_locked(api_key, base_url)
+
+
+@contextmanager
+def lease_client(api_key, base_url=None):
+    """get_client for a whole job: if configure() drops the client meanwhile, it is closed once the job is done."""
+    with _lock:
+        client = _get_locked(api_key, base_url)
+        client.users += 1
+    try:
+        yield client
+    finally:
+        client.release()
+
+
+def configure(timeout=None, max_connections=None):
+    """Change timeouts/limits. Existing clients are dropped so new ones pick it up."""
+    changed = False
+    with _lock:
+        if timeout is not None and float(timeout) != settings["timeout"]:
+            settings["timeout"] = float(timeout)
+            changed = True
+        if max_connections is not None and int(max_connections) != settings["max_connections"]:
+            settings["max_connections"] = int(max_connections)
+            settings["max_keepalive"] = max(1, int(max_connections) // 2)
+            changed = True
+        if changed:
+            retired = list(_pool.values())
+            _pool.clear()
+            # Idle clients close now; ones a job is using close when it lets go (see lease_client)
+            idle = []
+            for client in retired:
+                client.retired = True
+                if client.users == 0:
+                    idle.append(client)
+    if changed:
+        for client in idle:
+            client.close()
+    return changed
@@ -0,0 +1,55 @@
+import subprocess
+
+MEDIA_EXTENSIONS = (".mp4", ".mkv", ".mov", ".avi", ".mp3", ".wav")
+
+
+def probe_duration(file_name):
+    """Return the container duration in seconds, or 0.0 if ffprobe can't tell."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", file_name],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        return float(result.stdout.strip() or 0)
+    except (ValueError, FileNotFoundError):
+        return 0.0
+
+
+def probe_video_size(file_name):
+    """(width, height) of the first video stream, or None."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=width,height",
+             "-of", "csv=p=0:s=x", file_name],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        width, height = result.stdout.strip().splitlines()[0].split("x")[:2]
+        return int(width), int(height)
+    except (ValueError, IndexError, FileNotFoundError):
+        return None
+
+
+def probe_audio_codec(file_name):
+    """Codec name of the first audio stream ("aac", "opus", ...), or None if there is none."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries", "stream=codec_name",
+             "-of", "default=noprint_wrappers=1:nokey=1", file_name],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+    except FileNotFoundError:
+        return None
+    return result.stdout.strip().splitlines()[0] if result.stdout.strip() else None
+
+
+def has_audio_stream(file_name):
+    # Raises FileNotFoundError when ffmpeg is missing so callers can report it
+    result = subprocess.run(
+        ["ffmpeg", "-i", file_name],
+        stderr=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    # ffmpeg prints stream info to stderr
+    return "Audio:" in result.stderr
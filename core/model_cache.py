@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+WHISPER_CACHE_DIR = os.path.expanduser("~/.cache/whisper")
+
+# Default RAM budget for loaded Whisper models (large-v3 alone is ~3 GB in fp32)
+DEFAULT_BUDGET_MB = 4096
+
+
+class ModelCache:
+    """Process-wide registry of loaded Whisper models.
+
+    Models are kept in LRU order and evicted once the summed in-memory size
+    exceeds the configured budget. The most recently requested model is never
+    evicted, even if it alone is larger than the budget.
+
+    The same model object is handed to every caller, but Whisper installs
+    per-call hooks (kv-cache) on it, so decode under `using(model)` to keep
+    two threads from transcribing on one model at once.
+    """
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget_bytes = int(budget_mb) * 1024 * 1024
+        self._models = OrderedDict()  # name -> (model, size_bytes)
+        self._lock = threading.Lock()
+        self._load_locks = {}  # name -> Lock, so two threads never load the same model twice
+        self._use_locks = weakref.WeakKeyDictionary()  # model -> Lock held while it decodes
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+
+    def set_budget(self, budget_mb):
+        with self._lock:
+            self.budget_bytes = int(budget_mb) * 1024 * 1024
+            self._evict_locked(0)
+
+    def get(self, model_name, log=None):
+        with self._lock:
+            if model_name in self._models:
+                self._models.move_to_end(model_name)
+                self.hits += 1
+                return self._models[model_name][0]
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                if model_name in self._models:
+                    self._models.move_to_end(model_name)
+                    self.hits += 1
+                    return self._models[model_name][0]
+                self.misses += 1
+                # Make room up front so we never hold old + new weights at once
+                self._evict_locked(self.estimate_size(model_name), log)
+
+            import whisper
+            if log: log(f"Loading model '{model_name}' into memory...")
+            start = time.time()
+            model = whisper.load_model(model_name)
+            elapsed = time.time() - start
+            size = self._model_size(model)
+
+            with self._lock:
+                self.load_seconds += elapsed
+                self._models[model_name] = (model, size)
+                self._evict_locked(0, log)
+
+            if log: log(f"Model '{model_name}' loaded in {elapsed:.1f}s ({size / 1024 / 1024:.0f} MB).")
+            return model
+
+    def using(self, model):
+        """Lock to hold around model.transcribe; other users of the same model wait."""
+        with self._lock:
+            lock = self._use_locks.get(model)
+            if lock is None:
+                lock = self._use_locks[model] = threading.Lock()
+            return lock
+
+    def evict(self, model_name):
+        with self._lock:
+            return self._models.pop(model_name, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def loaded(self):
+        with self._lock:
+            return list(self._models.keys())
+
+    def stats(self):
+        with self._lock:
+            used = sum(size for _, size in self._models.values())
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "load_seconds": self.load_seconds,
+                "loaded": list(self._models.keys()),
+                "used_mb": used / 1024 / 1024,
+                "budget_mb": self.budget_bytes / 1024 / 1024,
+            }
+
+    def stats_line(self):
+        s = self.stats()
+        return (f"Model cache: {s['hits']} hits / {s['misses']} misses, "
+                f"{s['load_seconds']:.1f}s spent loading, "
+                f"{s['used_mb']:.0f}/{s['budget_mb']:.0f} MB used ({', '.join(s['loaded']) or 'empty'})")
+
+    def _evict_locked(self, incoming_bytes, log=None):
+        # Keep the newest entry when we are only trimming after an insert
+        keep = 0 if incoming_bytes else 1
+        used = sum(size for _, size in self._models.values())
+        evicted = False
+        while len(self._models) > keep and used + incoming_bytes > self.budget_bytes:
+            name, (_, size) = self._models.popitem(last=False)
+            used -= size
+            evicted = True
+            if log: log(f"Evicted model '{name}' from cache to stay within RAM budget.")
+        if evicted:
+            self._release_memory()
+
+    def estimate_size(self, model_name):
+        # The checkpoint on disk is a close proxy for the fp32 weights in RAM
+        try:
+            from whisper import _MODELS
+            url = _MODELS.get(model_name)
+            if url:
+                path = os.path.join(WHISPER_CACHE_DIR, os.path.basename(url))
+                if os.path.exists(path):
+                    return os.path.getsize(path)
+        except ImportError:
+            pass
+        if os.path.exists(model_name):
+            return os.path.getsize(model_name)
+        return 0
+
+    @staticmethod
+    def _model_size(model):
+        try:
+            return sum(p.numel() * p.element_size() for p in model.parameters())
+        except Exception:
+            return 0
+
+    @staticmethod
+    def _release_memory():
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+MODEL_CACHE = ModelCache()
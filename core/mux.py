@@ -0,0 +1,115 @@
+import os
+import re
+import time
+
+from core.burn import FFmpegJob
+from core.media import probe_duration
+
+# ISO 639-2 codes for the languages offered on the translation page (and a few more)
+LANGUAGE_CODES = {
+    "simplified chinese": "chi",
+    "traditional chinese": "chi",
+    "chinese": "chi",
+    "english": "eng",
+    "japanese": "jpn",
+    "korean": "kor",
+    "spanish": "spa",
+    "french": "fre",
+    "german": "ger",
+    "russian": "rus",
+    "portuguese": "por",
+    "italian": "ita",
+    "arabic": "ara",
+}
+
+# Containers that can only carry text subtitles as mov_text
+MOV_TEXT_CONTAINERS = (".mp4", ".m4v", ".mov")
+
+
+def language_code(name):
+    """ISO 639-2 code for a language name or code; "und" when unknown."""
+    name = (name or "").strip().lower()
+    if name in LANGUAGE_CODES:
+        return LANGUAGE_CODES[name]
+    if re.fullmatch(r"[a-z]{3}", name):
+        return name
+    return "und"
+
+
+def guess_track_language(subtitle_path):
+    # Translated files are saved as <name>_<Language>.srt
+    stem = os.path.splitext(os.path.basename(subtitle_path))[0]
+    _, _, suffix = stem.rpartition("_")
+    return suffix if language_code(suffix) != "und" else ""
+
+
+def subtitle_codec_for(output_path, subtitle_path):
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext in MOV_TEXT_CONTAINERS:
+        return "mov_text"
+    if ext == ".mkv":
+        # Keep ASS styling when the source has it
+        return "ass" if subtitle_path.lower().endswith((".ass", ".ssa")) else "srt"
+    raise ValueError(f"Soft subtitles need an MP4, MOV or MKV output (got '{ext or output_path}').")
+
+
+class SubtitleMuxer(FFmpegJob):
+    """Adds subtitle files to a video as selectable tracks, copying video and audio.
+
+    `tracks` is a list of (subtitle path, language) pairs; the language may be
+    a name from the translation page, an ISO 639-2 code or "" (guessed from
+    the file name). The first track is marked as the default.
+    """
+
+    def __init__(self, video_path, tracks, output_path, log=None, progress=None):
+        super().__init__(output_path, log, progress)
+        self.video_path = video_path
+        self.tracks = tracks
+
+    def build_command(self):
+        cmd = ["ffmpeg", "-y", "-nostats", "-loglevel", "error", "-progress", "pipe:1",
+               "-i", self.video_path]
+        for path, _ in self.tracks:
+            cmd += ["-i", path]
+
+        # Source subtitle streams are left out: their codecs may not fit the output
+        cmd += ["-map", "0:v", "-map", "0:a?"]
+        for i in range(len(self.tracks)):
+            cmd += ["-map", f"{i + 1}:0"]
+        cmd += ["-c", "copy"]
+
+        for i, (path, lang) in enumerate(self.tracks):
+            name = lang or guess_track_language(path)
+            code = language_code(name)
+            cmd += [f"-c:s:{i}", subtitle_codec_for(self.output_path, path),
+                    f"-metadata:s:s:{i}", f"language={code}",
+                    f"-disposition:s:{i}", "default" if i == 0 else "0"]
+            if name and name.lower() != code:
+                # Players show the title in the track menu ("Simplified Chinese" vs "chi")
+                cmd += [f"-metadata:s:s:{i}", f"title={name}"]
+            self.log(f"Subtitle track {i + 1}: {os.path.basename(path)} ({code})")
+
+        if self.output_path.lower().endswith(MOV_TEXT_CONTAINERS):
+            cmd += ["-movflags", "+faststart"]
+        return cmd + [self.write_path]
+
+    def run(self):
+        """Return True on success, False if stopped by the user; raise on ffmpeg failure."""
+        if not self.tracks:
+            raise ValueError("No subtitle tracks to add.")
+        self.log("Adding subtitle tracks (no re-encode)...")
+        cmd = self.build_command()
+        self.log(f"Executing: {' '.join(cmd)}")
+
+        duration = probe_duration(self.video_path)
+        started = time.monotonic()
+
+        def on_block(block, final):
+            out_seconds, _, speed = self.block_stats(block)
+            self.report(out_seconds, duration, 0.0, speed, started, final)
+
+        if not self.run_staged(lambda: self.run_ffmpeg(cmd, on_block)):
+            self.log("Process stopped by user.")
+            return False
+        self.log(f"Muxed {len(self.tracks)} subtitle track(s) in {time.monotonic() - started:.1f}s.")
+        return True
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from core.subtitles import read_cue_times, has_animation
+from core.burn import subtitles_filter
+
+OVERLAY_CACHE_DIR = os.path.expanduser("~/.cache/macwhisper/overlays")
+MAX_CACHED_SETS = 20
+FORMAT_VERSION = 1  # Bump when the rendering changes so old sets aren't reused
+
+
+def subtitle_intervals(cues):
+    """Split the timeline wherever the set of visible cues changes.
+
+    Returns [(start, end)] for the stretches where something is on screen;
+    each one needs exactly one rendered image.
+    """
+    events = sorted([(start, 1) for start, end in cues if end > start] +
+                    [(end, -1) for start, end in cues if end > start])
+    intervals = []
+    active = 0
+    last = None
+    for t, delta in events:
+        if active > 0 and last is not None and t > last:
+            intervals.append((last, t))
+        active += delta
+        last = t
+    return intervals
+
+
+def merge_ranges(intervals):
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def enable_expression(ranges):
+    return "+".join(f"between(t,{start:.3f},{end:.3f})" for start, end in ranges)
+
+
+def overlay_key(subtitle_path, style):
+    # Sets of one key differ only in frame size: <key>-<width>x<height>
+    digest = hashlib.sha256()
+    with open(subtitle_path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(f"\x1f{style}\x1f{FORMAT_VERSION}".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def find_reusable(cache_dir, key, size):
+    """Directory of the smallest cached set of `key` rendered at least as large as `size`
+    with the same aspect ratio (downscaling it loses nothing visible), or None."""
+    width, height = size
+    best = None
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return None
+    for name in names:
+        if not name.startswith(key + "-") or not os.path.exists(os.path.join(cache_dir, name, "meta.json")):
+            continue
+        try:
+            w, h = (int(v) for v in name[len(key) + 1:].split("x"))
+        except ValueError:
+            continue
+        if w >= width and h >= height and abs(w * height - h * width) <= max(w, h):
+            if best is None or w < best[0]:
+                best = (w, name)
+    return os.path.join(cache_dir, best[1]) if best else None
+
+
+def write_concat(path, entries):
+    # entries: [(file name relative to the list, duration)]; the demuxer drops the
+    # last entry's duration, so the final image is listed twice
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("ffconcat version 1.0\n")
+        for name, duration in entries:
+            f.write(f"file '{name}'\nduration {duration:.6f}\n")
+        f.write(f"file '{entries[-1][0]}'\n")
+
+
+class OverlaySet:
+    """Pre-rendered subtitle images for one (subtitle file, style, frame size).
+
+    `sprite_list` is an ffconcat file that plays each image over its time
+    range (transparent in between); `ranges` are the merged on-screen spans
+    for the overlay filter's `enable` expression. A set rendered larger than
+    the video (`size` vs `target`) is scaled down in the filter graph.
+    """
+
+    def __init__(self, directory, intervals, size=None, target=None):
+        self.directory = directory
+        self.intervals = intervals
+        self.ranges = merge_ranges(intervals)
+        self.sprite_list = os.path.join(directory, "sprites.ffconcat")
+        self.size = tuple(size) if size else None
+        self.target = tuple(target) if target else self.size
+
+    def filter_graph(self, suffix=""):
+        # Frames outside the ranges skip the blend entirely (timeline support)
+        sprites = "[1:v]"
+        graph = ""
+        if self.size and self.target and self.size != self.target:
+            # Only the handful of sprite frames are scaled, not the video
+            graph = f"[1:v]scale={self.target[0]}:{self.target[1]}[ov];"
+            sprites = "[ov]"
+        return (graph + f"[0:v]{sprites}overlay=0:0:eof_action=pass:enable='{enable_expression(self.ranges)}'"
+                f"{suffix}[v]")
+
+
+def prune_cache(cache_dir, keep=MAX_CACHED_SETS):
+    try:
+        sets = [os.path.join(cache_dir, d) for d in os.listdir(cache_dir) if not d.startswith(".")]
+    except OSError:
+        return
+    sets.sort(key=os.path.getmtime, reverse=True)
+    for path in sets[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def prepare_overlays(job, subtitle_path, style, size, cache_dir=OVERLAY_CACHE_DIR):
+    """Return a cached or freshly rendered OverlaySet, or None when it doesn't apply.
+
+    Rendering runs through `job.run_ffmpeg`, so it stops with the job; raises
+    RuntimeError when ffmpeg can't render transparent subtitles.
+    """
+    if has_animation(subtitle_path):
+        job.log("Subtitles use ASS animation tags; rendering them frame by frame instead.")
+        return None
+    intervals = subtitle_intervals(read_cue_times(subtitle_path))
+    if not intervals:
+        return None
+
+    size = tuple(size)
+    key = overlay_key(subtitle_path, style)
+    directory = os.path.join(cache_dir, f"{key}-{size[0]}x{size[1]}")
+    # The exact size, else a larger render of the same subtitles and style (e.g. the 4K
+    # master's set for a 1080p encode); smaller ones would blur when scaled up
+    cached = directory if os.path.exists(os.path.join(directory, "meta.json")) else find_reusable(cache_dir, key, size)
+    if cached:
+        with open(os.path.join(cached, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        os.utime(cached)  # Most recently used
+        rendered = tuple(meta.get('size') or size)
+        scaled = f", scaled from {rendered[0]}x{rendered[1]}" if rendered != size else ""
+        job.log(f"Reusing {len(meta['intervals'])} pre-rendered subtitle images from cache{scaled}.")
+        return OverlaySet(cached, [tuple(i) for i in meta['intervals']], rendered, size)
+
+    started = time.monotonic()
+    job.log(f"Pre-rendering {len(intervals)} subtitle images at {size[0]}x{size[1]}...")
+    os.makedirs(cache_dir, exist_ok=True)
+    work = os.path.join(cache_dir, f".{os.path.basename(directory)}.{os.getpid()}")
+    shutil.rmtree(work, ignore_errors=True)
+    os.makedirs(work)
+    try:
+        width, height = size
+        # Transparent canvas the size of the video, so libass lays out exactly as in the burn
+        if not job.run_ffmpeg(["ffmpeg", "-y", "-nostats", "-loglevel", "error",
+                               "-f", "lavfi", "-i", f"color=c=black@0.0:s={width}x{height},format=rgba",
+                               "-frames:v", "1", os.path.join(work, "blank.png")]):
+            return None
+
+        # One canvas frame per interval, timestamped at its midpoint, rendered in a
+        # single pass; frame 1 is the t=0 lead-in and is not used
+        mids = [(start + end) / 2 for start, end in intervals]
+        points = [0.0] + mids
+        write_concat(os.path.join(work, "canvas.ffconcat"),
+                     [("blank.png", b - a) for a, b in zip(points, points[1:])] + [("blank.png", 1.0)])
+        if not job.run_ffmpeg(["ffmpeg", "-y", "-nostats", "-loglevel", "error",
+                               "-f", "concat", "-safe", "0", "-i", os.path.join(work, "canvas.ffconcat"),
+                               "-vf", f"format=rgba,{subtitles_filter(subtitle_path, style)}:alpha=1",
+                               "-fps_mode", "passthrough", "-frames:v", str(len(points)),
+                               os.path.join(work, "sprite_%05d.png")]):
+            return None
+
+        missing = [i for i in range(2, len(points) + 1)
+                   if not os.path.exists(os.path.join(work, f"sprite_{i:05d}.png"))]
+        if missing:
+            raise RuntimeError(f"ffmpeg rendered {len(points) - 1 - len(missing)} of {len(points) - 1} subtitle images")
+
+        # The stream the burn overlays: each image over its interval, blank in the gaps
+        entries = []
+        cursor = 0.0
+        for i, (start, end) in enumerate(intervals):
+            if start > cursor:
+                entries.append(("blank.png", start - cursor))
+            entries.append((f"sprite_{i + 2:05d}.png", end - start))
+            cursor = end
+        entries.append(("blank.png", 1.0))
+        write_concat(os.path.join(work, "sprites.ffconcat"), entries)
+        try:
+            os.remove(os.path.join(work, "sprite_00001.png"))
+        except OSError:
+            pass
+
+        with open(os.path.join(work, "meta.json"), 'w', encoding='utf-8') as f:
+            json.dump({"intervals": intervals, "size": list(size), "style": style}, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(work, directory)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    prune_cache(cache_dir)
+    job.log(f"Pre-rendered {len(intervals)} subtitle images in {time.monotonic() - started:.1f}s.")
+    return OverlaySet(directory, intervals, size, size)
@@ -0,0 +1,258 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from core.audio_cache import SAMPLE_RATE
+from core.vad import FRAME_MS, frame_levels
+
+# Chunks are sized so each worker gets about two of them (keeps the tail short),
+# within these bounds
+MIN_CHUNK_SECONDS = 60
+MAX_CHUNK_SECONDS = 600
+SEARCH_SECONDS = 20  # How far a cut may move from its ideal spot to land in a pause
+QUIET_MS = 600  # Width of the pause a cut looks for
+OVERLAP_SECONDS = 1.0  # Extra audio on each side of a chunk so Whisper sees the words at the edges
+THREADS_PER_WORKER = 4  # torch intra-op threads per process; more rarely helps Whisper on CPU
+
+
+def default_workers(threads=THREADS_PER_WORKER):
+    return max(1, (os.cpu_count() or 1) // threads)
+
+
+def read_pcm(pcm_path, start=0, end=None):
+    """Samples [start, end) of a cached s16le file as float32, like AudioCache.load."""
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    samples = np.memmap(pcm_path, dtype=np.int16, mode='r')
+    return samples[start:end].astype(np.float32) / 32768.0
+
+
+def pcm_levels(pcm_path, block_seconds=600):
+    # Frame levels of the whole file, a block at a time so hours of audio aren't copied at once
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    block = block_seconds * SAMPLE_RATE // frame * frame
+    total = os.path.getsize(pcm_path) // 2
+    levels = [frame_levels(read_pcm(pcm_path, start, min(start + block, total)), frame)
+              for start in range(0, total, block)]
+    return np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+
+
+def cut_at_pauses(levels, total_samples, count):
+    """Split the audio into `count` roughly equal parts, moving each cut to the quietest nearby stretch.
+
+    Returns [(start, end)] in samples, covering the audio without gaps.
+    """
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    if count <= 1 or len(levels) == 0:
+        return [(0, total_samples)]
+
+    # Smooth so a cut lands in a real pause rather than a gap between two syllables
+    width = max(1, QUIET_MS // FRAME_MS)
+    smooth = np.convolve(levels, np.ones(width) / width, mode='same')
+    search = min(SEARCH_SECONDS * 1000 // FRAME_MS, len(levels) // count // 4)
+
+    cuts = [0]
+    for i in range(1, count):
+        ideal = int(len(levels) * i / count)
+        lo = max(cuts[-1] // frame + width, ideal - search)
+        hi = min(len(levels) - width, ideal + search + 1)
+        if hi <= lo:
+            continue
+        cuts.append((lo + int(np.argmin(smooth[lo:hi]))) * frame)
+    cuts.append(total_samples)
+    return list(zip(cuts, cuts[1:]))
+
+
+def plan_chunks(levels, total_samples, workers):
+    """Chunks for `workers` processes: about two each, cut at pauses."""
+    total_seconds = total_samples / SAMPLE_RATE
+    target = min(MAX_CHUNK_SECONDS, max(MIN_CHUNK_SECONDS, total_seconds / (2 * max(1, workers))))
+    return cut_at_pauses(levels, total_samples, max(1, int(round(total_seconds / target))))
+
+
+# --- Pool processes -----------------------------------------------------------
+
+_model = None
+
+
+def whisper_download_root():
+    # Where whisper.load_model looks by default
+    return os.path.join(os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "whisper")
+
+
+def ensure_checkpoint(model_name, log=None):
+    """Download a named model's checkpoint in this process, before any pool process asks for it.
+
+    Otherwise every process of a fresh pool downloads the same file at once,
+    writing over each other and failing the checksum. Local paths and
+    unknown names are left to whisper.load_model.
+    """
+    import whisper
+    url = getattr(whisper, "_MODELS", {}).get(model_name)
+    if url is None:
+        return
+    root = whisper_download_root()
+    if log and not os.path.exists(os.path.join(root, os.path.basename(url))):
+        log(f"Downloading model '{model_name}' before starting the pool...")
+    whisper._download(url, root, False)  # Verifies the SHA-256 of a file already there, too
+
+
+def _init_worker(model_name, threads, download_root):
+    # Must happen before torch starts its thread pools
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    import whisper
+    global _model
+    _model = whisper.load_model(model_name, device="cpu", download_root=download_root)
+
+
+def _transcribe_chunk(pcm_path, start, end, options):
+    from core.transcribe import transcribe_audio
+    started = time.time()
+    result = transcribe_audio(_model, read_pcm(pcm_path, start, end), options)
+    return result, time.time() - started
+
+
+# --- Stitching ----------------------------------------------------------------
+
+def shift_result(result, offset):
+    for segment in result.get('segments', []):
+        segment['start'] += offset
+        segment['end'] += offset
+        for word in segment.get('words') or []:
+            word['start'] += offset
+            word['end'] += offset
+    return result
+
+
+class Stitcher:
+    """Merges per-chunk results (already on the global timeline), fed in chunk order.
+
+    Each chunk owns the segments whose midpoint falls inside its [start, end)
+    range, so speech in the overlaps is kept exactly once; an identical line
+    repeated across a cut is dropped too.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.languages = {}
+
+    def add(self, chunk, result):
+        """Returns the segments this chunk contributed."""
+        lo, hi = chunk[0] / SAMPLE_RATE, chunk[1] / SAMPLE_RATE
+        language = result.get('language')
+        if language:
+            self.languages[language] = self.languages.get(language, 0) + 1
+        added = []
+        for segment in result.get('segments', []):
+            mid = (segment['start'] + segment['end']) / 2
+            if not lo <= mid < hi:
+                continue
+            # Same line heard by both neighbours of a cut, with timestamps just off
+            if (self.segments and segment['start'] < lo + OVERLAP_SECONDS
+                    and self.segments[-1]['end'] > lo - OVERLAP_SECONDS
+                    and segment['text'].strip() == self.segments[-1]['text'].strip()):
+                continue
+            segment['id'] = len(self.segments)
+            self.segments.append(segment)
+            added.append(segment)
+        return added
+
+    def result(self):
+        return {
+            "text": "".join(segment['text'] for segment in self.segments),
+            "segments": self.segments,
+            "language": max(self.languages, key=self.languages.get) if self.languages else None,
+        }
+
+
+class ParallelTranscriber:
+    """Whisper on CPU across a pool of processes, one model copy per process.
+
+    Long audio is cut into chunks at pauses; chunks run concurrently and are
+    stitched back with global timestamps. The pool is started on first use
+    and kept until close(), so a batch pays for the model loads only once.
+    Each process holds its own model, so RAM use is `workers` x model size.
+    """
+
+    def __init__(self, model_name, workers, threads=THREADS_PER_WORKER, log=None):
+        self.model_name = model_name
+        self.workers = max(1, int(workers))
+        self.threads = max(1, int(threads))
+        self.log = log or (lambda msg: None)
+        self.pool = None
+
+    def start(self, workers=None):
+        if self.pool is None:
+            count = min(self.workers, workers or self.workers)
+            ensure_checkpoint(self.model_name, self.log)
+            self.log(f"Starting {count} transcription processes "
+                     f"({self.threads} threads each, one '{self.model_name}' model per process)...")
+            # Spawn, not fork: torch and Qt threads don't survive a fork
+            self.pool = ProcessPoolExecutor(count, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker, initargs=(self.model_name, self.threads, whisper_download_root()))
+        return self.pool
+
+    def transcribe(self, pcm_path, options=None, size_pool=False, on_segment=None):
+        """Transcribe a cached PCM file (see AudioCache.pcm_file).
+
+        With `size_pool`, a pool started here gets no more processes than there
+        are chunks, for one-off files. `on_segment` is called with each final
+        segment, in order, as soon as every chunk before it is done.
+        """
+        options = dict(options or {})
+        options.pop('parallel', None)
+        total = os.path.getsize(pcm_path) // 2
+        chunks = plan_chunks(pcm_levels(pcm_path), total, self.workers)
+        self.log(f"Split {total / SAMPLE_RATE:.0f}s of audio into {len(chunks)} chunks at pauses.")
+        pool = self.start(len(chunks) if size_pool else None)
+
+        overlap = int(OVERLAP_SECONDS * SAMPLE_RATE)
+        started = time.time()
+        futures = {}
+        for i, (start, end) in enumerate(chunks):
+            lo = max(0, start - overlap)
+            futures[pool.submit(_transcribe_chunk, pcm_path, lo, min(total, end + overlap), options)] = (i, lo)
+
+        results = {}  # Finished chunks waiting for an earlier one
+        stitcher = Stitcher()
+        next_index = 0
+        busy = 0.0
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                i, lo = futures[future]
+                result, seconds = future.result()
+                results[i] = shift_result(result, lo / SAMPLE_RATE)
+                busy += seconds
+                self.log(f"Chunk {i + 1}/{len(chunks)} done in {seconds:.0f}s ({done}/{len(chunks)}).")
+                # Chunks finish out of order; stitch whatever is now contiguous
+                while next_index in results:
+                    for segment in stitcher.add(chunks[next_index], results.pop(next_index)):
+                        if on_segment: on_segment(segment)
+                    next_index += 1
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        elapsed = time.time() - started
+        if elapsed > 0:
+            self.log(f"Transcribed {len(chunks)} chunks in {elapsed:.0f}s "
+                     f"({busy / elapsed:.1f} chunks in flight on average, "
+                     f"{total / SAMPLE_RATE / elapsed:.1f}x realtime).")
+        return stitcher.result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
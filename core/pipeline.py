@@ -0,0 +1,245 @@
+import os
+import queue
+import threading
+import time
+
+from core.subtitles import segments_to_srt
+from core.scheduler import SCHEDULER, PRIORITY_BATCH, ENCODE_MEMORY_MB
+
+STAGES = ("extract", "translate", "burn")
+STAGE_LABELS = {"extract": "Transcribing", "translate": "Translating", "burn": "Burning"}
+DONE_LABELS = {"extract": "Transcribed", "translate": "Translated", "burn": "Done"}
+STAGE_RESOURCES = {"extract": "cpu", "translate": "network", "burn": "encoder"}
+
+
+class PipelineItem:
+    def __init__(self, index, path):
+        self.index = index
+        self.path = path
+        self.srt = None  # Transcript handed to the translate stage in memory
+        self.srt_path = None
+        self.translated_path = None
+        self.output_path = None
+        self.error = None
+
+
+class Pipeline:
+    """Extract -> translate -> burn over a batch of files, with the stages overlapping.
+
+    Each stage runs on its own thread and passes finished files to the next
+    through a queue, so one file transcribes (CPU) while the previous one
+    translates (network) and an earlier one burns (encoder). Transcripts are
+    handed on in memory; the .srt files are still written as outputs.
+
+    `translate_config` holds SubtitleTranslator keyword arguments (api_key,
+    target_lang, model, ...). `burn_config` is a SubtitleBurner config, with
+    mode 'mux' for soft subtitles; None stops after translation.
+
+    Callbacks are plain callables: log(stage, index, message),
+    progress(stage, index, percent) and status(index, text).
+    """
+
+    def __init__(self, inputs, model_name, translate_config, burn_config=None, output_dir=None,
+                 transcribe_options=None, log=None, progress=None, status=None):
+        self.items = [PipelineItem(i, path) for i, path in enumerate(inputs)]
+        self.model_name = model_name
+        self.translate_config = translate_config
+        self.burn_config = burn_config
+        self.output_dir = output_dir
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.transcribe_options = transcribe_options or {}
+        self.log = log or (lambda stage, index, msg: None)
+        self.progress = progress or (lambda stage, index, pct: None)
+        self.status = status or (lambda index, text: None)
+        self.stages = STAGES if burn_config is not None else STAGES[:2]
+
+        self._lock = threading.Lock()
+        self.busy = {stage: 0.0 for stage in self.stages}
+        self.active = {}  # stage -> monotonic start of the file it is working on
+        self.jobs = {}  # stage -> running translator/burner, for stop()
+        self.transcriber = None  # One process pool for the whole batch when transcribing in parallel
+        self.started = None
+        self.ended = None
+        self.is_running = True
+
+    def stop(self):
+        # The file being transcribed finishes; translation and burning stop right away
+        self.is_running = False
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.stop()
+
+    def output_path(self, input_path, suffix):
+        base = os.path.splitext(os.path.basename(input_path))[0] + suffix
+        return os.path.join(self.output_dir or os.path.dirname(os.path.abspath(input_path)), base)
+
+    def run(self):
+        self.started = time.monotonic()
+        queues = [queue.Queue() for _ in self.stages]
+        for item in self.items:
+            queues[0].put(item)
+        queues[0].put(None)
+
+        threads = []
+        for i, stage in enumerate(self.stages):
+            sink = queues[i + 1] if i + 1 < len(queues) else None
+            thread = threading.Thread(target=self.stage_loop, args=(stage, queues[i], sink),
+                                      name=f"pipeline-{stage}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            if self.transcriber is not None:
+                self.transcriber.close()
+                self.transcriber = None
+
+        self.ended = time.monotonic()
+        done = sum(1 for item in self.items if item.error is None)
+        usage = ", ".join(f"{stage} {value:.0%}" for stage, value in self.utilization().items())
+        self.log(None, None, f"Pipeline finished: {done}/{len(self.items)} files in "
+                             f"{self.ended - self.started:.0f}s. Stage utilization: {usage}.")
+        return self.items
+
+    def stage_loop(self, stage, source, sink):
+        handler = getattr(self, "run_" + stage)
+        while True:
+            item = source.get()
+            if item is None:
+                break
+            if item.error is None and not self.is_running:
+                item.error = "Stopped"
+                self.status(item.index, "Stopped")
+            lease = None
+            resource = self.stage_resource(stage)
+            if item.error is None and resource is not None:
+                # Shares the machine with jobs started from other pages (see core.scheduler)
+                lease = SCHEDULER.acquire(resource, owner="pipeline", priority=PRIORITY_BATCH,
+                                          memory_mb=self.stage_memory_mb(stage),
+                                          count=(self.transcribe_options.get('parallel') or 1) if stage == "extract" else 1,
+                                          should_continue=lambda: self.is_running,
+                                          log=lambda msg: self.log(stage, item.index, msg))
+                if lease is None:
+                    item.error = "Stopped"
+                    self.status(item.index, "Stopped")
+            if item.error is None:
+                self.status(item.index, STAGE_LABELS[stage])
+                with self._lock:
+                    self.active[stage] = time.monotonic()
+                try:
+                    handler(item)
+                except Exception as e:
+                    if not self.is_running:
+                        item.error = "Stopped"
+                        self.status(item.index, "Stopped")
+                    else:
+                        item.error = str(e)
+                        self.log(stage, item.index, f"Error: {e}")
+                        self.status(item.index, f"Error: {e}")
+                finally:
+                    if lease is not None:
+                        lease.release()
+                    with self._lock:
+                        self.busy[stage] += time.monotonic() - self.active.pop(stage)
+                        self.jobs.pop(stage, None)
+                if item.error is None:
+                    self.status(item.index, "Done" if sink is None else f"{DONE_LABELS[stage]}, waiting")
+            if sink is not None:
+                sink.put(item)
+        if sink is not None:
+            sink.put(None)
+
+    def utilization(self):
+        """Fraction of the wall time each stage has spent working so far."""
+        with self._lock:
+            now = self.ended or time.monotonic()
+            elapsed = now - self.started if self.started else 0.0
+            if elapsed <= 0:
+                return {stage: 0.0 for stage in self.stages}
+            return {stage: min(1.0, (self.busy[stage] + (now - self.active[stage] if stage in self.active else 0.0))
+                               / elapsed)
+                    for stage in self.stages}
+
+    def stage_resource(self, stage):
+        # Muxing only copies streams; burning competes for the encoder
+        if stage == "burn" and self.burn_config.get('mode') == 'mux':
+            return None
+        return STAGE_RESOURCES[stage]
+
+    def stage_memory_mb(self, stage):
+        if stage == "extract":
+            from core.transcribe import transcription_memory_mb
+            return transcription_memory_mb(self.model_name, self.transcribe_options)
+        if stage == "burn" and self.burn_config.get('mode') != 'mux':
+            return ENCODE_MEMORY_MB
+        return 0
+
+    def register(self, stage, job):
+        with self._lock:
+            self.jobs[stage] = job
+        if not self.is_running:
+            raise RuntimeError("Stopped")
+
+    def run_extract(self, item):
+        log = lambda msg: self.log("extract", item.index, msg)
+        if self.transcribe_options.get('parallel'):
+            from core.audio_cache import AUDIO_CACHE
+            from core.parallel import ParallelTranscriber
+
+            # Started on the first file and kept, so the batch loads the models once
+            if self.transcriber is None:
+                self.transcriber = ParallelTranscriber(self.model_name, self.transcribe_options['parallel'])
+            self.transcriber.log = log
+            with AUDIO_CACHE.lease(item.path, log=log) as pcm_path:
+                result = self.transcriber.transcribe(pcm_path, self.transcribe_options)
+        else:
+            from core.transcribe import transcribe_file
+            result = transcribe_file(item.path, self.model_name, log=log, options=self.transcribe_options)
+        if not result['segments']:
+            raise ValueError("No speech found")
+        item.srt = segments_to_srt(result['segments'])
+        item.srt_path = self.output_path(item.path, ".srt")
+        with open(item.srt_path, 'w', encoding='utf-8') as f:
+            f.write(item.srt)
+
+    def run_translate(self, item):
+        from core.translate import SubtitleTranslator
+        from core.checkpoint import checkpoint_path_for
+
+        translator = SubtitleTranslator(log=lambda msg: self.log("translate", item.index, msg),
+                                        progress=lambda pct: self.progress("translate", item.index, pct),
+                                        **self.translate_config)
+        self.register("translate", translator)
+        checkpoint = checkpoint_path_for(item.srt_path, translator.target_lang) if translator.resume else None
+        content = translator.translate(item.srt, checkpoint_path=checkpoint)
+        if content is None:
+            raise RuntimeError("Translation stopped.")
+        item.translated_path = self.output_path(item.path, f"_{translator.target_lang}.srt")
+        with open(item.translated_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        translator.discard_checkpoint()
+
+    def run_burn(self, item):
+        from core.burn import SubtitleBurner
+        from core.mux import SubtitleMuxer, MOV_TEXT_CONTAINERS
+
+        log = lambda msg: self.log("burn", item.index, msg)
+        progress = lambda pct, **stats: self.progress("burn", item.index, pct)
+        _, ext = os.path.splitext(item.path)
+        if self.burn_config.get('mode') == 'mux':
+            if ext.lower() not in MOV_TEXT_CONTAINERS + (".mkv",):
+                ext = ".mkv"
+            output = self.output_path(item.path, "_subbed" + ext)
+            # Translation first (default track), the original transcript as a second track
+            tracks = [(item.translated_path, self.translate_config.get('target_lang', "")), (item.srt_path, "")]
+            job = SubtitleMuxer(item.path, tracks, output, log=log, progress=progress)
+        else:
+            output = self.output_path(item.path, "_subbed" + ext)
+            job = SubtitleBurner(item.path, item.translated_path, output, self.burn_config, log=log, progress=progress)
+        self.register("burn", job)
+        if not job.run():
+            raise RuntimeError("Burning was interrupted.")
+        item.output_path = output
@@ -0,0 +1,50 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1.0, should_continue=None):
+        """Block until `tokens` are available. Returns False if `should_continue()` turns false."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            if should_continue is not None and not should_continue():
+                return False
+            time.sleep(min(wait, 0.5))
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(provider_key, requests_per_minute):
+    """Shared bucket per provider so parallel jobs against one API respect a single limit."""
+    with _buckets_lock:
+        bucket = _buckets.get(provider_key)
+        rate = requests_per_minute / 60.0
+        if bucket is None or bucket.rate != rate:
+            # Allow a short burst of up to one second's worth (at least one request)
+            bucket = TokenBucket(rate, capacity=max(1.0, rate))
+            _buckets[provider_key] = bucket
+        return bucket
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
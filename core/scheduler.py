@@ -0,0 +1,164 @@
+import itertools
+import os
+import threading
+
+# Resource classes and how many jobs of each may run at once by default
+DEFAULT_SLOTS = {
+    "cpu": 1,  # Whisper inference
+    "encoder": 1,  # ffmpeg burns
+    "network": 2,  # Translation jobs and model downloads
+}
+RESOURCE_LABELS = {"cpu": "transcription", "encoder": "encoder", "network": "network"}
+
+# RAM reserved for one ffmpeg burn (decode + filters + encoder lookahead)
+ENCODE_MEMORY_MB = 512
+
+PRIORITY_BATCH = 0  # Queues and pipelines
+PRIORITY_NORMAL = 1  # A single job started from a page
+PRIORITY_HIGH = 2
+
+
+def default_memory_budget_mb():
+    # Three quarters of physical RAM; 0 (no limit) where it can't be read
+    try:
+        return int(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') * 3 / 4 / 1024 / 1024)
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+class Lease:
+    def __init__(self, scheduler, request):
+        self.scheduler = scheduler
+        self.request = request
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.scheduler._release(self.request)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Request:
+    def __init__(self, resource, owner, priority, count, memory, seq):
+        self.resource = resource
+        self.owner = owner
+        self.priority = priority
+        self.count = count
+        self.memory = memory
+        self.seq = seq
+
+
+class ResourceScheduler:
+    """Process-wide admission control for heavy jobs.
+
+    Jobs ask for a slot in a resource class ("cpu", "encoder", "network")
+    and declare the RAM they expect to use. A job starts only when its class
+    has a free slot and its memory fits the shared budget; a job alone in
+    the budget always starts, so an oversized one can't wait forever.
+
+    Waiting jobs of a class are served by priority, then round-robin across
+    owners (the owner served longest ago goes first), then in arrival order,
+    so one page's batch can't starve another page's single job. Memory is
+    not backfilled: when the next job doesn't fit, later ones in its class
+    wait too.
+    """
+
+    def __init__(self, slots=None, memory_budget_mb=None):
+        self._cond = threading.Condition()
+        self.slots = dict(DEFAULT_SLOTS)
+        self.slots.update(slots or {})
+        budget = default_memory_budget_mb() if memory_budget_mb is None else memory_budget_mb
+        self.memory_budget = int(budget) * 1024 * 1024
+        self.in_use = {resource: 0 for resource in self.slots}
+        self.memory_used = 0
+        self.waiting = []
+        self.last_served = {}  # (resource, owner) -> grant number
+        self._seq = itertools.count()
+        self._grants = itertools.count()
+
+    def configure(self, slots=None, memory_budget_mb=None):
+        with self._cond:
+            for resource, count in (slots or {}).items():
+                self.slots[resource] = max(1, int(count))
+                self.in_use.setdefault(resource, 0)
+            if memory_budget_mb is not None:
+                self.memory_budget = int(memory_budget_mb) * 1024 * 1024
+            self._cond.notify_all()
+
+    def acquire(self, resource, owner="", priority=PRIORITY_NORMAL, count=1, memory_mb=0,
+                should_continue=None, log=None):
+        """Block until the job may start. Returns a Lease (release it, or use `with`).
+
+        `count` slots are taken at once (capped at the class size, so a job
+        can ask for the whole class). Returns None if `should_continue()`
+        turns false while waiting.
+        """
+        with self._cond:
+            count = max(1, min(int(count), self.slots[resource]))
+            request = _Request(resource, owner, priority, count, int(memory_mb) * 1024 * 1024, next(self._seq))
+            self.waiting.append(request)
+            logged = False
+            try:
+                while True:
+                    if self._next(resource) is request and self._fits(request):
+                        self.in_use[resource] += request.count
+                        self.memory_used += request.memory
+                        self.last_served[(resource, owner)] = next(self._grants)
+                        return Lease(self, request)
+                    if should_continue is not None and not should_continue():
+                        return None
+                    if log and not logged:
+                        ahead = sum(1 for r in self.waiting if r.resource == resource and r is not request)
+                        log(f"Waiting for a free {RESOURCE_LABELS.get(resource, resource)} slot "
+                            f"({self.in_use[resource]} running, {ahead} other job(s) waiting)...")
+                        logged = True
+                    self._cond.wait(0.5)  # Also re-checks should_continue
+            finally:
+                self.waiting.remove(request)
+                self._cond.notify_all()
+
+    def _next(self, resource):
+        candidates = [r for r in self.waiting if r.resource == resource]
+        return min(candidates, key=lambda r: (-r.priority, self.last_served.get((resource, r.owner), -1), r.seq))
+
+    def _fits(self, request):
+        # Like memory, a job alone in its class always fits (slots may have shrunk since it asked)
+        in_use = self.in_use[request.resource]
+        if in_use and in_use + request.count > self.slots[request.resource]:
+            return False
+        if self.memory_budget and self.memory_used and self.memory_used + request.memory > self.memory_budget:
+            return False
+        return True
+
+    def _release(self, request):
+        with self._cond:
+            self.in_use[request.resource] -= request.count
+            self.memory_used -= request.memory
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "slots": dict(self.slots),
+                "in_use": dict(self.in_use),
+                "waiting": {resource: sum(1 for r in self.waiting if r.resource == resource)
+                            for resource in self.slots},
+                "memory_used_mb": self.memory_used / 1024 / 1024,
+                "memory_budget_mb": self.memory_budget / 1024 / 1024,
+            }
+
+    def stats_line(self):
+        s = self.stats()
+        classes = ", ".join(f"{resource} {s['in_use'][resource]}/{s['slots'][resource]}"
+                            + (f" (+{s['waiting'][resource]} waiting)" if s['waiting'][resource] else "")
+                            for resource in s['slots'])
+        return f"Scheduler: {classes}; {s['memory_used_mb']:.0f}/{s['memory_budget_mb']:.0f} MB reserved"
+
+
+SCHEDULER = ResourceScheduler()
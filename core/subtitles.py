@@ -0,0 +1,102 @@
+import os
+import re
+
+
+def format_timestamp(seconds):
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    millis = int((seconds - int(seconds)) * 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+
+
+# SRT/VTT "00:00:01,000 --> 00:00:02,500" and ASS "Dialogue: 0,0:00:01.00,0:00:02.50,"
+CUE_RANGE_RE = re.compile(r"(\d+):(\d{2}):(\d{2})[,.](\d+)\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d+)")
+ASS_DIALOGUE_RE = re.compile(r"^Dialogue:\s*[^,]*,(\d+):(\d{2}):(\d{2})\.(\d+),(\d+):(\d{2}):(\d{2})\.(\d+),", re.M)
+# ASS override tags that change a cue while it is on screen
+ASS_ANIMATION_RE = re.compile(r"\\(?:move|fad|fade|t\(|k|K|kf|ko)")
+
+
+def _seconds(h, m, s, frac):
+    return int(h) * 3600 + int(m) * 60 + int(s) + int(frac) / (10 ** len(frac))
+
+
+# "00:01:02,500 -->" (SRT) / "00:01:02.500 -->" (VTT) / "Dialogue: 0,0:01:02.50," (ASS)
+CUE_START_RE = re.compile(r"(?:^|\n)(?:Dialogue:\s*[^,]*,)?(\d+):(\d{2}):(\d{2})[,.](\d+)(?:\s*-->|,)")
+
+
+def first_cue_time(file_name):
+    """Start of the first cue in an SRT/VTT/ASS file in seconds, or None."""
+    try:
+        with open(file_name, 'r', encoding='utf-8', errors='replace') as f:
+            match = CUE_START_RE.search(f.read())
+    except OSError:
+        return None
+    if not match:
+        return None
+    return _seconds(*match.groups())
+
+
+def read_cue_times(file_name):
+    """[(start, end)] in seconds for every cue in an SRT/VTT/ASS file."""
+    with open(file_name, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    pattern = ASS_DIALOGUE_RE if ASS_DIALOGUE_RE.search(content) else CUE_RANGE_RE
+    return [(_seconds(*g[:4]), _seconds(*g[4:])) for g in pattern.findall(content)]
+
+
+def has_animation(file_name):
+    with open(file_name, 'r', encoding='utf-8', errors='replace') as f:
+        return bool(ASS_ANIMATION_RE.search(f.read()))
+
+
+def srt_block(index, segment):
+    start = format_timestamp(segment['start'])
+    end = format_timestamp(segment['end'])
+    return f"{index}\n{start} --> {end}\n{segment['text'].strip()}\n\n"
+
+
+def segments_to_srt(segments):
+    return "".join(srt_block(i, segment) for i, segment in enumerate(segments, start=1))
+
+
+def write_srt(segments, file_name):
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write(segments_to_srt(segments))
+
+
+def partial_srt_path(base):
+    return base + ".partial.srt"
+
+
+class SrtAppender:
+    """Writes cues to an SRT as they arrive, flushed after each one.
+
+    Used while transcribing, so a crash keeps everything decoded so far.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def append(self, segment):
+        self.count += 1
+        self.file.write(srt_block(self.count, segment))
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def write_txt(text, file_name):
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write(text)
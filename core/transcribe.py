@@ -0,0 +1,137 @@
+import os
+from core.model_cache import MODEL_CACHE
+from core.audio_cache import AUDIO_CACHE, SAMPLE_RATE
+
+# RAM to reserve for a transcription whose checkpoint isn't on disk yet
+DEFAULT_MODEL_MEMORY_MB = 1024
+
+# Streaming transcribes this much audio per model.transcribe call (cut at a pause),
+# so the first segments arrive after one window instead of the whole file
+STREAM_WINDOW_SECONDS = 60
+# Tail of the previous window's text passed as the next window's prompt, as
+# Whisper itself does between its own 30 s windows
+PROMPT_CHARS = 200
+
+
+class SegmentStream:
+    """Iterate over Whisper segments as they are decoded.
+
+    The audio is cut at pauses into ~STREAM_WINDOW_SECONDS windows that are
+    transcribed one after another, each prompted with the text before it and
+    pinned to the language detected in the first. Segments come out in order
+    with timestamps on the original timeline (also with 'vad'); `language`
+    is set once the first window is done.
+
+    Opt-in (options['stream']): Whisper's own context is cut at each window,
+    so the text can differ slightly from one model.transcribe over the file.
+    """
+
+    def __init__(self, model, audio, options=None, log=None):
+        self.model = model
+        self.audio = audio
+        self.options = options or {}
+        self.log = log or (lambda msg: None)
+        self.language = self.options.get('language')
+
+    def __iter__(self):
+        from core.parallel import cut_at_pauses, shift_result
+        from core.vad import frame_levels, speech_timeline, remap_segment
+
+        audio = self.audio
+        timeline = None
+        if self.options.get('vad'):
+            timeline = speech_timeline(audio, self.log)
+            if timeline is not None:
+                if not timeline.regions:
+                    return
+                audio = timeline.join(audio)
+
+        count = max(1, int(round(len(audio) / SAMPLE_RATE / STREAM_WINDOW_SECONDS)))
+        prompt = None
+        index = 0
+        for start, end in cut_at_pauses(frame_levels(audio), len(audio), count):
+            args = {}
+            if self.language:
+                args['language'] = self.language
+            if prompt:
+                args['initial_prompt'] = prompt
+            result = shift_result(self.model.transcribe(audio[start:end], **args), start / SAMPLE_RATE)
+            self.language = self.language or result.get('language')
+
+            for segment in result.get('segments', []):
+                if timeline is not None:
+                    remap_segment(segment, timeline)
+                segment['id'] = index
+                index += 1
+                yield segment
+            text = result.get('text', '').strip()
+            if text:
+                prompt = text[-PROMPT_CHARS:]
+
+
+def streams_segments(options):
+    """True when segments arrive before the whole file is done: 'stream', or chunked 'parallel' runs."""
+    options = options or {}
+    return bool(options.get('stream') or options.get('parallel'))
+
+
+def transcription_memory_mb(model_name, options=None):
+    """Working-set estimate for core.scheduler: one model copy per process."""
+    size_mb = MODEL_CACHE.estimate_size(model_name) / 1024 / 1024 or DEFAULT_MODEL_MEMORY_MB
+    return int(size_mb * max(1, (options or {}).get('parallel') or 1))
+
+
+def transcribe_audio(model, audio, options=None, log=None, on_segment=None):
+    """Run Whisper on decoded audio.
+
+    `options`: {'vad': skip silence first, 'parallel': number of worker
+    processes for chunked CPU transcription, 0 = off (see transcribe_file),
+    'stream': decode in windows (see SegmentStream)}. With 'stream',
+    `on_segment` gets each segment as soon as it is decoded; otherwise the
+    file is transcribed in one call and `on_segment` is ignored.
+    """
+    options = options or {}
+    # Cached models are shared between threads (see ModelCache.using)
+    with MODEL_CACHE.using(model):
+        if on_segment is not None and options.get('stream'):
+            stream = SegmentStream(model, audio, options, log)
+            segments = []
+            for segment in stream:
+                segments.append(segment)
+                on_segment(segment)
+            return {"text": "".join(segment['text'] for segment in segments),
+                    "segments": segments, "language": stream.language}
+        if options.get('vad'):
+            from core.vad import transcribe_speech
+            return transcribe_speech(model, audio, log=log)
+        return model.transcribe(audio)
+
+
+def transcribe_file(file_path, model_name, log=None, options=None, on_segment=None):
+    log = log or (lambda msg: None)
+    options = options or {}
+    if not file_path:
+        raise ValueError("No file path provided for transcription.")
+
+    if options.get('parallel'):
+        from core.parallel import ParallelTranscriber
+        # The pool processes load their own models; nothing is loaded here
+        with AUDIO_CACHE.lease(file_path, log=log) as pcm_path:
+            log(f"Starting parallel transcription for: {os.path.basename(file_path)}")
+            with ParallelTranscriber(model_name, options['parallel'], log=log) as transcriber:
+                result = transcriber.transcribe(pcm_path, options, size_pool=True, on_segment=on_segment)
+        log("Transcription complete.")
+        return result
+
+    log(f"Loading model '{model_name}'...")
+    model = MODEL_CACHE.get(model_name, log=log)
+
+    # Decoded once per file and reused, e.g. when comparing models on the same input
+    audio = AUDIO_CACHE.load(file_path, log=log)
+    log(AUDIO_CACHE.stats_line())
+
+    log(f"Starting transcription for: {os.path.basename(file_path)}")
+    result = transcribe_audio(model, audio, options, log, on_segment)
+    log("Transcription complete.")
+    log(MODEL_CACHE.stats_line())
+    return result
@@ -0,0 +1,405 @@
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from core.ratelimit import bucket_for, backoff_delay
+from core.batching import AdaptiveBatcher, estimate_tokens
+from core.checkpoint import TranslationCheckpoint, checkpoint_path_for
+from core.http_pool import lease_client
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BATCH_SIZE = 10
+# Matches the placeholder shown for "batch_size" on the API Keys page
+DEFAULT_MAX_BATCH_SIZE = 18
+
+
+def parse_translations(content):
+    """Parse a {"translations": ...} reply into {id: text}.
+
+    Accepts the object form or a list of {"id", "text"} items, optionally
+    wrapped in a Markdown code fence. Raises ValueError on anything else.
+    """
+    content = (content or "").strip()
+    fenced = re.match(r'^```(?:json)?\s*(.*?)\s*```$', content, re.DOTALL)
+    if fenced:
+        content = fenced.group(1)
+    data = json.loads(content)
+    if isinstance(data, dict) and "translations" in data:
+        data = data["translations"]
+    if isinstance(data, list):
+        data = {str(item.get("id")): item.get("text") for item in data if isinstance(item, dict)}
+    if not isinstance(data, dict):
+        raise ValueError("Reply is not a JSON object of translations")
+    return {str(k): v for k, v in data.items()}
+
+
+def normalize_cue(text):
+    # Whitespace-insensitive identity for deduplication
+    return " ".join(text.split())
+
+
+class FatalTranslationError(Exception):
+    """Errors that retrying cannot fix (bad key, no quota)."""
+
+
+class BatchTooLarge(Exception):
+    """The reply was cut off by the model's output limit."""
+
+
+class SubtitleTranslator:
+    """Translates SRT content through an OpenAI-compatible chat API.
+
+    `log` and `progress` are plain callables so the same engine can be driven
+    by a QThread (signal.emit) or by the headless CLI.
+
+    Up to `concurrency` batches are in flight at once; results are written back
+    by block index so the output keeps the original order. When
+    `requests_per_minute` is set, all translators talking to the same base URL
+    share one token bucket.
+
+    If a `memory` (core.translation_memory.TranslationMemory) is given, cues
+    it already knows are filled in locally and only the misses are sent.
+
+    With `resume` enabled, translate_file() journals finished batches to a
+    checkpoint in the output folder (next to the source when none is given)
+    and skips them on the next run. The journal outlives a successful
+    translate(); call discard_checkpoint() once the result is on disk.
+
+    Batches are packed by estimated tokens for the model and their size adapts
+    between 1 and `max_batch_size` cues (see core.batching.AdaptiveBatcher).
+    """
+
+    max_retries = 5
+    # Extra requests for cues missing or empty in a reply
+    repair_rounds = 2
+
+    def __init__(self, api_key, target_lang, model="gpt-3.5-turbo", base_url=None,
+                 log=None, progress=None, concurrency=DEFAULT_CONCURRENCY, requests_per_minute=None,
+                 memory=None, resume=True, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        self.api_key = api_key
+        self.target_lang = target_lang
+        self.model = model
+        self.base_url = base_url
+        self.log = log or (lambda msg: None)
+        self.progress = progress or (lambda pct: None)
+        self.concurrency = max(1, int(concurrency or 1))
+        self.requests_per_minute = requests_per_minute
+        self.rate_limiter = None
+        self.memory = memory
+        self.resume = resume
+        self.json_mode = True
+        self.max_batch_size = max(1, int(max_batch_size or DEFAULT_MAX_BATCH_SIZE))
+        self.batcher = None
+        self.is_running = True
+        self.checkpoint_path = None  # Journal of the last completed translate(), until discarded
+
+    def stop(self):
+        self.is_running = False
+
+    def discard_checkpoint(self):
+        # Only once the translation is written: a failed write must still be able to resume
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.checkpoint_path = None
+
+    def translate_file(self, file_path, output_dir=None):
+        # The resume journal goes with the output (see checkpoint_path_for)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        checkpoint_path = checkpoint_path_for(file_path, self.target_lang, output_dir) if self.resume else None
+        return self.translate(content, checkpoint_path=checkpoint_path)
+
+    def translate(self, content, checkpoint_path=None):
+        """Return the translated SRT text, or None if stopped before completion."""
+        if not self.api_key:
+            raise ValueError("API Key is missing.")
+
+        # Clients are pooled per (base_url, api_key) so keep-alive connections
+        # survive across jobs. Retries are handled here with jittered backoff,
+        # not inside the SDK, so pooled clients are built with max_retries=0.
+        base_url = self.base_url.strip() if self.base_url and self.base_url.strip() else None
+        # Leased for the whole job so a settings change can't close it mid-translation
+        with lease_client(self.api_key, base_url) as pooled:
+            return self.translate_with(pooled.openai, base_url, content, checkpoint_path)
+
+    def translate_with(self, client, base_url, content, checkpoint_path):
+        if self.requests_per_minute:
+            self.rate_limiter = bucket_for(base_url or "openai", float(self.requests_per_minute))
+
+        blocks = re.split(r'\n\s*\n', content.strip())
+        translated_blocks = list(blocks)
+
+        # Cues are (block index, text); malformed blocks pass through untouched
+        cues = []
+        for i, block in enumerate(blocks):
+            lines = block.strip().split('\n')
+            if len(lines) >= 3:
+                cues.append((i, " ".join(lines[2:])))
+        cue_count = len(cues)
+
+        checkpoint = None
+        if checkpoint_path:
+            checkpoint = TranslationCheckpoint(checkpoint_path, content, self.target_lang,
+                                               self.model, self.system_prompt())
+            journaled = checkpoint.load()
+            if journaled:
+                for block_idx, trans_text in journaled.items():
+                    if block_idx < len(blocks):
+                        self.apply_translation(blocks, translated_blocks, block_idx, trans_text)
+                cues = [cue for cue in cues if cue[0] not in journaled]
+                self.log(f"Resuming from checkpoint: {cue_count - len(cues)}/{cue_count} cues already translated.")
+            checkpoint.open(resume=bool(journaled))
+
+        # Collapse repeated lines ("[Music]", "Thank you.") so each text is sent once;
+        # `copies` maps the block that is sent to the other blocks sharing its text
+        copies = {}
+        first_block = {}
+        unique_cues = []
+        for block_idx, text in cues:
+            key = normalize_cue(text)
+            if key in first_block:
+                copies[first_block[key]].append(block_idx)
+            else:
+                first_block[key] = block_idx
+                copies[block_idx] = []
+                unique_cues.append((block_idx, text))
+        if len(unique_cues) < len(cues):
+            self.log(f"Deduplicated {len(cues)} cues to {len(unique_cues)} unique texts "
+                     f"({1 - len(unique_cues) / len(cues):.0%} fewer to translate).")
+        cues = unique_cues
+
+        def fill(block_idx, trans_text):
+            # Apply a translation to a sent block and all its duplicates
+            targets = [block_idx] + copies[block_idx]
+            for idx in targets:
+                self.apply_translation(blocks, translated_blocks, idx, trans_text)
+            return targets
+
+        if self.memory is not None and cues:
+            remembered = self.memory.lookup([text for _, text in cues], self.target_lang,
+                                            self.model, self.system_prompt())
+            misses = []
+            for block_idx, text in cues:
+                if text in remembered:
+                    fill(block_idx, remembered[text])
+                else:
+                    misses.append((block_idx, text))
+            hit_count = len(cues) - len(misses)
+            self.log(f"Translation memory: {hit_count}/{len(cues)} unique texts reused "
+                     f"({hit_count / len(cues):.0%} hit rate), {len(misses)} to translate.")
+            cues = misses
+
+        self.batcher = AdaptiveBatcher(self.model, self.max_batch_size,
+                                       prompt_tokens=estimate_tokens(self.system_prompt()),
+                                       start_cues=DEFAULT_BATCH_SIZE)
+        total_cues = len(cues)
+        # Cues restored from the checkpoint or memory (and their duplicates) count towards progress
+        done_cues = cue_count - sum(1 + len(copies[block_idx]) for block_idx, _ in cues)
+
+        if cue_count:
+            self.progress(int(done_cues / cue_count * 100))
+        self.log(f"Translating {total_cues} cues ({self.concurrency} batches in flight, up to "
+                 f"{self.max_batch_size} cues / ~{self.batcher.token_budget} tokens per batch)...")
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        in_flight = {}
+        pending = deque(cues)
+        try:
+            while True:
+                # Keep the window full
+                while self.is_running and len(in_flight) < self.concurrency:
+                    batch = self.batcher.next_batch(pending)
+                    if batch is None:
+                        break
+                    in_flight[executor.submit(self.translate_batch, client, batch)] = batch
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    translations = future.result()  # re-raises fatal errors
+                    if translations is None:
+                        continue  # stopped
+                    learned = []
+                    for (block_idx, text), trans_text in zip(batch, translations):
+                        if trans_text is None:
+                            continue  # keep the original block
+                        learned.append((fill(block_idx, trans_text), text, trans_text.strip()))
+                    if self.memory is not None:
+                        self.memory.store([(text, t) for _, text, t in learned],
+                                          self.target_lang, self.model, self.system_prompt())
+                    if checkpoint is not None:
+                        checkpoint.append([(idx, t) for targets, _, t in learned for idx in targets])
+                    done_cues += sum(1 + len(copies[block_idx]) for block_idx, _ in batch)
+                    self.progress(int(done_cues / cue_count * 100))
+        except BaseException:
+            self.is_running = False  # tell batches still in flight to give up
+            if checkpoint is not None:
+                self.log(f"Progress saved to checkpoint; restart to resume: {checkpoint.path}")
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if checkpoint is not None:
+                checkpoint.close()
+
+        if not self.is_running:
+            if checkpoint is not None:
+                self.log(f"Progress saved to checkpoint; restart to resume: {checkpoint.path}")
+            return None
+        self.checkpoint_path = checkpoint.path if checkpoint is not None else None
+        return "\n\n".join(translated_blocks)
+
+    def system_prompt(self):
+        return (f"You are a professional subtitle translator. Translate subtitle cues to {self.target_lang}. "
+                "The user sends a JSON object of the form {\"cues\": {\"<id>\": \"<text>\", ...}}. "
+                "Reply with ONLY a JSON object of the form {\"translations\": {\"<id>\": \"<translated text>\", ...}} "
+                "containing every id you were given, exactly once, with the same ids. "
+                "Translate each cue on its own: never merge, split or reorder cues, and do not add notes, "
+                "original text, line numbers or timestamps.")
+
+    @staticmethod
+    def apply_translation(blocks, translated_blocks, block_idx, trans_text):
+        original_block_lines = blocks[block_idx].strip().split('\n')
+        translated_blocks[block_idx] = f"{original_block_lines[0]}\n{original_block_lines[1]}\n{trans_text.strip()}"
+
+    def translate_batch(self, client, batch):
+        """Translate one batch. Returns a list aligned with `batch` (None = keep original)."""
+        first, last = batch[0][0] + 1, batch[-1][0] + 1
+        self.log(f"Translating batch {first} to {last}...")
+
+        # Short per-batch ids keep the request small; they map back by position
+        results = self.translate_cues(client, {str(n): text for n, (_, text) in enumerate(batch, start=1)},
+                                      batch, first, last)
+        if results is None or not self.is_running:
+            return None
+        missing = len(batch) - len(results)
+        if missing:
+            self.log(f"Keeping original text for {missing} cue(s) in batch {first}-{last} after retries.")
+        return [results.get(str(n)) for n in range(1, len(batch) + 1)]
+
+    def translate_cues(self, client, pending, batch, first, last):
+        """Translate {id: text}, re-requesting missing ids. Returns {id: translation} or None if stopped."""
+        pending = dict(pending)
+        results = {}
+
+        for round_no in range(1 + self.repair_rounds):
+            if not pending:
+                break
+            if round_no:
+                missing = ", ".join(str(batch[int(cue_id) - 1][0] + 1) for cue_id in pending)
+                self.log(f"Re-requesting {len(pending)} missing cue(s) from batch {first}-{last}: block {missing}")
+
+            try:
+                reply = self.request_translations(client, pending, first, last)
+            except BatchTooLarge:
+                self.adjust_batch_size(grow=False, failed_size=len(pending), reason="reply truncated")
+                if len(pending) == 1:
+                    break
+                # Split what is left and translate the halves separately
+                items = list(pending.items())
+                for part in (items[:len(items) // 2], items[len(items) // 2:]):
+                    sub_results = self.translate_cues(client, dict(part), batch, first, last)
+                    if sub_results is None:
+                        return None
+                    results.update(sub_results)
+                return results
+
+            if reply is None:
+                break  # stopped, or retries exhausted
+
+            for cue_id in list(pending):
+                text = reply.get(cue_id)
+                if isinstance(text, str) and text.strip():
+                    results[cue_id] = text.strip()
+                    del pending[cue_id]
+
+        if not self.is_running:
+            return None
+        if not pending:
+            self.adjust_batch_size(grow=True)
+        return results
+
+    def adjust_batch_size(self, grow, failed_size=0, reason=""):
+        new_limit = self.batcher.grow() if grow else self.batcher.shrink(failed_size)
+        if new_limit is not None and not grow:
+            self.log(f"Batch size reduced to {new_limit} cues ({reason}).")
+
+    def request_translations(self, client, cues, first, last):
+        """Send one {id: text} request. Returns {id: translation} or None if it never succeeded."""
+        payload = json.dumps({"cues": cues}, ensure_ascii=False)
+
+        for attempt in range(self.max_retries):
+            if not self.is_running:
+                return None
+            if self.rate_limiter and not self.rate_limiter.acquire(should_continue=lambda: self.is_running):
+                return None
+
+            try:
+                request_args = {}
+                if self.json_mode:
+                    request_args["response_format"] = {"type": "json_object"}
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": self.system_prompt()},
+                        {"role": "user", "content": payload}
+                    ],
+                    temperature=0.3,
+                    **request_args
+                )
+                choice = response.choices[0]
+                if choice.finish_reason == "length":
+                    raise BatchTooLarge()
+                return parse_translations(choice.message.content)
+
+            except BatchTooLarge:
+                raise
+            except Exception as e:
+                err_str = str(e)
+
+                # Check for fatal errors causing immediate stop (No Retry)
+                if "insufficient_quota" in err_str:
+                    raise FatalTranslationError("Quota exceeded (429). Please check your API billing.")
+                if "401" in err_str or getattr(e, "status_code", None) == 401:
+                    raise FatalTranslationError("Authentication failed (401). Check your API Key.")
+
+                # Providers without JSON mode reject response_format; the prompt alone still asks for JSON
+                if self.json_mode and getattr(e, "status_code", None) == 400 and "response_format" in err_str:
+                    self.json_mode = False
+                    self.log("Provider does not support JSON mode; continuing with prompt-only JSON.")
+                    continue
+
+                self.log(f"Batch {first}-{last} failed (Attempt {attempt+1}/{self.max_retries}): {err_str}")
+
+                # Slow replies usually mean the batch is too big for the provider
+                if "Timeout" in type(e).__name__:
+                    self.adjust_batch_size(grow=False, failed_size=len(cues), reason="request timed out")
+
+                if attempt < self.max_retries - 1:
+                    self.sleep_interruptible(self.retry_delay(e, attempt))
+
+        return None
+
+    @staticmethod
+    def retry_delay(error, attempt):
+        status = getattr(error, "status_code", None)
+        response = getattr(error, "response", None)
+        # Honour Retry-After on 429/503 when the server sends one
+        if status in (429, 503) and response is not None:
+            try:
+                return min(60.0, float(response.headers.get("retry-after")))
+            except (TypeError, ValueError):
+                pass
+        if status == 429 or (status is not None and status >= 500):
+            return backoff_delay(attempt, base=2.0)
+        return backoff_delay(attempt, base=1.0, cap=8.0)
+
+    def sleep_interruptible(self, seconds):
+        deadline = time.monotonic() + seconds
+        while self.is_running and time.monotonic() < deadline:
+            time.sleep(min(0.2, deadline - time.monotonic()))
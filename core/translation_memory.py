@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_TM_PATH = os.path.expanduser("~/.cache/macwhisper/translation_memory.sqlite3")
+DEFAULT_MAX_ENTRIES = 200000
+
+
+def prompt_fingerprint(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+
+class TranslationMemory:
+    """On-disk cache of previous translations.
+
+    Entries are keyed by (source text, target language, model, prompt) so a
+    different model or prompt never reuses another's output. Once the table
+    grows past `max_entries`, the least recently used rows are dropped.
+    """
+
+    def __init__(self, path=DEFAULT_TM_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Translation batches run on a thread pool, so one connection is shared behind a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tm (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tm_last_used ON tm(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(source, target_lang, model, prompt):
+        raw = "\x1f".join((source, target_lang, model, prompt))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def lookup(self, texts, target_lang, model, prompt):
+        """Return {text: translation} for every text found in memory."""
+        prompt = prompt_fingerprint(prompt)
+        keys = {self.make_key(t, target_lang, model, prompt): t for t in set(texts)}
+        found = {}
+        with self._lock:
+            key_list = list(keys)
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, translation FROM tm WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, translation in rows:
+                    found[keys[key]] = translation
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE tm SET last_used = ? WHERE key = ?",
+                                       [(now, k) for k, t in keys.items() if t in found])
+                self._conn.commit()
+            self.hits += sum(1 for t in texts if t in found)
+            self.misses += sum(1 for t in texts if t not in found)
+        return found
+
+    def store(self, pairs, target_lang, model, prompt):
+        """Save an iterable of (source, translation) pairs."""
+        prompt = prompt_fingerprint(prompt)
+        now = time.time()
+        rows = [(self.make_key(src, target_lang, model, prompt), src, target_lang, model, prompt, dst, now, now)
+                for src, dst in pairs]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO tm VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM tm WHERE key IN (SELECT key FROM tm ORDER BY last_used ASC LIMIT ?)", (excess,)
+            )
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM tm")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def export_jsonl(self, file_path):
+        """Write every entry as one JSON object per line. Returns the number exported."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, target_lang, model, prompt, translation, created, last_used FROM tm"
+            ).fetchall()
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for source, target_lang, model, prompt, translation, created, last_used in rows:
+                f.write(json.dumps({
+                    "source": source, "target_lang": target_lang, "model": model, "prompt": prompt,
+                    "translation": translation, "created": created, "last_used": last_used,
+                }, ensure_ascii=False) + "\n")
+        return len(rows)
+
+    def import_jsonl(self, file_path):
+        """Merge entries from an export file. Returns the number imported."""
+        rows = []
+        now = time.time()
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                e = json.loads(line)
+                # `prompt` in exports is already the fingerprint
+                key = self.make_key(e["source"], e["target_lang"], e["model"], e["prompt"])
+                rows.append((key, e["source"], e["target_lang"], e["model"], e["prompt"], e["translation"],
+                             e.get("created", now), e.get("last_used", now)))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO tm VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._evict_locked()
+            self._conn.commit()
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,149 @@
+import bisect
+
+import numpy as np
+
+from core.audio_cache import SAMPLE_RATE
+
+FRAME_MS = 30
+# Speech must be this far above the recording's noise floor (10th percentile frame energy)
+THRESHOLD_DB = 12.0
+# ...and never below this absolute level, so near-digital-silence files don't pass hiss as speech
+MIN_LEVEL_DB = -55.0
+MIN_SPEECH_MS = 250  # Drop clicks and bumps
+MIN_SILENCE_MS = 700  # Shorter pauses stay inside a region
+PAD_MS = 200  # Keep word onsets/tails that sit under the threshold
+GAP_MS = 300  # Silence left between regions when they are joined back together
+
+# Below this much silence the pre-pass isn't worth the joins
+MIN_SAVING = 0.1
+
+
+def frame_levels(audio, frame=SAMPLE_RATE * FRAME_MS // 1000):
+    """RMS level in dBFS of each `frame`-sample frame."""
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = np.asarray(audio[:count * frame], dtype=np.float32).reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def detect_speech(audio, threshold_db=THRESHOLD_DB, min_speech_ms=MIN_SPEECH_MS,
+                  min_silence_ms=MIN_SILENCE_MS, pad_ms=PAD_MS):
+    """Energy-based voice activity detection on 16 kHz float audio.
+
+    Returns [(start_sample, end_sample)] of the regions that contain sound
+    above the noise floor, merged across short pauses and padded.
+    """
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    levels = frame_levels(audio, frame)
+    if len(levels) == 0:
+        return []
+    floor = np.percentile(levels, 10)
+    active = levels > max(floor + threshold_db, MIN_LEVEL_DB)
+
+    # Runs of active frames -> [start, end) frame indices
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    regions = []
+    gap = min_silence_ms // FRAME_MS
+    for start, end in zip(starts, ends):
+        if regions and start - regions[-1][1] < gap:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    pad = pad_ms * SAMPLE_RATE // 1000
+    result = []
+    for start, end in regions:
+        if (end - start) * FRAME_MS < min_speech_ms:
+            continue
+        s = max(0, int(start) * frame - pad)
+        e = min(len(audio), int(end) * frame + pad)
+        if result and s <= result[-1][1]:
+            result[-1] = (result[-1][0], e)  # Padding made them touch
+        else:
+            result.append((s, e))
+    return result
+
+
+class SpeechTimeline:
+    """Joins speech regions into one shorter clip and maps its times back."""
+
+    def __init__(self, regions, gap_ms=GAP_MS):
+        self.regions = regions
+        self.gap = gap_ms * SAMPLE_RATE // 1000
+        self.offsets = []  # Start of each region in the joined clip (samples)
+        position = 0
+        for start, end in regions:
+            self.offsets.append(position)
+            position += (end - start) + self.gap
+        self.length = max(0, position - self.gap)
+
+    def join(self, audio):
+        silence = np.zeros(self.gap, dtype=np.float32)
+        parts = []
+        for i, (start, end) in enumerate(self.regions):
+            if i:
+                parts.append(silence)
+            parts.append(np.asarray(audio[start:end], dtype=np.float32))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def to_original(self, seconds):
+        """Joined-clip time -> original time (times inside a gap snap to the end of the region before it)."""
+        sample = seconds * SAMPLE_RATE
+        i = max(0, bisect.bisect_right(self.offsets, sample) - 1)
+        start, end = self.regions[i]
+        offset = sample - self.offsets[i]
+        return float(start + min(max(offset, 0), end - start)) / SAMPLE_RATE
+
+
+def remap_segment(segment, timeline):
+    segment['start'] = timeline.to_original(segment['start'])
+    segment['end'] = timeline.to_original(segment['end'])
+    for word in segment.get('words') or []:
+        word['start'] = timeline.to_original(word['start'])
+        word['end'] = timeline.to_original(word['end'])
+    return segment
+
+
+def remap_result(result, timeline):
+    for segment in result.get('segments', []):
+        remap_segment(segment, timeline)
+    return result
+
+
+def speech_timeline(audio, log=None):
+    """SpeechTimeline of the speech in `audio`, or None when skipping the silence isn't worth it.
+
+    A timeline with no regions means no speech was found at all.
+    """
+    log = log or (lambda msg: None)
+    regions = detect_speech(audio)
+    if not regions:
+        log("VAD: no speech found.")
+        return SpeechTimeline([])
+
+    timeline = SpeechTimeline(regions)
+    total = len(audio) / SAMPLE_RATE
+    kept = timeline.length / SAMPLE_RATE
+    if total and 1 - kept / total < MIN_SAVING:
+        log(f"VAD: {kept / total:.0%} of the audio is speech; transcribing it whole.")
+        return None
+
+    log(f"VAD: {len(regions)} speech regions, {kept:.0f}s of {total:.0f}s "
+        f"({1 - kept / total:.0%} skipped).")
+    return timeline
+
+
+def transcribe_speech(model, audio, log=None, **transcribe_args):
+    """model.transcribe over the speech regions only, with timestamps on the original timeline."""
+    timeline = speech_timeline(audio, log)
+    if timeline is None:
+        return model.transcribe(audio, **transcribe_args)
+    if not timeline.regions:
+        return {"text": "", "segments": [], "language": None}
+    result = model.transcribe(timeline.join(audio), **transcribe_args)
+    return remap_result(result, timeline)
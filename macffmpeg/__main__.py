@@ -0,0 +1,4 @@
+import sys
+from macffmpeg.cli import main
+
+sys.exit(main())
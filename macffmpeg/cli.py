@@ -0,0 +1,369 @@
+"""Headless command line entry point: python -m macffmpeg <command> ...
+
+Drives the same engines as the GUI pages without importing any Qt modules.
+Progress is written to stderr as one JSON object per line; output file paths
+are printed to stdout.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+DEFAULT_BURN_STYLE = {
+    'font_family': 'Arial',
+    'font_size': 24,
+    'font_color': '#FFFFFF',
+    'alignment': 2,
+    'margin_v': 10,
+    'outline': 1,
+    'shadow': 1,
+    'segments': 1,
+    'encoder': 'auto',
+    'encoder_preset': 'balanced',
+    'overlay': False,
+}
+
+
+def emit(event, stage, **fields):
+    record = {"ts": round(time.time(), 3), "event": event, "stage": stage}
+    record.update(fields)
+    sys.stderr.write(json.dumps(record, ensure_ascii=False) + "\n")
+    sys.stderr.flush()
+
+
+def stage_callbacks(stage, file_path):
+    def log(message):
+        emit("log", stage, file=file_path, message=message)
+
+    def progress(percent, **stats):
+        emit("progress", stage, file=file_path, percent=percent, **stats)
+
+    return log, progress
+
+
+def output_path_for(input_path, output_dir, suffix):
+    base = os.path.splitext(os.path.basename(input_path))[0] + suffix
+    return os.path.join(output_dir or os.path.dirname(os.path.abspath(input_path)), base)
+
+
+def transcribe_options(args):
+    return {'vad': args.vad, 'parallel': args.workers, 'stream': args.stream}
+
+
+def run_extract(input_path, args):
+    from core.transcribe import transcribe_file, streams_segments
+    from core.subtitles import write_srt, write_txt, SrtAppender
+
+    log, _ = stage_callbacks("extract", input_path)
+    emit("start", "extract", file=input_path)
+    options = transcribe_options(args)
+
+    partial = None
+    on_segment = None
+    if streams_segments(options):
+        # Segments land in <name>.partial.srt as they are decoded, so a crash keeps them
+        partial_path = output_path_for(input_path, args.output_dir, ".partial.srt")
+        try:
+            partial = SrtAppender(partial_path)
+        except OSError as e:
+            log(f"Can't write {partial_path} ({e}); segments won't be saved as they arrive.")
+
+        def on_segment(segment):
+            if partial is not None:
+                partial.append(segment)
+            emit("segment", "extract", file=input_path, start=round(segment['start'], 3),
+                 end=round(segment['end'], 3), text=segment['text'].strip())
+
+    try:
+        result = transcribe_file(input_path, args.whisper_model, log=log, options=options,
+                                 on_segment=on_segment)
+    finally:
+        if partial is not None:
+            partial.close()
+
+    srt_path = output_path_for(input_path, args.output_dir, ".srt")
+    write_srt(result['segments'], srt_path)
+    if partial is not None:
+        partial.discard()
+    if args.txt:
+        write_txt(result['text'], output_path_for(input_path, args.output_dir, ".txt"))
+    emit("done", "extract", file=input_path, output=srt_path)
+    return srt_path
+
+
+def open_memory(args):
+    from core.translation_memory import TranslationMemory, DEFAULT_TM_PATH
+
+    return TranslationMemory(args.memory or DEFAULT_TM_PATH, max_entries=args.memory_size)
+
+
+def translate_config(args):
+    # SubtitleTranslator keyword arguments
+    return {
+        "api_key": args.api_key or os.environ.get("MACFFMPEG_API_KEY") or os.environ.get("OPENAI_API_KEY", ""),
+        "target_lang": args.lang, "model": args.model, "base_url": args.base_url,
+        "concurrency": args.concurrency, "requests_per_minute": args.rpm,
+        "memory": None if args.no_memory else open_memory(args),
+        "resume": not args.no_resume, "max_batch_size": args.batch_size,
+    }
+
+
+def run_translate(srt_path, args):
+    from core.translate import SubtitleTranslator
+    from core import http_pool
+
+    http_pool.configure(timeout=args.timeout)
+
+    log, progress = stage_callbacks("translate", srt_path)
+    emit("start", "translate", file=srt_path)
+    translator = SubtitleTranslator(log=log, progress=progress, **translate_config(args))
+    content = translator.translate_file(srt_path, output_dir=args.output_dir)
+
+    out_path = output_path_for(srt_path, args.output_dir, f"_{args.lang}.srt")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    translator.discard_checkpoint()
+    emit("done", "translate", file=srt_path, output=out_path)
+    return out_path
+
+
+def burn_config(args):
+    config = dict(DEFAULT_BURN_STYLE)
+    for key in DEFAULT_BURN_STYLE:
+        value = getattr(args, key, None)
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def run_burn(video_path, subtitle_path, output_path, args):
+    from core.burn import SubtitleBurner
+
+    if not output_path:
+        _, ext = os.path.splitext(video_path)
+        output_path = output_path_for(video_path, args.output_dir, "_subbed" + ext)
+
+    log, progress = stage_callbacks("burn", video_path)
+    emit("start", "burn", file=video_path, subtitle=subtitle_path)
+    if not SubtitleBurner(video_path, subtitle_path, output_path, burn_config(args), log=log, progress=progress).run():
+        raise RuntimeError("Burning was interrupted.")
+    emit("done", "burn", file=video_path, output=output_path)
+    return output_path
+
+
+def run_mux(video_path, subtitle_paths, output_path, args):
+    from core.mux import SubtitleMuxer, MOV_TEXT_CONTAINERS
+
+    if not output_path:
+        _, ext = os.path.splitext(video_path)
+        if ext.lower() not in MOV_TEXT_CONTAINERS + (".mkv",):
+            ext = ".mkv"
+        output_path = output_path_for(video_path, args.output_dir, "_subbed" + ext)
+
+    langs = list(args.track_lang or [])
+    tracks = [(path, langs[i] if i < len(langs) else "") for i, path in enumerate(subtitle_paths)]
+
+    log, progress = stage_callbacks("mux", video_path)
+    emit("start", "mux", file=video_path, subtitles=subtitle_paths)
+    if not SubtitleMuxer(video_path, tracks, output_path, log=log, progress=progress).run():
+        raise RuntimeError("Muxing was interrupted.")
+    emit("done", "mux", file=video_path, output=output_path)
+    return output_path
+
+
+def cmd_extract(args):
+    for input_path in args.inputs:
+        print(run_extract(input_path, args))
+
+
+def cmd_translate(args):
+    for srt_path in args.inputs:
+        print(run_translate(srt_path, args))
+
+
+def cmd_burn(args):
+    print(run_burn(args.video, args.subtitle, args.output, args))
+
+
+def cmd_mux(args):
+    print(run_mux(args.video, args.subtitles, args.output, args))
+
+
+def cmd_encoders(args):
+    from core.encoders import ENCODERS, available_encoders, probe_capabilities
+
+    caps = probe_capabilities()
+    usable = available_encoders(caps)
+    for name, profile in ENCODERS.items():
+        state = "available" if name in usable else ("no hardware" if name in caps["encoders"] else "not built in")
+        print(f"{name:20} {profile['label']:30} {state}")
+    if "subtitles" not in caps["filters"]:
+        print("warning: this ffmpeg has no 'subtitles' filter (libass); burning will not work", file=sys.stderr)
+
+
+def cmd_pipeline(args):
+    from core.pipeline import Pipeline
+    from core import http_pool
+
+    http_pool.configure(timeout=args.timeout)
+
+    def log(stage, index, message):
+        emit("log", stage or "pipeline", file=args.inputs[index] if index is not None else None, message=message)
+
+    def progress(stage, index, percent):
+        emit("progress", stage, file=args.inputs[index], percent=percent)
+
+    def status(index, text):
+        emit("status", "pipeline", file=args.inputs[index], status=text)
+
+    # Stages overlap across inputs: one file transcribes while the previous translates and burns
+    pipeline = Pipeline(args.inputs, args.whisper_model, translate_config(args),
+                        burn_config=None if args.no_burn else burn_config(args), output_dir=args.output_dir,
+                        transcribe_options=transcribe_options(args), log=log, progress=progress, status=status)
+    items = pipeline.run()
+    emit("stats", "pipeline", utilization={stage: round(value, 3) for stage, value in pipeline.utilization().items()})
+
+    failed = [item for item in items if item.error is not None]
+    for item in items:
+        if item.error is None:
+            print(item.translated_path if args.no_burn else item.output_path)
+        else:
+            emit("error", "pipeline", file=item.path, message=item.error)
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(items)} files failed")
+
+
+def cmd_tm(args):
+    memory = open_memory(args)
+    if args.action == "stats":
+        emit("stats", "tm", entries=memory.count(), path=memory.path)
+    elif args.action == "export":
+        emit("done", "tm", exported=memory.export_jsonl(args.file), output=args.file)
+    elif args.action == "import":
+        emit("done", "tm", imported=memory.import_jsonl(args.file), entries=memory.count())
+    elif args.action == "clear":
+        memory.clear()
+        emit("done", "tm", entries=0)
+
+
+def add_memory_args(parser):
+    from core.translation_memory import DEFAULT_MAX_ENTRIES
+
+    parser.add_argument("--memory", default=None, help="Translation memory database (default: ~/.cache/macwhisper)")
+    parser.add_argument("--memory-size", type=int, default=DEFAULT_MAX_ENTRIES, help="Max translation memory entries")
+
+
+def add_extract_args(parser):
+    parser.add_argument("--whisper-model", default="base", help="Whisper model name (default: base)")
+    parser.add_argument("--txt", action="store_true", help="Also write a plain .txt transcript")
+    parser.add_argument("--vad", action="store_true", help="Skip silence: only transcribe detected speech")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Transcribe long audio in chunks across N CPU processes, "
+                             "each with its own model copy (default: 0 = single process)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Decode in ~60s windows and emit segments as they finish; the text may "
+                             "differ slightly from a whole-file pass")
+
+
+def add_translate_args(parser):
+    parser.add_argument("--lang", required=True, help="Target language, e.g. 'Simplified Chinese'")
+    parser.add_argument("--model", default="gpt-3.5-turbo", help="Chat model name")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible base URL")
+    parser.add_argument("--api-key", default=None,
+                        help="API key (defaults to $MACFFMPEG_API_KEY or $OPENAI_API_KEY)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches in flight at once (default: 4)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="API request timeout in seconds")
+    parser.add_argument("--batch-size", type=int, default=18, help="Upper bound on cues per request (default: 18)")
+    parser.add_argument("--rpm", type=float, default=None, help="Request-per-minute limit for the provider")
+    parser.add_argument("--no-memory", action="store_true", help="Do not consult or update the translation memory")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore and overwrite any existing checkpoint")
+    add_memory_args(parser)
+
+
+def add_burn_args(parser):
+    parser.add_argument("--font", dest="font_family", default=None)
+    parser.add_argument("--font-size", dest="font_size", type=int, default=None)
+    parser.add_argument("--color", dest="font_color", default=None, help="Font colour as #RRGGBB")
+    parser.add_argument("--alignment", type=int, default=None, help="ASS alignment (2 = bottom center)")
+    parser.add_argument("--margin-v", dest="margin_v", type=int, default=None)
+    parser.add_argument("--outline", type=int, default=None)
+    parser.add_argument("--shadow", type=int, default=None)
+    parser.add_argument("--segments", type=int, default=None,
+                        help="Split at keyframes and encode this many segments in parallel (1 = off)")
+    parser.add_argument("--encoder", default=None, help="Video encoder, or 'auto' (see the 'encoders' command)")
+    parser.add_argument("--encoder-preset", dest="encoder_preset", default=None,
+                        choices=["fast", "balanced", "quality"])
+    parser.add_argument("--overlay", action="store_true", default=None,
+                        help="Pre-render subtitles once (cached) and overlay them only while on screen")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="macffmpeg", description="Subtitle extraction, translation and burning")
+    parser.add_argument("--output-dir", default=None, help="Write outputs here instead of next to the inputs")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extract", help="Transcribe media files to .srt")
+    p.add_argument("inputs", nargs="+")
+    add_extract_args(p)
+    p.set_defaults(func=cmd_extract)
+
+    p = sub.add_parser("translate", help="Translate .srt files")
+    p.add_argument("inputs", nargs="+")
+    add_translate_args(p)
+    p.set_defaults(func=cmd_translate)
+
+    p = sub.add_parser("burn", help="Burn a subtitle file into a video")
+    p.add_argument("video")
+    p.add_argument("subtitle")
+    p.add_argument("-o", "--output", default=None)
+    add_burn_args(p)
+    p.set_defaults(func=cmd_burn)
+
+    p = sub.add_parser("mux", help="Add subtitle files as selectable tracks without re-encoding")
+    p.add_argument("video")
+    p.add_argument("subtitles", nargs="+", help="One file per track; the first is the default track")
+    p.add_argument("-o", "--output", default=None, help="MP4/MOV (mov_text) or MKV (srt/ass) output")
+    p.add_argument("--track-lang", action="append", default=None,
+                   help="Language of each track in order (name or ISO 639-2 code); repeat per track")
+    p.set_defaults(func=cmd_mux)
+
+    p = sub.add_parser("encoders", help="List the video encoders this ffmpeg build can use")
+    p.set_defaults(func=cmd_encoders)
+
+    p = sub.add_parser("pipeline", help="Extract, translate and burn each input, overlapping the stages across inputs")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("--no-burn", action="store_true", help="Stop after translation")
+    add_extract_args(p)
+    add_translate_args(p)
+    add_burn_args(p)
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("tm", help="Inspect or transfer the translation memory")
+    p.add_argument("action", choices=["stats", "export", "import", "clear"])
+    p.add_argument("file", nargs="?", help="JSON Lines file for export/import")
+    add_memory_args(p)
+    p.set_defaults(func=cmd_tm)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "tm" and args.action in ("export", "import") and not args.file:
+        parser.error(f"tm {args.action} needs a FILE")
+    # Render nodes and cron jobs often lack the Homebrew paths the GUI adds
+    os.environ["PATH"] += os.pathsep + "/usr/local/bin" + os.pathsep + "/opt/homebrew/bin"
+    try:
+        if args.output_dir:
+            # Before any work, so a paid translation can't fail at the final write
+            os.makedirs(args.output_dir, exist_ok=True)
+        args.func(args)
+    except KeyboardInterrupt:
+        emit("error", args.command, message="Interrupted")
+        return 130
+    except Exception as e:
+        emit("error", args.command, message=str(e))
+        return 1
+    return 0
@@ -1,6 +1,7 @@
 import sys
 import os
 import traceback
+import multiprocessing
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, 
     QListWidget, QStackedWidget, QMessageBox, QAbstractItemView
@@ -14,6 +15,7 @@ from ui.models import ModelsPage
 from ui.translation import TranslationPage
 from ui.apikeys import APIKeysPage
 from ui.burning import SubtitleBurningPage
+from ui.pipeline import PipelinePage
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -47,6 +49,7 @@ class MainWindow(QMainWindow):
         self.sidebar.addItem("🎬 Extraction")
         self.sidebar.addItem("🌐 Translation")
         self.sidebar.addItem("🔥 Burn Subtitles")
+        self.sidebar.addItem("🚀 Pipeline")
         self.sidebar.addItem("📦 Models")
         self.sidebar.addItem("🔑 API Keys")
         self.sidebar.addItem("⚙️ Settings")
@@ -69,15 +72,19 @@ class MainWindow(QMainWindow):
         self.page_burning = SubtitleBurningPage()
         self.pages.addWidget(self.page_burning)
         
-        # Page 4: Models
+        # Page 4: Pipeline (uses the settings of the three pages above)
+        self.page_pipeline = PipelinePage(self.page_extraction, self.page_translation, self.page_burning)
+        self.pages.addWidget(self.page_pipeline)
+        
+        # Page 5: Models
         self.page_models = ModelsPage()
         self.pages.addWidget(self.page_models)
         
-        # Page 5: API Keys
+        # Page 6: API Keys
         self.page_apikeys = APIKeysPage()
         self.pages.addWidget(self.page_apikeys)
         
-        # Page 6: Settings
+        # Page 7: Settings
         self.page_settings = SettingsPage()
         self.page_settings.style_changed.connect(self.apply_styles) # Re-apply styles
         self.pages.addWidget(self.page_settings)
@@ -209,6 +216,8 @@ class MainWindow(QMainWindow):
         """)
 
 if __name__ == '__main__':
+    # Parallel transcription spawns worker processes; the bundled app must not start a GUI in them
+    multiprocessing.freeze_support()
     # 1. Environment Fix
     # GUI apps launched from Finder often don't have /usr/local/bin or /opt/homebrew/bin in PATH
     os.environ["PATH"] += os.pathsep + "/usr/local/bin" + os.pathsep + "/opt/homebrew/bin"
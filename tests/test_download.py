@@ -0,0 +1,206 @@
+"""ModelDownloader against a local HTTP server (run: python -m unittest discover -s tests)."""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from unittest import mock
+
+import core.download as download
+from core.download import ModelDownloader
+
+DATA = os.urandom(3 * 1024 * 1024 + 123)
+SHA = hashlib.sha256(DATA).hexdigest()
+DROP_AFTER = 200 * 1024  # Bytes sent before a dropped connection hangs up
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves DATA, honouring Range / If-Range unless the server's `ranges` flag is off."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            drop = server.drops > 0
+            if drop:
+                server.drops -= 1
+        start, end = 0, len(DATA) - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        partial = bool(match) and server.ranges and (if_range is None or if_range == server.etag)
+        if partial:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+        body = DATA[start:end + 1]
+        self.send_response(206 if partial else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", server.etag)
+        if partial:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+        self.end_headers()
+        try:
+            if drop and len(body) > DROP_AFTER:
+                # Connection lost part-way through the body
+                self.wfile.write(body[:DROP_AFTER])
+                self.close_connection = True
+                return
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        pass  # Clients hang up on purpose when stopped or handed a whole file
+
+
+class ModelDownloaderTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = Server()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/models/{SHA}/test.pt"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.ranges = True
+        self.server.drops = 0
+        self.server.requests = 0
+        self.server.etag = '"v1"'
+        self.directory = tempfile.mkdtemp()
+        self.target = os.path.join(self.directory, "test.pt")
+        self.logs = []
+        # Small enough that DATA is fetched over several ranges
+        patches = [mock.patch.object(download, "MIN_SPLIT_BYTES", 512 * 1024),
+                   mock.patch.object(download.time, "sleep", lambda seconds: None)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def downloader(self, url=None, stop_after=None, **kwargs):
+        downloader = ModelDownloader(url or self.url, self.target, chunk_size=64 * 1024,
+                                     log=self.logs.append, **kwargs)
+        if stop_after is not None:
+            # Stop once this many bytes are in, like the Stop button would
+            def progress(percent, downloaded=0, **stats):
+                if downloaded > stop_after:
+                    downloader.stop()
+            downloader.progress = progress
+            downloader.report = lambda force=False: ModelDownloader.report(downloader, force=True)
+        return downloader
+
+    def assertComplete(self):
+        with open(self.target, 'rb') as f:
+            self.assertEqual(f.read(), DATA)
+        self.assertFalse(os.path.exists(download.part_path(self.target)))
+        self.assertFalse(os.path.exists(download.state_path(self.target)))
+
+    def test_sha256_from_url(self):
+        self.assertEqual(download.expected_sha256(self.url), SHA)
+        self.assertIsNone(download.expected_sha256("https://example.com/model.pt"))
+
+    def test_parallel_ranges(self):
+        progress = []
+        downloader = self.downloader(connections=4,
+                                     progress=lambda percent, **stats: progress.append(percent))
+        self.assertEqual(downloader.run(), self.target)
+        self.assertComplete()
+        self.assertEqual(progress[-1], 100)
+        self.assertTrue(any("over 4 connections" in line for line in self.logs))
+
+    def test_dropped_connections_are_retried(self):
+        self.server.drops = 3
+        self.assertEqual(self.downloader().run(), self.target)
+        self.assertComplete()
+        self.assertTrue(any("Connection lost" in line for line in self.logs))
+
+    def test_stop_then_resume(self):
+        self.assertIsNone(self.downloader(connections=3, stop_after=1024 * 1024).run())
+        self.assertFalse(os.path.exists(self.target))
+        with open(download.state_path(self.target), encoding='utf-8') as f:
+            state = json.load(f)
+        done = sum(r[2] for r in state['ranges'])
+        self.assertGreater(done, 0)
+        self.assertLess(done, len(DATA))
+
+        self.server.requests = 0
+        self.assertEqual(self.downloader().run(), self.target)
+        self.assertComplete()
+        self.assertTrue(any(line.startswith("Resuming at") for line in self.logs))
+
+    def test_single_stream_part_is_resumed(self):
+        with open(download.part_path(self.target), 'wb') as f:
+            f.write(DATA[:1000000])
+        self.assertEqual(self.downloader().run(), self.target)
+        self.assertComplete()
+        self.assertTrue(any(line.startswith("Resuming at 1.0") for line in self.logs))
+
+    def test_server_without_ranges(self):
+        self.server.ranges = False
+        self.assertEqual(self.downloader().run(), self.target)
+        self.assertComplete()
+        self.assertEqual(self.server.requests, 2)  # The probe, then one full download
+
+    def test_range_ignored_on_resume_falls_back_to_whole_file(self):
+        self.assertIsNone(self.downloader(connections=2, stop_after=1024 * 1024).run())
+        self.server.ranges = False
+        self.assertEqual(self.downloader().run(), self.target)
+        self.assertComplete()
+
+    def test_range_ignored_mid_download_falls_back_to_whole_file(self):
+        # The probe gets a 206, every range request after it a 200
+        downloader = self.downloader()
+        probe = downloader.probe
+
+        def probe_then_disable():
+            result = probe()
+            self.server.ranges = False
+            return result
+        downloader.probe = probe_then_disable
+        self.assertEqual(downloader.run(), self.target)
+        self.assertComplete()
+        self.assertTrue(any("ignored the Range request" in line for line in self.logs))
+
+    def test_changed_file_starts_over(self):
+        self.assertIsNone(self.downloader(connections=2, stop_after=1024 * 1024).run())
+        self.server.etag = '"v2"'
+        self.assertEqual(self.downloader().run(), self.target)
+        self.assertComplete()
+        self.assertTrue(any("changed" in line for line in self.logs))
+
+    def test_checksum_mismatch_is_discarded(self):
+        url = self.url.replace(SHA, "0" * 64)
+        with self.assertRaises(ValueError):
+            self.downloader(url).run()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_explicit_checksum_without_one_in_the_url(self):
+        url = f"http://127.0.0.1:{self.server.server_port}/plain/test.pt"
+        with self.assertRaises(ValueError):
+            self.downloader(url, sha256="f" * 64).run()
+        self.assertEqual(self.downloader(url, sha256=SHA.upper()).run(), self.target)
+        self.assertComplete()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+"""SubtitleTranslator against a fake OpenAI client (run: python -m unittest discover -s tests)."""
+import json
+import threading
+import unittest
+from types import SimpleNamespace
+
+from core.translate import SubtitleTranslator, FatalTranslationError
+
+SRT = """1
+00:00:01,000 --> 00:00:02,000
+Hello
+
+2
+00:00:02,500 --> 00:00:04,000
+How are you?
+
+3
+00:00:04,500 --> 00:00:06,000
+Goodbye"""
+
+
+class APIError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def reply(content, finish_reason="stop"):
+    return SimpleNamespace(choices=[SimpleNamespace(finish_reason=finish_reason,
+                                                    message=SimpleNamespace(content=content))])
+
+
+class FakeClient:
+    """Stands in for openai.OpenAI; `handler(cues, kwargs)` returns a reply or raises."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        cues = json.loads(kwargs["messages"][1]["content"])["cues"]
+        with self._lock:
+            self.requests.append((cues, kwargs))
+            number = len(self.requests)
+        return self.handler(number, cues, kwargs)
+
+
+def upper(cues):
+    return reply(json.dumps({"translations": {cue_id: text.upper() for cue_id, text in cues.items()}}))
+
+
+def make_translator(**kwargs):
+    translator = SubtitleTranslator("key", "French", concurrency=1, **kwargs)
+    translator.retry_delay = lambda error, attempt: 0
+    return translator
+
+
+class TranslateWithTest(unittest.TestCase):
+    def test_translates_in_order(self):
+        client = FakeClient(lambda n, cues, kwargs: upper(cues))
+        result = make_translator().translate_with(client, None, SRT, None)
+        self.assertEqual(result, SRT.replace("Hello", "HELLO").replace("How are you?", "HOW ARE YOU?")
+                         .replace("Goodbye", "GOODBYE"))
+        self.assertEqual(len(client.requests), 1)
+        self.assertEqual(client.requests[0][1]["response_format"], {"type": "json_object"})
+
+    def test_missing_ids_are_requested_again(self):
+        def handler(n, cues, kwargs):
+            if n == 1:
+                cues = {cue_id: text for cue_id, text in cues.items() if cue_id != "2"}
+            return upper(cues)
+
+        client = FakeClient(handler)
+        result = make_translator().translate_with(client, None, SRT, None)
+        self.assertIn("HOW ARE YOU?", result)
+        self.assertEqual(client.requests[1][0], {"2": "How are you?"})
+
+    def test_list_replies_in_a_code_fence(self):
+        def handler(n, cues, kwargs):
+            items = [{"id": cue_id, "text": text.upper()} for cue_id, text in cues.items()]
+            return reply("```json\n" + json.dumps({"translations": items}) + "\n```")
+
+        result = make_translator().translate_with(FakeClient(handler), None, SRT, None)
+        self.assertIn("GOODBYE", result)
+
+    def test_cue_still_missing_after_repairs_keeps_the_original(self):
+        def handler(n, cues, kwargs):
+            return upper({cue_id: text for cue_id, text in cues.items() if cue_id != "3"})
+
+        translator = make_translator()
+        client = FakeClient(handler)
+        result = translator.translate_with(client, None, SRT, None)
+        self.assertIn("HELLO", result)
+        self.assertIn("Goodbye", result)
+        self.assertEqual(len(client.requests), 1 + translator.repair_rounds)
+
+    def test_failed_request_is_retried(self):
+        def handler(n, cues, kwargs):
+            if n == 1:
+                raise APIError("Internal Server Error", status_code=500)
+            return upper(cues)
+
+        client = FakeClient(handler)
+        result = make_translator().translate_with(client, None, SRT, None)
+        self.assertIn("HELLO", result)
+        self.assertEqual(len(client.requests), 2)
+
+    def test_unparseable_reply_is_retried(self):
+        def handler(n, cues, kwargs):
+            return reply("Sorry, I can't do that.") if n == 1 else upper(cues)
+
+        result = make_translator().translate_with(FakeClient(handler), None, SRT, None)
+        self.assertIn("HELLO", result)
+
+    def test_retries_exhausted_keep_the_original(self):
+        def handler(n, cues, kwargs):
+            raise APIError("Bad Gateway", status_code=502)
+
+        translator = make_translator()
+        translator.max_retries = 2
+        client = FakeClient(handler)
+        self.assertEqual(translator.translate_with(client, None, SRT, None), SRT)
+        self.assertEqual(len(client.requests), 2)
+
+    def test_json_mode_is_dropped_when_rejected(self):
+        def handler(n, cues, kwargs):
+            if "response_format" in kwargs:
+                raise APIError("Unrecognized request argument: response_format", status_code=400)
+            return upper(cues)
+
+        translator = make_translator()
+        client = FakeClient(handler)
+        self.assertIn("HELLO", translator.translate_with(client, None, SRT, None))
+        self.assertFalse(translator.json_mode)
+        self.assertNotIn("response_format", client.requests[-1][1])
+
+    def test_bad_key_is_fatal(self):
+        def handler(n, cues, kwargs):
+            raise APIError("Error code: 401 - invalid api key", status_code=401)
+
+        client = FakeClient(handler)
+        with self.assertRaises(FatalTranslationError):
+            make_translator().translate_with(client, None, SRT, None)
+        self.assertEqual(len(client.requests), 1)
+
+    def test_truncated_reply_splits_the_batch(self):
+        def handler(n, cues, kwargs):
+            if len(cues) > 1:
+                return reply('{"translations": {"1": "HEL', finish_reason="length")
+            return upper(cues)
+
+        client = FakeClient(handler)
+        result = make_translator().translate_with(client, None, SRT, None)
+        self.assertIn("HOW ARE YOU?", result)
+        self.assertIn("GOODBYE", result)
+        # 3 cues -> 1 + 2 -> 1 + 1
+        self.assertEqual([len(cues) for cues, _ in client.requests], [3, 1, 2, 1, 1])
+
+    def test_duplicate_cues_are_sent_once(self):
+        content = SRT.replace("Goodbye", "Hello")
+        client = FakeClient(lambda n, cues, kwargs: upper(cues))
+        result = make_translator().translate_with(client, None, content, None)
+        self.assertEqual(result.count("HELLO"), 2)
+        self.assertEqual(sorted(client.requests[0][0].values()), ["Hello", "How are you?"])
+
+
+if __name__ == "__main__":
+    unittest.main()
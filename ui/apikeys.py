@@ -1,6 +1,6 @@
 import json
 import time
-import requests
+from core.http_pool import get_client
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QListWidgetItem, 
     QStackedWidget, QLineEdit, QGroupBox, QPushButton, QFormLayout, 
@@ -416,6 +416,27 @@ class APIKeysPage(QWidget):
         
         form_layout.addLayout(batch_layout)
 
+        # Concurrency / Rate Limit (Common to all)
+        for field_key, field_label, placeholder, helper_text in [
+            ("concurrency", "并发请求数", "4", "同时发送的批次数量。服务商限流较严格时请调低。"),
+            ("rpm", "每分钟请求上限 (RPM)", "不限制", "按服务商的速率限制填写，留空表示不限制。"),
+        ]:
+            extra_layout = QVBoxLayout()
+            extra_layout.setSpacing(8)
+            extra_input = QLineEdit()
+            extra_input.setPlaceholderText(placeholder)
+            extra_input.setText(self.service_configs.get(key, {}).get(field_key, ""))
+            extra_input.textChanged.connect(
+                lambda val, s=key, k=field_key: self.update_config(s, k, val)
+            )
+            extra_helper = QLabel(helper_text)
+            extra_helper.setStyleSheet("color: #666; font-size: 11px; font-weight: normal; border: none;")
+
+            extra_layout.addWidget(QLabel(field_label))
+            extra_layout.addWidget(extra_input)
+            extra_layout.addWidget(extra_helper)
+            form_layout.addLayout(extra_layout)
+
         # Explicit Save Button (Optional but reassuring)
         save_btn_layout = QHBoxLayout()
         save_btn_layout.addStretch()
@@ -485,7 +506,8 @@ class APIKeysPage(QWidget):
             
             QMessageBox.information(self, "测试中", f"正在连接服务器测试...\nURL: {url}/chat/completions")
             
-            response = requests.post(f"{url}/chat/completions", headers=headers, json=data, timeout=10)
+            # Same pooled connection the translation jobs use, so a test also warms it up
+            response = get_client(api_key, base_url).post(f"{url}/chat/completions", headers=headers, json=data, timeout=10)
             
             if response.status_code == 200:
                 res_json = response.json()
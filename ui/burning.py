@@ -2,127 +2,87 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QPushButton, QFileDialog, QProgressBar, 
     QMessageBox, QGroupBox, QSpinBox, QColorDialog, QLineEdit,
-    QFontComboBox, QComboBox, QGridLayout
+    QFontComboBox, QComboBox, QGridLayout, QDoubleSpinBox, QCheckBox
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSettings
-from PyQt6.QtGui import QColor, QFont
+from PyQt6.QtGui import QColor, QFont, QPixmap
 import signal
 import os
-import subprocess
-import shutil
 import tempfile
+import time
+from core.burn import SubtitleBurner, render_preview
+from core.subtitles import first_cue_time
+from core.mux import SubtitleMuxer, MOV_TEXT_CONTAINERS
+from core.scheduler import SCHEDULER, ENCODE_MEMORY_MB
+from core.encoders import ENCODERS, PRESETS, DEFAULT_PRESET, available_encoders
 
 class BurningWorker(QThread):
-    progress = pyqtSignal(int)
+    progress = pyqtSignal(int, dict) # percent (-1 = unknown), {fps, speed, eta, out_seconds, duration}
     log = pyqtSignal(str)
     finished = pyqtSignal()
     error = pyqtSignal(str)
 
     def __init__(self, video_path, subtitle_path, output_path, config):
         super().__init__()
-        self.video_path = video_path
-        self.subtitle_path = subtitle_path
-        self.output_path = output_path
-        self.config = config # Dict containing all style params
-        self.is_running = True
+        progress = lambda pct, **stats: self.progress.emit(pct, stats)
+        if config.get('mode') == 'mux':
+            # Soft subtitles: the selected file plus any extra language tracks
+            tracks = [(path, "") for path in [subtitle_path] + config.get('extra_tracks', [])]
+            self.burner = SubtitleMuxer(video_path, tracks, output_path, log=self.log.emit, progress=progress)
+        else:
+            self.burner = SubtitleBurner(
+                video_path, subtitle_path, output_path, config, # Dict containing all style params
+                log=self.log.emit, progress=progress
+            )
 
     def run(self):
         try:
-            self.log.emit("Starting subtitle burning...")
-            
-            font_color = self.config.get('font_color')
-            # Convert color to FFmpeg format: &HBBGGRR&
-            ffmpeg_color = f"&H{font_color.blue():02X}{font_color.green():02X}{font_color.red():02X}&"
-            
-            # Escape paths
-            srt_path_escaped = self.subtitle_path.replace(":", "\\:").replace("'", "'\\''")
-            
-            # Escape font name
-            font_family = self.config.get('font_family', 'Arial')
-            font_family_safe = font_family.replace(":", "\\:").replace("'", "")
-            
-            # Extract other params
-            font_size = self.config.get('font_size', 24)
-            alignment = self.config.get('alignment', 2)
-            margin_v = self.config.get('margin_v', 10)
-            outline = self.config.get('outline', 1)
-            shadow = self.config.get('shadow', 1)
-            
-            # Construct Filter string
-            style = (f"FontName={font_family_safe},FontSize={font_size},PrimaryColour={ffmpeg_color},"
-                     f"Alignment={alignment},MarginV={margin_v},Outline={outline},Shadow={shadow}")
-            
-            vf_string = f"subtitles='{srt_path_escaped}':force_style='{style}'"
-            
-            self.log.emit(f"Using Font: {font_family}")
-            self.log.emit(f"Font Size: {font_size}")
-            self.log.emit(f"Style Config: {style}")
-            
-            # Auto-detect encoder based on architecture
-            import platform
-            arch = platform.machine()
-            if arch == 'arm64':
-                encoder = "h264_videotoolbox"
-                encoder_opts = ["-b:v", "6000k"]
-                self.log.emit("Detected Apple Silicon (arm64): Using Hardware Acceleration")
-            else:
-                encoder = "libx264"
-                # CRF 23 is standard for high quality, preset fast for speed
-                encoder_opts = ["-crf", "23", "-preset", "fast"] 
-                self.log.emit(f"Detected Intel ({arch}): Using CPU Software Encoding (Compatibility Mode)")
-            
-            cmd = [
-                "ffmpeg",
-                "-y", # Overwrite output
-                "-i", self.video_path,
-                "-vf", vf_string,
-                "-c:v", encoder,
-            ] + encoder_opts + [
-                "-pix_fmt", "yuv420p", # Essential for compatibility
-                "-c:a", "aac", # Re-encode audio to AAC
-                self.output_path
-            ]
-            
-            self.log.emit(f"Executing: {' '.join(cmd)}")
-            
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
-            
-            # Monitor process
-            self.process = process
-            for line in process.stdout:
-                if not self.is_running:
-                    # Kill gracefully then forceful
-                    process.terminate()
-                    try:
-                        process.wait(timeout=1)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
-                    self.log.emit("Process stopped by user.")
-                    return # Exit run()
-
-                if "frame=" in line or "time=" in line:
-                    self.log.emit(line.strip())
-                
-            ret_code = process.wait()
-            if ret_code == 0:
-                self.finished.emit()
-            elif ret_code != -15 and ret_code != -9: # != SIGTERM/SIGKILL (user stop)
-                self.error.emit(f"FFmpeg finished with error code {ret_code}")
-
+            # Muxing only copies streams; burning competes for the encoder
+            lease = None
+            if isinstance(self.burner, SubtitleBurner):
+                lease = SCHEDULER.acquire("encoder", owner="burning", memory_mb=ENCODE_MEMORY_MB, log=self.log.emit,
+                                          should_continue=lambda: self.burner.is_running)
+                if lease is None:
+                    return
+            try:
+                if self.burner.run():
+                    self.finished.emit()
+            finally:
+                if lease is not None:
+                    lease.release()
         except Exception as e:
-            if self.is_running: # Only emit error if not manually stopped
+            if self.burner.is_running: # Only emit error if not manually stopped
                 self.error.emit(str(e))
 
     def stop(self):
-        self.is_running = False
-        # If waiting on IO, we might need to kill from here too if thread is blocked
-        if hasattr(self, 'process') and self.process.poll() is None:
-             self.process.terminate()
+        self.burner.stop()
+
+class PreviewWorker(QThread):
+    finished = pyqtSignal(str, float) # image path, seconds taken
+    error = pyqtSignal(str)
+
+    def __init__(self, video_path, subtitle_path, config, at_seconds, image_path):
+        super().__init__()
+        self.args = (video_path, subtitle_path, config, at_seconds, image_path)
+
+    def run(self):
+        try:
+            started = time.monotonic()
+            path = render_preview(*self.args)
+            self.finished.emit(path, time.monotonic() - started)
+        except Exception as e:
+            self.error.emit(str(e))
+
+class EncoderProbeWorker(QThread):
+    # The first probe runs a short test encode per encoder, far too slow for the GUI thread
+    finished = pyqtSignal(list) # usable encoder names
+
+    def run(self):
+        try:
+            names = available_encoders()
+        except Exception:
+            names = []
+        self.finished.emit(names)
 
 class SubtitleBurningPage(QWidget):
     def __init__(self):
@@ -164,6 +124,32 @@ class SubtitleBurningPage(QWidget):
         sub_layout.addWidget(self.sub_label)
         input_layout.addLayout(sub_layout)
         
+        # Extra subtitle tracks (soft subtitle mode only)
+        extra_layout = QHBoxLayout()
+        self.extra_btn = QPushButton("Add Tracks")
+        self.extra_btn.setToolTip("More subtitle files to embed as extra language tracks")
+        self.extra_btn.clicked.connect(self.add_extra_tracks)
+        extra_layout.addWidget(self.extra_btn)
+        self.extra_clear_btn = QPushButton("Clear")
+        self.extra_clear_btn.clicked.connect(self.clear_extra_tracks)
+        extra_layout.addWidget(self.extra_clear_btn)
+        self.extra_label = QLabel("No extra tracks")
+        self.extra_label.setStyleSheet("color: #888;")
+        extra_layout.addWidget(self.extra_label)
+        input_layout.addLayout(extra_layout)
+        self.extra_tracks = []
+
+        # Output mode
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("Output:"))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("Burn In (re-encode)", "burn")
+        self.mode_combo.addItem("Soft Subtitles (no re-encode)", "mux")
+        self.mode_combo.currentIndexChanged.connect(self.update_mode)
+        mode_layout.addWidget(self.mode_combo)
+        mode_layout.addStretch()
+        input_layout.addLayout(mode_layout)
+
         input_group.setLayout(input_layout)
         layout.addWidget(input_group)
 
@@ -225,14 +211,71 @@ class SubtitleBurningPage(QWidget):
         self.outline_spin.setValue(1)
         style_layout.addWidget(self.outline_spin, 2, 3)
         
+        # Row 3: Parallel segments & Shadow
+        style_layout.addWidget(QLabel("Parallel:"), 3, 0)
+        self.segments_spin = QSpinBox()
+        self.segments_spin.setRange(1, 64)
+        self.segments_spin.setValue(1)
+        self.segments_spin.setSuffix(" segments")
+        self.segments_spin.setToolTip("Split the video at keyframes and encode the pieces at the same time (1 = off)")
+        style_layout.addWidget(self.segments_spin, 3, 1)
+
         style_layout.addWidget(QLabel("Shadow:"), 3, 2)
         self.shadow_spin = QSpinBox()
         self.shadow_spin.setRange(0, 20)
         self.shadow_spin.setValue(1)
         style_layout.addWidget(self.shadow_spin, 3, 3)
         
+        # Row 4: Encoder & Preset (only what the installed ffmpeg can actually use)
+        style_layout.addWidget(QLabel("Encoder:"), 4, 0)
+        self.encoder_combo = QComboBox()
+        self.encoder_combo.addItem("Auto", "auto")
+        self.encoder_combo.setToolTip("Checking which encoders work...")
+        style_layout.addWidget(self.encoder_combo, 4, 1)
+        self.encoders_probed = False
+        self.probe_worker = EncoderProbeWorker()
+        self.probe_worker.finished.connect(self.on_encoders_probed)
+
+        style_layout.addWidget(QLabel("Preset:"), 4, 2)
+        self.preset_combo = QComboBox()
+        for preset in PRESETS:
+            self.preset_combo.addItem(preset.capitalize(), preset)
+        style_layout.addWidget(self.preset_combo, 4, 3)
+
+        # Row 5: Overlay pre-rendering
+        self.overlay_check = QCheckBox("Pre-render subtitles (cached; faster when subtitles are sparse)")
+        self.overlay_check.setToolTip("Render each subtitle once as an image and blend it only while it is on screen")
+        style_layout.addWidget(self.overlay_check, 5, 0, 1, 4)
+
         style_group.setLayout(style_layout)
         layout.addWidget(style_group)
+        self.style_group = style_group
+
+        # --- Preview (one frame with the current style, no full encode) ---
+        preview_group = QGroupBox("Preview")
+        preview_layout = QVBoxLayout()
+        preview_controls = QHBoxLayout()
+        preview_controls.addWidget(QLabel("At:"))
+        self.preview_time = QDoubleSpinBox()
+        self.preview_time.setRange(0, 24 * 3600)
+        self.preview_time.setDecimals(1)
+        self.preview_time.setSuffix(" s")
+        preview_controls.addWidget(self.preview_time)
+        self.preview_btn = QPushButton("Preview Frame")
+        self.preview_btn.clicked.connect(self.start_preview)
+        self.preview_btn.setEnabled(False)
+        preview_controls.addWidget(self.preview_btn)
+        preview_controls.addStretch()
+        preview_layout.addLayout(preview_controls)
+
+        self.preview_label = QLabel("Pick a time and click Preview Frame to check the style")
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setMinimumHeight(200)
+        self.preview_label.setStyleSheet("color: #888; border: 1px solid #444;")
+        preview_layout.addWidget(self.preview_label)
+        preview_group.setLayout(preview_layout)
+        layout.addWidget(preview_group)
+        self.preview_group = preview_group
 
         # --- Actions ---
         action_layout = QHBoxLayout()
@@ -247,12 +290,7 @@ class SubtitleBurningPage(QWidget):
         self.cancel_btn.clicked.connect(self.stop_burning)
         self.cancel_btn.setEnabled(False)
         action_layout.addWidget(self.cancel_btn)
-        
-        self.save_btn = QPushButton("Save Video")
-        self.save_btn.setObjectName("downloadBtn")
-        self.save_btn.clicked.connect(self.save_video)
-        self.save_btn.setEnabled(False)
-        action_layout.addWidget(self.save_btn)
+
         
         layout.addLayout(action_layout)
         
@@ -269,6 +307,8 @@ class SubtitleBurningPage(QWidget):
         
         # Load saved settings
         self.load_settings()
+        self.probe_worker.start()
+        self.update_mode()
 
     def select_video(self):
         f, _ = QFileDialog.getOpenFileName(self, "Select Video", "", "Video Files (*.mp4 *.mov *.mkv *.avi)")
@@ -282,11 +322,44 @@ class SubtitleBurningPage(QWidget):
         if f:
             self.subtitle_path = f
             self.sub_label.setText(os.path.basename(f))
+            # Preview the first cue by default; most videos open without subtitles
+            start = first_cue_time(f)
+            if start is not None:
+                self.preview_time.setValue(start + 0.5)
             self.check_ready()
 
+    def add_extra_tracks(self):
+        files, _ = QFileDialog.getOpenFileNames(self, "Select Subtitle Tracks", "", "Subtitle Files (*.srt *.ass *.vtt)")
+        if files:
+            self.extra_tracks.extend(f for f in files if f not in self.extra_tracks)
+            self.update_extra_label()
+
+    def clear_extra_tracks(self):
+        self.extra_tracks = []
+        self.update_extra_label()
+
+    def update_extra_label(self):
+        if self.extra_tracks:
+            self.extra_label.setText(", ".join(os.path.basename(f) for f in self.extra_tracks))
+        else:
+            self.extra_label.setText("No extra tracks")
+
+    def is_mux_mode(self):
+        return self.mode_combo.currentData() == "mux"
+
+    def update_mode(self):
+        mux = self.is_mux_mode()
+        # Styling only applies when the text is rendered into the picture
+        self.style_group.setEnabled(not mux)
+        self.preview_group.setEnabled(not mux)
+        self.extra_btn.setEnabled(mux)
+        self.extra_clear_btn.setEnabled(mux)
+        self.burn_btn.setText("Add Subtitles" if mux else "Start Burning")
+
     def check_ready(self):
         if hasattr(self, 'video_path') and hasattr(self, 'subtitle_path'):
             self.burn_btn.setEnabled(True)
+            self.preview_btn.setEnabled(not self.is_mux_mode())
 
     def pick_color(self):
         color = QColorDialog.getColor(self.font_color, self, "Choose Subtitle Color")
@@ -298,34 +371,31 @@ class SubtitleBurningPage(QWidget):
         # Save current settings
         self.save_settings()
         
-        # Use temp dir for intermediate file
-        _, ext = os.path.splitext(self.video_path)
-        self.temp_output = os.path.join(tempfile.gettempdir(), f"macwhisper_burn_{os.getpid()}{ext}")
+        # Pick the destination up front: ffmpeg writes next to it and the result is
+        # renamed into place, so a multi-GB video is never copied a second time
+        base, ext = os.path.splitext(self.video_path)
+        if self.is_mux_mode() and ext.lower() not in MOV_TEXT_CONTAINERS + (".mkv",):
+            ext = ".mkv" # Only MP4/MOV/MKV can carry subtitle tracks
+        output_path, _ = QFileDialog.getSaveFileName(self, "Save Video As", base + "_subbed" + ext,
+                                                     "Video Files (*.mp4 *.mov *.mkv *.avi)")
+        if not output_path:
+            return
+        self.output_path = output_path
         
+        self.progress_bar.setRange(0, 0) # Busy until ffmpeg reports its first block
         self.progress_bar.setVisible(True)
         self.burn_btn.setEnabled(False)
         self.cancel_btn.setEnabled(True)
-        self.save_btn.setEnabled(False)
         self.log_output.setText("Burning in progress...")
         
-        # Gather Config
-        config = {
-            'font_family': self.font_combo.currentFont().family(),
-            'font_size': self.font_spin.value(),
-            'font_color': self.font_color,
-            'alignment': self.align_map.get(self.align_combo.currentText(), 2),
-            'margin_v': self.margin_spin.value(),
-            'outline': self.outline_spin.value(),
-            'shadow': self.shadow_spin.value()
-        }
-        
         self.worker = BurningWorker(
             self.video_path, 
             self.subtitle_path, 
-            self.temp_output, 
-            config
+            self.output_path,
+            self.burn_config()
         )
         self.worker.log.connect(self.log_output.setText)
+        self.worker.progress.connect(self.on_progress)
         self.worker.finished.connect(self.on_finished)
         self.worker.error.connect(self.on_error)
         self.worker.start()
@@ -338,6 +408,13 @@ class SubtitleBurningPage(QWidget):
         self.settings.setValue("margin_v", self.margin_spin.value())
         self.settings.setValue("outline", self.outline_spin.value())
         self.settings.setValue("shadow", self.shadow_spin.value())
+        self.settings.setValue("segments", self.segments_spin.value())
+        self.settings.setValue("mode", self.mode_combo.currentData())
+        # Until the probe is done, Auto is the only choice; keep what was saved
+        if self.encoders_probed:
+            self.settings.setValue("encoder", self.encoder_combo.currentData())
+        self.settings.setValue("encoder_preset", self.preset_combo.currentData())
+        self.settings.setValue("overlay", "true" if self.overlay_check.isChecked() else "false")
 
     def load_settings(self):
         # Font Family
@@ -369,6 +446,69 @@ class SubtitleBurningPage(QWidget):
         self.margin_spin.setValue(int(self.settings.value("margin_v", 10)))
         self.outline_spin.setValue(int(self.settings.value("outline", 1)))
         self.shadow_spin.setValue(int(self.settings.value("shadow", 1)))
+        self.segments_spin.setValue(int(self.settings.value("segments", 1)))
+        self.mode_combo.setCurrentIndex(max(0, self.mode_combo.findData(self.settings.value("mode", "burn"))))
+        # Selected once the probe has filled the combo
+        self.saved_encoder = self.settings.value("encoder", "auto")
+        self.preset_combo.setCurrentIndex(max(0, self.preset_combo.findData(self.settings.value("encoder_preset", DEFAULT_PRESET))))
+        self.overlay_check.setChecked(self.settings.value("overlay", "false") == "true")
+
+    def on_encoders_probed(self, names):
+        for name in names:
+            self.encoder_combo.addItem(ENCODERS[name]['label'], name)
+        self.encoder_combo.setToolTip("")
+        # A saved encoder that's gone (different ffmpeg) falls back to Auto
+        self.encoder_combo.setCurrentIndex(max(0, self.encoder_combo.findData(self.saved_encoder)))
+        self.encoders_probed = True
+
+    def style_config(self):
+        return {
+            'font_family': self.font_combo.currentFont().family(),
+            'font_size': self.font_spin.value(),
+            'font_color': self.font_color.name(),
+            'alignment': self.align_map.get(self.align_combo.currentText(), 2),
+            'margin_v': self.margin_spin.value(),
+            'outline': self.outline_spin.value(),
+            'shadow': self.shadow_spin.value()
+        }
+
+    def burn_config(self):
+        # Everything BurningWorker / SubtitleBurner need besides the paths
+        config = self.style_config()
+        config.update({
+            'segments': self.segments_spin.value(),
+            'encoder': self.encoder_combo.currentData(),
+            'encoder_preset': self.preset_combo.currentData(),
+            'overlay': self.overlay_check.isChecked(),
+            'mode': self.mode_combo.currentData(),
+            'extra_tracks': list(self.extra_tracks)
+        })
+        return config
+
+    def start_preview(self):
+        if hasattr(self, 'preview_worker') and self.preview_worker.isRunning():
+            return
+        image_path = os.path.join(tempfile.gettempdir(), f"macwhisper_preview_{os.getpid()}.png")
+        self.preview_btn.setEnabled(False)
+        self.log_output.setText("Rendering preview...")
+        self.preview_worker = PreviewWorker(self.video_path, self.subtitle_path, self.style_config(),
+                                            self.preview_time.value(), image_path)
+        self.preview_worker.finished.connect(self.on_preview_ready)
+        self.preview_worker.error.connect(self.on_preview_error)
+        self.preview_worker.start()
+
+    def on_preview_ready(self, image_path, seconds):
+        pixmap = QPixmap(image_path)
+        self.preview_label.setPixmap(pixmap.scaled(
+            self.preview_label.width(), max(200, self.preview_label.height()),
+            Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+        self.preview_btn.setEnabled(True)
+        self.log_output.setText(f"Preview rendered in {seconds:.1f}s")
+
+    def on_preview_error(self, msg):
+        self.preview_btn.setEnabled(True)
+        self.log_output.setText("Preview failed")
+        QMessageBox.critical(self, "Error", f"Preview failed:\n{msg}")
 
     def stop_burning(self):
         if hasattr(self, 'worker') and self.worker.isRunning():
@@ -379,30 +519,41 @@ class SubtitleBurningPage(QWidget):
             self.burn_btn.setEnabled(True)
             self.progress_bar.setVisible(False)
 
+    @staticmethod
+    def format_eta(seconds):
+        seconds = int(seconds)
+        h, rem = divmod(seconds, 3600)
+        m, s = divmod(rem, 60)
+        return f"{h}:{m:02d}:{s:02d}" if h else f"{m}:{s:02d}"
+
+    def on_progress(self, percent, stats):
+        parts = []
+        if stats.get('fps'):
+            parts.append(f"{stats['fps']:.0f} fps")
+        if stats.get('speed'):
+            parts.append(f"{stats['speed']:.2f}x")
+        if stats.get('eta') is not None:
+            parts.append(f"ETA {self.format_eta(stats['eta'])}")
+
+        if percent < 0:
+            # Unknown duration: stay busy, show throughput only
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(percent)
+            parts.insert(0, "%p%")
+        self.progress_bar.setFormat("  ·  ".join(parts))
+        self.progress_bar.setTextVisible(True)
+
     def on_finished(self):
         self.progress_bar.setVisible(False)
         self.burn_btn.setEnabled(True)
         self.cancel_btn.setEnabled(False)
-        self.save_btn.setEnabled(True)
         self.log_output.setText("Processing Complete!")
-        QMessageBox.information(self, "Success", "Burning complete. Click 'Save Video' to save the file.")
+        QMessageBox.information(self, "Success", f"Video saved to:\n{self.output_path}")
 
     def on_error(self, msg):
         self.progress_bar.setVisible(False)
         self.burn_btn.setEnabled(True)
         self.cancel_btn.setEnabled(False)
         QMessageBox.critical(self, "Error", f"Burning failed:\n{msg}")
-
-    def save_video(self):
-        if not hasattr(self, 'temp_output') or not os.path.exists(self.temp_output):
-             return
-        
-        default_name = os.path.splitext(os.path.basename(self.video_path))[0] + "_subbed" + os.path.splitext(self.video_path)[1]
-        target_path, _ = QFileDialog.getSaveFileName(self, "Save Video", default_name, "Video Files (*.mp4 *.mov *.mkv *.avi)")
-        
-        if target_path:
-            try:
-                shutil.copy2(self.temp_output, target_path)
-                QMessageBox.information(self, "Saved", f"Video saved to:\n{target_path}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Could not save file: {e}")
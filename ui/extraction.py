@@ -1,20 +1,28 @@
 import os
+import json
 import shutil
-import subprocess  # 替代 ffmpeg 模块
 from whisper import _MODELS as WHISPER_MODELS
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, 
     QPushButton, QFileDialog, QTextEdit, QProgressBar, 
-    QMessageBox, QGroupBox
+    QMessageBox, QGroupBox, QTableWidget, QTableWidgetItem,
+    QHeaderView, QAbstractItemView, QCheckBox, QSpinBox
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QSettings
 from worker import Worker
+from core.media import MEDIA_EXTENSIONS, has_audio_stream
+from core.subtitles import write_srt, format_timestamp
 
 class ExtractionPage(QWidget):
     def __init__(self):
         super().__init__()
+        self.settings = QSettings("MacWhisper", "Config")
         self.result_data = None
+        # Batch queue entries: {"path", "status", "duration", "elapsed"}
+        self.queue = []
+        self.batch_worker = None
         self.init_ui()
+        self.load_queue()
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -52,6 +60,33 @@ class ExtractionPage(QWidget):
         row1.addWidget(self.extract_model_combo)
         
         extract_layout.addLayout(row1)
+
+        # Options shared by single and batch extraction
+        options_row = QHBoxLayout()
+        self.vad_check = QCheckBox("Skip silence (VAD)")
+        self.vad_check.setToolTip("Detect speech first and only transcribe those parts; timestamps stay on the original timeline")
+        self.vad_check.setChecked(self.settings.value("vad_enabled", "false") == "true")
+        self.vad_check.toggled.connect(lambda on: self.settings.setValue("vad_enabled", "true" if on else "false"))
+        options_row.addWidget(self.vad_check)
+
+        self.stream_check = QCheckBox("Stream segments")
+        self.stream_check.setToolTip("Show segments as they are decoded, one ~60s window at a time.\n"
+                                     "Whisper loses its context at each window, so the text may differ slightly.")
+        self.stream_check.setChecked(self.settings.value("stream_segments", "false") == "true")
+        self.stream_check.toggled.connect(lambda on: self.settings.setValue("stream_segments", "true" if on else "false"))
+        options_row.addWidget(self.stream_check)
+
+        options_row.addWidget(QLabel("Parallel processes:"))
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(0, os.cpu_count() or 1)
+        self.parallel_spin.setSpecialValueText("Off")
+        self.parallel_spin.setToolTip("Split long audio at pauses and transcribe the chunks in this many CPU processes.\n"
+                                      "Each process loads its own copy of the model, so RAM use grows with the count.")
+        self.parallel_spin.setValue(int(self.settings.value("parallel_workers", 0)))
+        self.parallel_spin.valueChanged.connect(lambda n: self.settings.setValue("parallel_workers", n))
+        options_row.addWidget(self.parallel_spin)
+        options_row.addStretch()
+        extract_layout.addLayout(options_row)
         
         # Row 2: Action
         self.extract_btn = QPushButton("Start Extraction")
@@ -63,6 +98,54 @@ class ExtractionPage(QWidget):
         extract_group.setLayout(extract_layout)
         layout.addWidget(extract_group)
 
+        # --- Batch Queue ---
+        batch_group = QGroupBox("Batch Queue")
+        batch_layout = QVBoxLayout()
+
+        queue_btn_row = QHBoxLayout()
+        self.add_files_btn = QPushButton("Add Files")
+        self.add_files_btn.clicked.connect(self.add_queue_files)
+        self.add_folder_btn = QPushButton("Add Folder")
+        self.add_folder_btn.clicked.connect(self.add_queue_folder)
+        self.clear_done_btn = QPushButton("Remove Finished")
+        self.clear_done_btn.clicked.connect(self.remove_finished)
+        self.clear_queue_btn = QPushButton("Clear Queue")
+        self.clear_queue_btn.clicked.connect(self.clear_queue)
+        queue_btn_row.addWidget(self.add_files_btn)
+        queue_btn_row.addWidget(self.add_folder_btn)
+        queue_btn_row.addWidget(self.clear_done_btn)
+        queue_btn_row.addWidget(self.clear_queue_btn)
+        queue_btn_row.addStretch()
+
+        self.start_queue_btn = QPushButton("Start Queue")
+        self.start_queue_btn.clicked.connect(self.start_queue)
+        self.stop_queue_btn = QPushButton("Stop")
+        self.stop_queue_btn.setObjectName("deleteBtn")
+        self.stop_queue_btn.clicked.connect(self.stop_queue)
+        self.stop_queue_btn.setEnabled(False)
+        queue_btn_row.addWidget(self.start_queue_btn)
+        queue_btn_row.addWidget(self.stop_queue_btn)
+        batch_layout.addLayout(queue_btn_row)
+
+        self.queue_table = QTableWidget()
+        self.queue_table.setColumnCount(4)
+        self.queue_table.setHorizontalHeaderLabels(["File", "Duration", "Status", "Speed"])
+        self.queue_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.queue_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        self.queue_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        self.queue_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+        self.queue_table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.queue_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.queue_table.setMinimumHeight(140)
+        batch_layout.addWidget(self.queue_table)
+
+        self.queue_stats_label = QLabel("Outputs (.srt / .txt) are written next to each input file.")
+        self.queue_stats_label.setStyleSheet("color: #888;")
+        batch_layout.addWidget(self.queue_stats_label)
+
+        batch_group.setLayout(batch_layout)
+        layout.addWidget(batch_group)
+
         # Progress & Logs
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -93,7 +176,19 @@ class ExtractionPage(QWidget):
             self.file_path_label.setText(os.path.basename(file_name))
             
             # 检查是否包含音频流
-            if self.has_audio_stream(file_name):
+            try:
+                has_audio = has_audio_stream(file_name)
+            except FileNotFoundError:
+                self.extract_btn.setEnabled(False)
+                self.log_output.append("Error: ffmpeg is not installed or not in PATH.")
+                QMessageBox.critical(self, "Error", "ffmpeg is not installed or not in PATH.")
+                return
+            except Exception as e:
+                self.extract_btn.setEnabled(False)
+                self.log_output.append(f"Error checking audio stream: {e}")
+                return
+
+            if has_audio:
                 self.extract_btn.setEnabled(True)
                 self.log_output.append(f"Selected file: {file_name}")
             else:
@@ -101,28 +196,181 @@ class ExtractionPage(QWidget):
                 self.log_output.append(f"Error: No audio stream found in the selected file: {file_name}")
                 QMessageBox.warning(self, "No Audio Stream", "The selected file does not contain an audio stream.")
 
-    def has_audio_stream(self, file_name):
+    # --- Batch Queue ---
+
+    def load_queue(self):
         try:
-            # 调用 ffmpeg 命令获取文件的流信息
-            result = subprocess.run(
-                ["ffmpeg", "-i", file_name],
-                stderr=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                text=True
-            )
-            output = result.stderr  # ffmpeg 的流信息通常输出到 stderr
-
-            # 检查是否存在音频流
-            if "Audio:" in output:
-                return True
-            return False
-        except FileNotFoundError:
-            self.log_output.append("Error: ffmpeg is not installed or not in PATH.")
-            QMessageBox.critical(self, "Error", "ffmpeg is not installed or not in PATH.")
-            return False
-        except Exception as e:
-            self.log_output.append(f"Error checking audio stream: {e}")
-            return False
+            self.queue = json.loads(self.settings.value("extraction_queue", "[]"))
+        except Exception:
+            self.queue = []
+        for entry in self.queue:
+            # Anything interrupted by a restart goes back to pending
+            if entry.get("status") == "Transcribing":
+                entry["status"] = "Queued"
+        self.refresh_queue_table()
+
+    def save_queue(self):
+        self.settings.setValue("extraction_queue", json.dumps(self.queue))
+
+    def enqueue(self, paths):
+        known = {entry["path"] for entry in self.queue}
+        added = 0
+        for path in paths:
+            if path in known:
+                continue
+            self.queue.append({"path": path, "status": "Queued", "duration": 0.0, "elapsed": 0.0})
+            known.add(path)
+            added += 1
+        self.save_queue()
+        self.refresh_queue_table()
+        self.log_output.append(f"Added {added} file(s) to the queue.")
+
+    def add_queue_files(self):
+        files, _ = QFileDialog.getOpenFileNames(self, "Select Video Files", "", "Video Files (*.mp4 *.mkv *.mov *.avi *.mp3 *.wav);;All Files (*)")
+        if files:
+            self.enqueue(files)
+
+    def add_queue_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder")
+        if not folder:
+            return
+        paths = []
+        for root, _, names in os.walk(folder):
+            for name in sorted(names):
+                if name.lower().endswith(MEDIA_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        self.enqueue(sorted(paths))
+
+    def remove_finished(self):
+        self.queue = [e for e in self.queue if e["status"] != "Done"]
+        self.save_queue()
+        self.refresh_queue_table()
+
+    def clear_queue(self):
+        self.queue = []
+        self.save_queue()
+        self.refresh_queue_table()
+
+    def refresh_queue_table(self):
+        self.queue_table.setRowCount(0)
+        for entry in self.queue:
+            row = self.queue_table.rowCount()
+            self.queue_table.insertRow(row)
+            self.queue_table.setItem(row, 0, QTableWidgetItem(os.path.basename(entry["path"])))
+            self.queue_table.item(row, 0).setToolTip(entry["path"])
+            self.update_queue_row(row)
+
+    def update_queue_row(self, row):
+        entry = self.queue[row]
+        duration = entry.get("duration", 0.0)
+        elapsed = entry.get("elapsed", 0.0)
+        speed = f"{duration / elapsed:.1f}x" if entry["status"] == "Done" and duration and elapsed else ""
+        self.queue_table.setItem(row, 1, QTableWidgetItem(self.format_duration(duration) if duration else ""))
+        self.queue_table.setItem(row, 2, QTableWidgetItem(entry["status"]))
+        self.queue_table.setItem(row, 3, QTableWidgetItem(speed))
+
+    def start_queue(self):
+        self.batch_rows = [i for i, e in enumerate(self.queue) if e["status"] != "Done"]
+        if not self.batch_rows:
+            QMessageBox.information(self, "Queue Empty", "There are no pending files in the queue.")
+            return
+
+        for row in self.batch_rows:
+            self.queue[row]["status"] = "Queued"
+            self.update_queue_row(row)
+        self.batch_audio_done = 0.0
+        self.batch_wall_done = 0.0
+
+        self.set_ui_busy(True)
+        self.set_queue_busy(True)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, len(self.batch_rows))
+        self.progress_bar.setValue(0)
+
+        model_name = self.extract_model_combo.currentText()
+        self.batch_worker = Worker('transcribe_batch', model_name,
+                                   file_paths=[self.queue[row]["path"] for row in self.batch_rows],
+                                   options=self.transcribe_options())
+        self.batch_worker.log.connect(self.log_output.append)
+        self.batch_worker.segment.connect(self.on_segment)
+        self.batch_worker.file_duration.connect(self.on_batch_duration)
+        self.batch_worker.file_status.connect(self.on_batch_status)
+        self.batch_worker.file_done.connect(self.on_batch_done)
+        self.batch_worker.error.connect(self.on_batch_error)
+        self.batch_worker.finished.connect(self.on_batch_finished)
+        self.batch_worker.start()
+
+    def stop_queue(self):
+        if self.batch_worker and self.batch_worker.isRunning():
+            self.batch_worker.stop()
+            self.stop_queue_btn.setEnabled(False)
+            self.log_output.append("Stopping after the current file...")
+
+    def set_queue_busy(self, busy):
+        for btn in (self.add_files_btn, self.add_folder_btn, self.clear_done_btn,
+                    self.clear_queue_btn, self.start_queue_btn):
+            btn.setEnabled(not busy)
+        self.stop_queue_btn.setEnabled(busy)
+
+    def on_batch_duration(self, index, seconds):
+        row = self.batch_rows[index]
+        self.queue[row]["duration"] = seconds
+        self.update_queue_row(row)
+        self.update_queue_stats()
+
+    def on_batch_status(self, index, status):
+        row = self.batch_rows[index]
+        self.queue[row]["status"] = status
+        self.update_queue_row(row)
+        self.save_queue()
+
+    def on_batch_done(self, index, info):
+        row = self.batch_rows[index]
+        entry = self.queue[row]
+        if not entry.get("duration"):
+            entry["duration"] = info["audio_seconds"]
+        entry["elapsed"] = info["elapsed"]
+        entry["status"] = "Done"
+        self.batch_audio_done += entry["duration"]
+        self.batch_wall_done += entry["elapsed"]
+        self.update_queue_row(row)
+        self.save_queue()
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
+        self.update_queue_stats()
+
+    def update_queue_stats(self):
+        remaining = sum(self.queue[row].get("duration", 0.0) for row in self.batch_rows
+                        if self.queue[row]["status"] in ("Queued", "Transcribing"))
+        if self.batch_wall_done > 0:
+            # audio-seconds per wall-second == audio-minutes per wall-minute
+            throughput = self.batch_audio_done / self.batch_wall_done
+            eta = remaining / throughput if throughput > 0 else 0
+            self.queue_stats_label.setText(
+                f"Throughput: {throughput:.2f} audio-min / wall-min · Remaining audio: "
+                f"{self.format_duration(remaining)} · ETA: {self.format_duration(eta)}")
+        else:
+            self.queue_stats_label.setText(f"Remaining audio: {self.format_duration(remaining)} · ETA: measuring...")
+
+    def on_batch_error(self, error_msg):
+        self.log_output.append(f"Error: {error_msg}")
+        QMessageBox.critical(self, "Error", f"Batch queue failed:\n{error_msg}")
+        self.on_batch_finished(None)
+
+    def on_batch_finished(self, _):
+        for row in self.batch_rows:
+            if self.queue[row]["status"] in ("Queued", "Transcribing"):
+                self.queue[row]["status"] = "Queued"
+                self.update_queue_row(row)
+        self.save_queue()
+        self.set_ui_busy(False)
+        self.set_queue_busy(False)
+        self.progress_bar.setVisible(False)
+        self.log_output.append("\n--- Batch Queue Finished ---\n")
+
+    @staticmethod
+    def format_duration(seconds):
+        seconds = int(seconds)
+        return f"{seconds // 3600:02}:{(seconds % 3600) // 60:02}:{seconds % 60:02}"
 
     def start_extraction(self):
         if not hasattr(self, 'file_path'):
@@ -130,20 +378,31 @@ class ExtractionPage(QWidget):
         model_name = self.extract_model_combo.currentText()
         self.start_worker('transcribe', model_name, self.file_path)
 
+    def transcribe_options(self):
+        return {'vad': self.vad_check.isChecked(), 'parallel': self.parallel_spin.value(),
+                'stream': self.stream_check.isChecked()}
+
     def start_worker(self, task_type, model_name, file_path=None):
         self.set_ui_busy(True)
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)
         
-        self.worker = Worker(task_type, model_name, file_path)
+        self.worker = Worker(task_type, model_name, file_path, options=self.transcribe_options())
         self.worker.log.connect(self.log_output.append)
+        self.worker.segment.connect(self.on_segment)
         self.worker.error.connect(self.handle_error)
         self.worker.finished.connect(self.handle_finished)
         self.worker.start()
 
+    def on_segment(self, segment):
+        start = format_timestamp(segment['start'])
+        end = format_timestamp(segment['end'])
+        self.log_output.append(f"[{start} --> {end}] {segment['text'].strip()}")
+
     def set_ui_busy(self, busy):
         self.extract_btn.setEnabled(not busy)
         self.extract_model_combo.setEnabled(not busy)
+        self.start_queue_btn.setEnabled(not busy)
         
         if busy:
             self.save_srt_btn.setEnabled(False)
@@ -190,16 +449,4 @@ class ExtractionPage(QWidget):
             self.log_output.append(f"Saved to: {file_name}")
 
     def write_srt(self, segments, file_name):
-        def format_time(seconds):
-            hours = int(seconds // 3600)
-            minutes = int((seconds % 3600) // 60)
-            secs = int(seconds % 60)
-            millis = int((seconds - int(seconds)) * 1000)
-            return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
-
-        with open(file_name, 'w', encoding='utf-8') as f:
-            for i, segment in enumerate(segments, start=1):
-                start = format_time(segment['start'])
-                end = format_time(segment['end'])
-                text = segment['text'].strip()
-                f.write(f"{i}\n{start} --> {end}\n{text}\n\n")
+        write_srt(segments, file_name)
@@ -4,11 +4,12 @@ from whisper import _MODELS as WHISPER_MODELS
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QMessageBox, 
     QGroupBox, QTableWidget, QTableWidgetItem,
-    QHeaderView, QAbstractItemView, QTextEdit, QInputDialog
+    QHeaderView, QAbstractItemView, QTextEdit, QInputDialog, QProgressBar
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QColor
 from worker import Worker
+from core.model_cache import MODEL_CACHE
 
 # Standard Whisper cache path
 WHISPER_CACHE_DIR = os.path.expanduser("~/.cache/whisper")
@@ -71,6 +72,10 @@ class ModelsPage(QWidget):
         model_group.setLayout(model_layout)
         layout.addWidget(model_group)
 
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
         # Log output for download status
         self.log_output = QTextEdit()
         self.log_output.setFixedHeight(100)
@@ -110,6 +115,9 @@ class ModelsPage(QWidget):
             # Start Worker with new task type
             self.worker = Worker('download_custom', filename, download_url=url)
             self.worker.log.connect(self.log_output.append)
+            self.worker.progress.connect(self.on_progress)
+            self.progress_bar.setRange(0, 0)
+            self.progress_bar.setVisible(True)
             self.worker.finished.connect(self.handle_finished)
             self.worker.error.connect(self.handle_error)
             self.worker.start()
@@ -277,17 +285,39 @@ class ModelsPage(QWidget):
                          except Exception: pass
 
             if deleted:
+                # Drop the in-memory copy too so it isn't served after the file is gone
+                if MODEL_CACHE.evict(identifier):
+                    self.log_output.append(f"Model '{identifier}' unloaded from memory.")
                 self.log_output.append(f"Model '{identifier}' deleted.")
                 self.refresh_model_table()
             else:
                  QMessageBox.information(self, "Info", "Model file not found to delete.")
 
+    def on_progress(self, percent, stats):
+        mb = 1024 * 1024
+        parts = [f"{stats['downloaded'] / mb:.1f}" + (f" of {stats['total'] / mb:.1f} MB" if stats.get('total') else " MB")]
+        if stats.get('speed'):
+            parts.append(f"{stats['speed'] / mb:.1f} MB/s")
+        if stats.get('eta') is not None:
+            m, s = divmod(int(stats['eta']), 60)
+            parts.append(f"ETA {m}:{s:02d}")
+        if percent < 0:
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(percent)
+            parts.insert(0, "%p%")
+        self.progress_bar.setFormat("  ·  ".join(parts))
+        self.progress_bar.setTextVisible(True)
+
     def handle_finished(self, result):
+        self.progress_bar.setVisible(False)
         self.model_table.setEnabled(True)
         self.refresh_model_table()
         QMessageBox.information(self, "Success", "Model download completed!")
 
     def handle_error(self, error_msg):
+        self.progress_bar.setVisible(False)
         self.model_table.setEnabled(True)
         self.refresh_model_table()
         QMessageBox.critical(self, "Error", f"An error occurred:\n{error_msg}")
@@ -0,0 +1,247 @@
+import os
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QFileDialog,
+    QTextEdit, QMessageBox, QGroupBox, QTableWidget, QTableWidgetItem,
+    QHeaderView, QAbstractItemView, QCheckBox
+)
+from PyQt6.QtCore import QThread, QTimer, QSettings, pyqtSignal
+from core.pipeline import Pipeline, STAGE_LABELS
+
+class PipelineWorker(QThread):
+    log = pyqtSignal(str)
+    status = pyqtSignal(int, str)
+    progress = pyqtSignal(str, int, int) # stage, file index, percent (-1 = unknown)
+    finished = pyqtSignal(object) # [PipelineItem]
+    error = pyqtSignal(str)
+
+    def __init__(self, inputs, model_name, translate_config, burn_config, output_dir, transcribe_options):
+        super().__init__()
+        names = [os.path.basename(path) for path in inputs]
+
+        def log(stage, index, message):
+            prefix = f"[{stage}] {names[index]}: " if index is not None else ""
+            self.log.emit(prefix + message)
+
+        self.pipeline = Pipeline(inputs, model_name, translate_config, burn_config=burn_config,
+                                 output_dir=output_dir, transcribe_options=transcribe_options,
+                                 log=log, progress=self.progress.emit, status=self.status.emit)
+
+    def run(self):
+        try:
+            self.finished.emit(self.pipeline.run())
+        except Exception as e:
+            self.error.emit(str(e))
+
+    def stop(self):
+        self.pipeline.stop()
+
+class PipelinePage(QWidget):
+    """Runs a batch through extract -> translate -> burn with the stages overlapping.
+
+    Uses the Whisper model and options selected on the Extraction page, the
+    service and language on the Translation page and the style/encoder on the
+    Burn page, so there is nothing to configure twice.
+    """
+
+    def __init__(self, extraction_page, translation_page, burning_page):
+        super().__init__()
+        self.settings = QSettings("MacWhisper", "Config")
+        self.extraction_page = extraction_page
+        self.translation_page = translation_page
+        self.burning_page = burning_page
+        self.files = []
+        self.worker = None
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        title = QLabel("Pipeline")
+        title.setObjectName("header")
+        layout.addWidget(title)
+
+        hint = QLabel("Transcribes, translates and burns every file. Settings come from the Extraction, "
+                      "Translation and Burn Subtitles pages. While one file transcribes, the previous one "
+                      "translates and the one before it burns.")
+        hint.setWordWrap(True)
+        hint.setStyleSheet("color: #888;")
+        layout.addWidget(hint)
+
+        files_group = QGroupBox("Files")
+        files_layout = QVBoxLayout()
+
+        btn_row = QHBoxLayout()
+        self.add_btn = QPushButton("Add Files")
+        self.add_btn.clicked.connect(self.add_files)
+        self.clear_btn = QPushButton("Clear")
+        self.clear_btn.clicked.connect(self.clear_files)
+        self.output_btn = QPushButton("Output Folder...")
+        self.output_btn.clicked.connect(self.pick_output_dir)
+        btn_row.addWidget(self.add_btn)
+        btn_row.addWidget(self.clear_btn)
+        btn_row.addWidget(self.output_btn)
+        btn_row.addStretch()
+
+        self.burn_check = QCheckBox("Burn / add subtitles to video")
+        self.burn_check.setChecked(self.settings.value("pipeline_burn", "true") == "true")
+        self.burn_check.toggled.connect(lambda on: self.settings.setValue("pipeline_burn", "true" if on else "false"))
+        btn_row.addWidget(self.burn_check)
+        files_layout.addLayout(btn_row)
+
+        self.output_label = QLabel()
+        self.output_label.setStyleSheet("color: #888;")
+        files_layout.addWidget(self.output_label)
+        self.output_dir = self.settings.value("pipeline_output_dir", "") or None
+        self.update_output_label()
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(3)
+        self.table.setHorizontalHeaderLabels(["File", "Status", "Progress"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setMinimumHeight(140)
+        files_layout.addWidget(self.table)
+
+        self.utilization_label = QLabel("Stage utilization appears here while the pipeline runs.")
+        self.utilization_label.setStyleSheet("color: #888;")
+        files_layout.addWidget(self.utilization_label)
+
+        files_group.setLayout(files_layout)
+        layout.addWidget(files_group)
+
+        action_row = QHBoxLayout()
+        self.start_btn = QPushButton("Start Pipeline")
+        self.start_btn.setObjectName("primaryButton")
+        self.start_btn.clicked.connect(self.start_pipeline)
+        self.start_btn.setEnabled(False)
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.setObjectName("deleteBtn")
+        self.stop_btn.clicked.connect(self.stop_pipeline)
+        self.stop_btn.setEnabled(False)
+        action_row.addWidget(self.start_btn)
+        action_row.addWidget(self.stop_btn)
+        layout.addLayout(action_row)
+
+        self.log_output = QTextEdit()
+        self.log_output.setReadOnly(True)
+        self.log_output.setPlaceholderText("Logs will appear here...")
+        layout.addWidget(self.log_output, stretch=1)
+
+        self.utilization_timer = QTimer(self)
+        self.utilization_timer.setInterval(1000)
+        self.utilization_timer.timeout.connect(self.update_utilization)
+
+    def add_files(self):
+        files, _ = QFileDialog.getOpenFileNames(self, "Select Video Files", "", "Video Files (*.mp4 *.mkv *.mov *.avi);;All Files (*)")
+        for path in files:
+            if path not in self.files:
+                self.files.append(path)
+        self.refresh_table()
+
+    def clear_files(self):
+        self.files = []
+        self.refresh_table()
+
+    def pick_output_dir(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Output Folder")
+        # Cancelling goes back to writing next to each input
+        self.output_dir = folder or None
+        self.settings.setValue("pipeline_output_dir", folder or "")
+        self.update_output_label()
+
+    def update_output_label(self):
+        if self.output_dir:
+            self.output_label.setText(f"Outputs go to: {self.output_dir}")
+        else:
+            self.output_label.setText("Outputs (.srt, translated .srt, video) are written next to each input file.")
+
+    def refresh_table(self):
+        self.table.setRowCount(0)
+        for path in self.files:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(os.path.basename(path)))
+            self.table.item(row, 0).setToolTip(path)
+            self.table.setItem(row, 1, QTableWidgetItem("Queued"))
+            self.table.setItem(row, 2, QTableWidgetItem(""))
+        self.start_btn.setEnabled(bool(self.files) and not self.is_busy())
+
+    def is_busy(self):
+        return self.worker is not None and self.worker.isRunning()
+
+    def start_pipeline(self):
+        try:
+            translate_config = self.translation_page.translator_config()
+        except ValueError as e:
+            QMessageBox.warning(self, "Configuration Error", f"Translation page: {e}")
+            return
+
+        burn_config = None
+        if self.burn_check.isChecked():
+            self.burning_page.save_settings()
+            burn_config = self.burning_page.burn_config()
+            burn_config.pop('extra_tracks', None) # Those belong to the single video on that page
+
+        self.refresh_table()
+        self.log_output.clear()
+        self.set_busy(True)
+        model_name = self.extraction_page.extract_model_combo.currentText()
+        self.worker = PipelineWorker(list(self.files), model_name, translate_config, burn_config,
+                                     self.output_dir, self.extraction_page.transcribe_options())
+        self.worker.log.connect(self.log_output.append)
+        self.worker.status.connect(self.on_status)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.error.connect(self.on_error)
+        self.worker.start()
+        self.utilization_timer.start()
+
+    def stop_pipeline(self):
+        if self.is_busy():
+            self.log_output.append("Stopping after the file currently being transcribed...")
+            self.stop_btn.setEnabled(False)
+            self.worker.stop()
+
+    def set_busy(self, busy):
+        self.start_btn.setEnabled(not busy and bool(self.files))
+        self.stop_btn.setEnabled(busy)
+        self.add_btn.setEnabled(not busy)
+        self.clear_btn.setEnabled(not busy)
+        self.output_btn.setEnabled(not busy)
+        self.burn_check.setEnabled(not busy)
+
+    def on_status(self, index, status):
+        self.table.setItem(index, 1, QTableWidgetItem(status))
+        if status not in STAGE_LABELS.values():
+            self.table.setItem(index, 2, QTableWidgetItem(""))
+
+    def on_progress(self, stage, index, percent):
+        if percent >= 0:
+            self.table.setItem(index, 2, QTableWidgetItem(f"{percent}%"))
+
+    def update_utilization(self):
+        if self.worker is None:
+            return
+        usage = self.worker.pipeline.utilization()
+        self.utilization_label.setText("Stage utilization: " + " · ".join(
+            f"{stage} {value:.0%}" for stage, value in usage.items()))
+
+    def on_finished(self, items):
+        self.utilization_timer.stop()
+        self.update_utilization()
+        self.set_busy(False)
+        failed = [item for item in items if item.error is not None]
+        self.log_output.append("\n--- Pipeline Finished ---\n")
+        if failed:
+            QMessageBox.warning(self, "Pipeline Finished", f"{len(items) - len(failed)} of {len(items)} files completed.")
+
+    def on_error(self, msg):
+        self.utilization_timer.stop()
+        self.set_busy(False)
+        self.log_output.append(f"Error: {msg}")
+        QMessageBox.critical(self, "Error", f"Pipeline failed:\n{msg}")
@@ -3,6 +3,26 @@ from PyQt6.QtWidgets import (
     QPushButton, QFormLayout, QSpinBox, QMessageBox
 )
 from PyQt6.QtCore import Qt, QSettings, pyqtSignal
+from core.model_cache import MODEL_CACHE, DEFAULT_BUDGET_MB
+from core.translation_memory import DEFAULT_MAX_ENTRIES
+from core.audio_cache import AUDIO_CACHE, DEFAULT_BUDGET_MB as DEFAULT_AUDIO_BUDGET_MB
+from core import http_pool
+from core.scheduler import SCHEDULER, DEFAULT_SLOTS, default_memory_budget_mb
+from core.download import DEFAULT_CONNECTIONS as DEFAULT_DOWNLOAD_CONNECTIONS
+
+def apply_runtime_settings(settings):
+    # Push saved values into the process-wide engines (called at startup and on save)
+    MODEL_CACHE.set_budget(int(settings.value("model_cache_budget_mb", DEFAULT_BUDGET_MB)))
+    AUDIO_CACHE.set_budget(int(settings.value("audio_cache_budget_mb", DEFAULT_AUDIO_BUDGET_MB)))
+    http_pool.configure(
+        timeout=int(settings.value("http_timeout", int(http_pool.settings["timeout"]))),
+        max_connections=int(settings.value("http_max_connections", http_pool.settings["max_connections"])),
+    )
+    SCHEDULER.configure(
+        slots={resource: int(settings.value(f"scheduler_{resource}_slots", count))
+               for resource, count in DEFAULT_SLOTS.items()},
+        memory_budget_mb=int(settings.value("scheduler_memory_mb", default_memory_budget_mb())),
+    )
 
 class SettingsPage(QWidget):
     # Signal to notify main window to update styles
@@ -11,6 +31,7 @@ class SettingsPage(QWidget):
     def __init__(self):
         super().__init__()
         self.settings = QSettings("MacWhisper", "Config")
+        apply_runtime_settings(self.settings)
         self.init_ui()
 
     def init_ui(self):
@@ -38,6 +59,75 @@ class SettingsPage(QWidget):
         self.font_spin.setValue(current_font)
         form_layout.addRow("Font Size:", self.font_spin)
 
+        # Model Cache
+        self.model_budget_spin = QSpinBox()
+        self.model_budget_spin.setRange(0, 262144)
+        self.model_budget_spin.setSingleStep(512)
+        self.model_budget_spin.setSuffix(" MB")
+        self.model_budget_spin.setToolTip("RAM kept for loaded Whisper models between jobs (0 = keep only the last one)")
+        self.model_budget_spin.setValue(int(self.settings.value("model_cache_budget_mb", DEFAULT_BUDGET_MB)))
+        form_layout.addRow("Model Cache:", self.model_budget_spin)
+
+        # Decoded Audio Cache
+        self.audio_budget_spin = QSpinBox()
+        self.audio_budget_spin.setRange(0, 1048576)
+        self.audio_budget_spin.setSingleStep(512)
+        self.audio_budget_spin.setSuffix(" MB")
+        self.audio_budget_spin.setToolTip("Disk space for decoded 16 kHz audio, so re-transcribing a file skips decoding (~115 MB per hour)")
+        self.audio_budget_spin.setValue(int(self.settings.value("audio_cache_budget_mb", DEFAULT_AUDIO_BUDGET_MB)))
+        form_layout.addRow("Audio Cache:", self.audio_budget_spin)
+
+        # Translation Memory
+        self.tm_size_spin = QSpinBox()
+        self.tm_size_spin.setRange(1000, 10000000)
+        self.tm_size_spin.setSingleStep(10000)
+        self.tm_size_spin.setSuffix(" entries")
+        self.tm_size_spin.setToolTip("Least recently used translations are dropped beyond this size")
+        self.tm_size_spin.setValue(int(self.settings.value("tm_max_entries", DEFAULT_MAX_ENTRIES)))
+        form_layout.addRow("Translation Memory:", self.tm_size_spin)
+
+        # HTTP Connections (shared by translation jobs and API key tests)
+        self.http_timeout_spin = QSpinBox()
+        self.http_timeout_spin.setRange(5, 600)
+        self.http_timeout_spin.setSuffix(" s")
+        self.http_timeout_spin.setValue(int(self.settings.value("http_timeout", int(http_pool.settings["timeout"]))))
+        form_layout.addRow("API Timeout:", self.http_timeout_spin)
+
+        self.http_conn_spin = QSpinBox()
+        self.http_conn_spin.setRange(1, 200)
+        self.http_conn_spin.setToolTip("Maximum open connections per translation service")
+        self.http_conn_spin.setValue(int(self.settings.value("http_max_connections", http_pool.settings["max_connections"])))
+        form_layout.addRow("API Connections:", self.http_conn_spin)
+
+        self.download_conn_spin = QSpinBox()
+        self.download_conn_spin.setRange(1, 16)
+        self.download_conn_spin.setToolTip("Parallel connections per model download (servers without Range support use one)")
+        self.download_conn_spin.setValue(int(self.settings.value("download_connections", DEFAULT_DOWNLOAD_CONNECTIONS)))
+        form_layout.addRow("Download Connections:", self.download_conn_spin)
+
+        # Scheduler: how many heavy jobs of each kind run at once across all pages
+        self.slot_spins = {}
+        for resource, label, tip in (
+            ("cpu", "Transcription Jobs:", "Whisper jobs running at once; more wait in line (a parallel transcription takes one per process)"),
+            ("encoder", "Burn Jobs:", "ffmpeg burns running at once"),
+            ("network", "Network Jobs:", "Translations and model downloads running at once"),
+        ):
+            spin = QSpinBox()
+            spin.setRange(1, 64)
+            spin.setToolTip(tip)
+            spin.setValue(int(self.settings.value(f"scheduler_{resource}_slots", DEFAULT_SLOTS[resource])))
+            self.slot_spins[resource] = spin
+            form_layout.addRow(label, spin)
+
+        self.job_memory_spin = QSpinBox()
+        self.job_memory_spin.setRange(0, 1048576)
+        self.job_memory_spin.setSingleStep(1024)
+        self.job_memory_spin.setSuffix(" MB")
+        self.job_memory_spin.setSpecialValueText("No limit")
+        self.job_memory_spin.setToolTip("Jobs wait while the RAM they need (Whisper model, encoder) would exceed this")
+        self.job_memory_spin.setValue(int(self.settings.value("scheduler_memory_mb", default_memory_budget_mb())))
+        form_layout.addRow("Job Memory Budget:", self.job_memory_spin)
+
         layout.addLayout(form_layout)
 
         save_btn = QPushButton("Apply & Save")
@@ -52,6 +142,16 @@ class SettingsPage(QWidget):
         
         self.settings.setValue("app_theme", theme)
         self.settings.setValue("app_font_size", font_size)
+        self.settings.setValue("model_cache_budget_mb", self.model_budget_spin.value())
+        self.settings.setValue("audio_cache_budget_mb", self.audio_budget_spin.value())
+        self.settings.setValue("tm_max_entries", self.tm_size_spin.value())
+        self.settings.setValue("http_timeout", self.http_timeout_spin.value())
+        self.settings.setValue("http_max_connections", self.http_conn_spin.value())
+        self.settings.setValue("download_connections", self.download_conn_spin.value())
+        for resource, spin in self.slot_spins.items():
+            self.settings.setValue(f"scheduler_{resource}_slots", spin.value())
+        self.settings.setValue("scheduler_memory_mb", self.job_memory_spin.value())
+        apply_runtime_settings(self.settings)
         
         self.style_changed.emit()
         QMessageBox.information(self, "Settings Saved", "Application appearance updated.")
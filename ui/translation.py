@@ -1,13 +1,14 @@
 import os
-import re
-import time
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, 
     QPushButton, QFileDialog, QTextEdit, QProgressBar, 
-    QMessageBox, QGroupBox, QLineEdit, QSplitter, QFormLayout
+    QMessageBox, QGroupBox, QLineEdit, QSplitter, QFormLayout, QCheckBox
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSettings
-from openai import OpenAI
+from core.translate import SubtitleTranslator, DEFAULT_CONCURRENCY, DEFAULT_MAX_BATCH_SIZE
+from core.translation_memory import TranslationMemory, DEFAULT_MAX_ENTRIES
+from core.http_pool import get_client
+from core.scheduler import SCHEDULER
 
 class TranslationWorker(QThread):
     progress = pyqtSignal(int)
@@ -15,121 +16,30 @@ class TranslationWorker(QThread):
     finished = pyqtSignal(str) # Emits the full translated content
     error = pyqtSignal(str)
 
-    def __init__(self, api_key, file_path, target_lang, model="gpt-3.5-turbo", base_url=None):
+    def __init__(self, api_key, file_path, target_lang, model="gpt-3.5-turbo", base_url=None,
+                 concurrency=DEFAULT_CONCURRENCY, requests_per_minute=None, memory=None,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE):
         super().__init__()
-        self.api_key = api_key
         self.file_path = file_path
-        self.target_lang = target_lang
-        self.model = model
-        self.base_url = base_url
-        self.is_running = True
+        self.translator = SubtitleTranslator(
+            api_key, target_lang, model=model, base_url=base_url,
+            log=self.log.emit, progress=self.progress.emit,
+            concurrency=concurrency, requests_per_minute=requests_per_minute,
+            memory=memory, max_batch_size=max_batch_size
+        )
 
     def run(self):
         try:
-            self.log.emit("Starting translation...")
-            
-            if not self.api_key:
-                raise ValueError("API Key is missing.")
-
-            # Configure Client
-            client_args = {"api_key": self.api_key}
-            if self.base_url and self.base_url.strip():
-                client_args["base_url"] = self.base_url.strip()
-                
-            client = OpenAI(**client_args)
-            
-            # Read file
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            lease = SCHEDULER.acquire("network", owner="translation", log=self.log.emit,
+                                      should_continue=lambda: self.translator.is_running)
+            if lease is None:
+                self.log.emit("Translation stopped by user.")
+                return
+            with lease:
+                self.log.emit("Starting translation...")
+                full_translated_srt = self.translator.translate_file(self.file_path)
 
-            blocks = re.split(r'\n\s*\n', content.strip())
-            
-            translated_blocks = []
-            total_blocks = len(blocks)
-            
-            batch_size = 10 
-            current_batch = []
-            current_batch_indices = []
-            
-            for i, block in enumerate(blocks):
-                if not self.is_running: break
-                
-                lines = block.strip().split('\n')
-                if len(lines) >= 3:
-                    text_lines = " ".join(lines[2:])
-                    current_batch.append(text_lines)
-                    current_batch_indices.append(i)
-                else:
-                    translated_blocks.append(block)
-                    continue
-
-                if len(current_batch) >= batch_size or i == total_blocks - 1:
-                    # Translate batch
-                    self.log.emit(f"Translating batch {i - len(current_batch) + 2} to {i + 1}...")
-                    
-                    combined_text = "\n---\n".join(current_batch)
-                    system_msg = f"You are a professional subtitle translator. Translate the following subtitle segments to {self.target_lang}. The segments are separated by '---'. Output ONLY the translated segments separated by '---'. Do not include original text, line numbers, or timestamps in your output, just the translated text."
-                    
-                    max_retries = 3
-                    success = False
-                    
-                    for attempt in range(max_retries):
-                        if not self.is_running: break
-                        
-                        try:
-                            response = client.chat.completions.create(
-                                model=self.model,
-                                messages=[
-                                    {"role": "system", "content": system_msg},
-                                    {"role": "user", "content": combined_text}
-                                ],
-                                temperature=0.3
-                            )
-                            translated_text_combined = response.choices[0].message.content.strip()
-                            translations = translated_text_combined.split('---')
-                            
-                            len_diff = len(current_batch) - len(translations)
-                            if len_diff > 0:
-                                 translations.extend(["[Error: Translation missing]"] * len_diff)
-                            
-                            for idx, trans_text in enumerate(translations[:len(current_batch)]):
-                                original_idx_in_blocks = current_batch_indices[idx]
-                                original_block_lines = blocks[original_idx_in_blocks].strip().split('\n')
-                                new_block = f"{original_block_lines[0]}\n{original_block_lines[1]}\n{trans_text.strip()}"
-                                translated_blocks.append(new_block)
-                            
-                            success = True
-                            break # Success, exit retry loop
-
-                        except Exception as e:
-                            err_str = str(e)
-                            
-                            # Check for fatal errors causing immediate stop (No Retry)
-                            if "insufficient_quota" in err_str:
-                                 raise Exception("Quota exceeded (429). Please check your API billing.")
-                            if "401" in err_str:
-                                 raise Exception("Authentication failed (401). Check your API Key.")
-                            
-                            self.log.emit(f"Batch failed (Attempt {attempt+1}/{max_retries}): {err_str}")
-                            
-                            # Wait before retrying (backoff: 2s, 4s, etc or just fixed 2s)
-                            if attempt < max_retries - 1:
-                                time.sleep(2)
-                    
-                    if not success:
-                        self.log.emit("Skipping batch after max retries.")
-                        # Fallback for non-fatal errors after retries exhausted
-                        for idx_in_batch in current_batch_indices:
-                             translated_blocks.append(blocks[idx_in_batch])
-
-                    current_batch = []
-                    current_batch_indices = []
-                    
-                    progress_pct = int((i + 1) / total_blocks * 100)
-                    self.progress.emit(progress_pct)
-
-            if self.is_running:
-                full_translated_srt = "\n\n".join(translated_blocks)
+            if full_translated_srt is not None:
                 self.finished.emit(full_translated_srt)
                 self.log.emit("Translation completed.")
             else:
@@ -139,13 +49,14 @@ class TranslationWorker(QThread):
             self.error.emit(str(e))
 
     def stop(self):
-        self.is_running = False
+        self.translator.stop()
 
 class TranslationPage(QWidget):
     def __init__(self):
         super().__init__()
         self.settings = QSettings("MacWhisper", "Config")
         self.translated_content = None
+        self.finished_translator = None
         self.init_ui()
 
     def init_ui(self):
@@ -190,6 +101,21 @@ class TranslationPage(QWidget):
         ])
         self.lang_combo.setEditable(True)
         control_layout.addRow("Target Language:", self.lang_combo)
+
+        # Translation Memory
+        tm_layout = QHBoxLayout()
+        self.tm_check = QCheckBox("Reuse previous translations")
+        self.tm_check.setChecked(self.settings.value("tm_enabled", "true") == "true")
+        self.tm_check.toggled.connect(lambda on: self.settings.setValue("tm_enabled", "true" if on else "false"))
+        tm_import_btn = QPushButton("Import...")
+        tm_import_btn.clicked.connect(self.import_memory)
+        tm_export_btn = QPushButton("Export...")
+        tm_export_btn.clicked.connect(self.export_memory)
+        tm_layout.addWidget(self.tm_check)
+        tm_layout.addStretch()
+        tm_layout.addWidget(tm_import_btn)
+        tm_layout.addWidget(tm_export_btn)
+        control_layout.addRow("Translation Memory:", tm_layout)
         
         control_group.setLayout(control_layout)
         layout.addWidget(control_group)
@@ -312,6 +238,10 @@ class TranslationPage(QWidget):
         if self.model_combo.count() > 0:
             self.model_combo.setCurrentIndex(0)
 
+        # Open the connection now so the first batch doesn't pay for DNS/TLS
+        if config.get("api_key"):
+            get_client(config["api_key"], self.resolve_base_url(service_key, config) or None).prewarm()
+
     def showEvent(self, event):
         # Refresh providers whenever tab is shown to catch updates
         self.refresh_providers()
@@ -325,53 +255,103 @@ class TranslationPage(QWidget):
             self.translate_btn.setEnabled(True)
             self.log_output.append(f"Selected file: {file_name}")
 
-    def start_translation(self):
-        # Get selected Data
+    def translator_config(self):
+        """SubtitleTranslator keyword arguments for the selected service; raises ValueError when unusable."""
         item_data = self.provider_combo.currentData()
-        
         if not item_data or not isinstance(item_data, dict):
-            QMessageBox.warning(self, "Configuration Error", "Please select a valid, configured service provider.")
-            return
+            raise ValueError("Please select a valid, configured service provider.")
 
         service_key = item_data.get("key")
         config = item_data.get("config", {})
-        
         api_key = config.get("api_key", "")
-        target_lang = self.lang_combo.currentText()
-        
-        # Get Model from COMBO BOX, not just config
-        model_name = self.model_combo.currentText().strip()
-        
-        # Base URL still from config
-        base_url = config.get("base_url", "").strip()
-        
-        # DeepSeek specific default URL if missing
-        if service_key == "deepseek" and not base_url:
-            base_url = "https://api.deepseek.com"
-        
         if not api_key:
-             QMessageBox.warning(self, "Configuration Error", f"The selected service '{self.provider_combo.currentText()}' is missing an API Key.")
-             return
+            raise ValueError(f"The selected service '{self.provider_combo.currentText()}' is missing an API Key.")
+
+        return {
+            "api_key": api_key,
+            "target_lang": self.lang_combo.currentText(),
+            # Get Model from COMBO BOX, not just config
+            "model": self.model_combo.currentText().strip(),
+            # Base URL still from config
+            "base_url": self.resolve_base_url(service_key, config),
+            "concurrency": self.config_int(config, "concurrency", DEFAULT_CONCURRENCY),
+            "requests_per_minute": self.config_int(config, "rpm", 0) or None,
+            "max_batch_size": self.config_int(config, "batch_size", DEFAULT_MAX_BATCH_SIZE),
+            "memory": self.open_memory() if self.tm_check.isChecked() else None,
+        }
+
+    def start_translation(self):
+        try:
+            config = self.translator_config()
+        except ValueError as e:
+            QMessageBox.warning(self, "Configuration Error", str(e))
+            return
 
         self.translate_btn.setEnabled(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
         self.log_output.clear()
         
-        self.log_output.append(f"Using Service: {service_key}")
-        self.log_output.append(f"Model: {model_name}")
-        self.log_output.append(f"Base URL: {base_url if base_url else 'Default'}")
+        self.log_output.append(f"Using Service: {self.provider_combo.currentData().get('key')}")
+        self.log_output.append(f"Model: {config['model']}")
+        self.log_output.append(f"Base URL: {config['base_url'] if config['base_url'] else 'Default'}")
+        rpm = config['requests_per_minute']
+        self.log_output.append(f"Parallel Requests: {config['concurrency']}" + (f", Rate Limit: {rpm}/min" if rpm else ""))
+        self.log_output.append(f"Max Batch Size: {config['max_batch_size']}")
         self.log_output.append("-" * 30)
-        
-        self.worker = TranslationWorker(api_key, self.file_path, target_lang, model=model_name, base_url=base_url)
+
+        self.worker = TranslationWorker(file_path=self.file_path, **config)
         self.worker.log.connect(self.log_output.append)
         self.worker.progress.connect(self.progress_bar.setValue)
         self.worker.finished.connect(self.handle_finished)
         self.worker.error.connect(self.handle_error)
         self.worker.start()
 
+    @staticmethod
+    def resolve_base_url(service_key, config):
+        base_url = config.get("base_url", "").strip()
+        # DeepSeek specific default URL if missing
+        if service_key == "deepseek" and not base_url:
+            base_url = "https://api.deepseek.com"
+        return base_url
+
+    def open_memory(self):
+        max_entries = int(self.settings.value("tm_max_entries", DEFAULT_MAX_ENTRIES))
+        if getattr(self, 'memory', None) is None:
+            self.memory = TranslationMemory(max_entries=max_entries)
+        self.memory.max_entries = max_entries
+        return self.memory
+
+    def import_memory(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Import Translation Memory", "", "JSON Lines (*.jsonl);;All Files (*)")
+        if file_name:
+            try:
+                count = self.open_memory().import_jsonl(file_name)
+                self.log_output.append(f"Imported {count} translation memory entries from: {file_name}")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Could not import translation memory: {e}")
+
+    def export_memory(self):
+        file_name, _ = QFileDialog.getSaveFileName(self, "Export Translation Memory", "translation_memory.jsonl", "JSON Lines (*.jsonl)")
+        if file_name:
+            try:
+                count = self.open_memory().export_jsonl(file_name)
+                self.log_output.append(f"Exported {count} translation memory entries to: {file_name}")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Could not export translation memory: {e}")
+
+    @staticmethod
+    def config_int(config, key, default):
+        # Service configs are stored as the raw text typed on the API Keys page
+        try:
+            return max(0, int(str(config.get(key, "")).strip()))
+        except ValueError:
+            return default
+
     def handle_finished(self, content):
         self.translated_content = content
+        # Its checkpoint is kept until the result is saved
+        self.finished_translator = self.worker.translator
         self.translate_btn.setEnabled(True)
         self.progress_bar.setVisible(False)
         self.save_btn.setEnabled(True)
@@ -397,6 +377,8 @@ class TranslationPage(QWidget):
                 with open(file_name, 'w', encoding='utf-8') as f:
                     f.write(self.translated_content)
                 self.log_output.append(f"Saved to: {file_name}")
+                if self.finished_translator is not None:
+                    self.finished_translator.discard_checkpoint()
                 QMessageBox.information(self, "Saved", "File saved successfully.")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Could not save file: {e}")
@@ -1,7 +1,13 @@
 import os
-import whisper
-import requests # Added
-from PyQt6.QtCore import QThread, pyqtSignal
+import time
+from PyQt6.QtCore import QThread, QSettings, pyqtSignal
+from core.model_cache import MODEL_CACHE, DEFAULT_BUDGET_MB
+from core.audio_cache import AUDIO_CACHE, DEFAULT_BUDGET_MB as DEFAULT_AUDIO_BUDGET_MB
+from core.media import probe_duration, has_audio_stream
+from core.subtitles import write_srt, write_txt, partial_srt_path, SrtAppender
+from core.transcribe import transcribe_file, transcribe_audio, transcription_memory_mb, streams_segments
+from core.scheduler import SCHEDULER, PRIORITY_BATCH, PRIORITY_NORMAL
+from core.download import ModelDownloader, DEFAULT_CONNECTIONS as DEFAULT_DOWNLOAD_CONNECTIONS
 
 WHISPER_CACHE_DIR = os.path.expanduser("~/.cache/whisper")
 
@@ -9,66 +15,209 @@ class Worker(QThread):
     finished = pyqtSignal(object)
     error = pyqtSignal(str)
     log = pyqtSignal(str)
+    # Transcription: each segment as soon as it is decoded, in order
+    segment = pyqtSignal(object)
+    # Custom downloads: percent (-1 = unknown), {downloaded, total, speed, eta}
+    progress = pyqtSignal(int, dict)
+    # Batch transcription: (index into file_paths, ...)
+    file_duration = pyqtSignal(int, float)
+    file_status = pyqtSignal(int, str)
+    file_done = pyqtSignal(int, object)
 
-    def __init__(self, task_type, model_name, file_path=None, download_url=None):
+    def __init__(self, task_type, model_name, file_path=None, download_url=None, file_paths=None, options=None):
         super().__init__()
-        self.task_type = task_type # 'download', 'transcribe', or 'download_custom'
+        self.task_type = task_type # 'download', 'transcribe', 'transcribe_batch' or 'download_custom'
         self.model_name = model_name
         self.file_path = file_path
         self.download_url = download_url
+        self.file_paths = file_paths or []
+        self.options = options or {} # Transcription options, see core.transcribe.transcribe_audio
+        self.is_running = True
+        self.downloader = None
+
+    def stop(self):
+        # Batch jobs stop after the file currently being transcribed
+        self.is_running = False
+        if self.downloader is not None:
+            self.downloader.stop()
 
     def run(self):
         try:
+            settings = QSettings("MacWhisper", "Config")
+            MODEL_CACHE.set_budget(int(settings.value("model_cache_budget_mb", DEFAULT_BUDGET_MB)))
+            AUDIO_CACHE.set_budget(int(settings.value("audio_cache_budget_mb", DEFAULT_AUDIO_BUDGET_MB)))
+
             if self.task_type == 'download':
                 self.log.emit(f"Downloading standard model '{self.model_name}'...")
-                # This triggers the standard whisper download
-                whisper.load_model(self.model_name)
+                with self.acquire("network", owner="models"):
+                    # This triggers the standard whisper download and keeps the weights warm
+                    MODEL_CACHE.get(self.model_name, log=self.log.emit)
                 self.log.emit(f"Model '{self.model_name}' is ready.")
                 self.finished.emit(None)
 
             elif self.task_type == 'download_custom':
-                if not self.download_url:
-                    raise ValueError("No URL provided for custom download.")
-                
-                self.log.emit(f"Connecting to {self.download_url}...")
-                
-                if not os.path.exists(WHISPER_CACHE_DIR):
-                    os.makedirs(WHISPER_CACHE_DIR)
-                
-                target_path = os.path.join(WHISPER_CACHE_DIR, self.model_name)
-                
-                response = requests.get(self.download_url, stream=True)
-                response.raise_for_status()
-                
-                total_size = int(response.headers.get('content-length', 0))
-                downloaded_size = 0
-                
-                with open(target_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded_size += len(chunk)
-                            # Log progress periodically (e.g. every 5MB to avoid spam)
-                            if total_size > 0:
-                                percent = int((downloaded_size / total_size) * 100)
-                                if percent % 10 == 0 and percent > 0:
-                                     # Simple dedup logic or just emit - UI log usually appends
-                                     pass 
-                
-                self.log.emit(f"Custom model '{self.model_name}' downloaded successfully ({downloaded_size/1024/1024:.1f} MB).")
-                self.finished.emit(None)
+                with self.acquire("network", owner="models"):
+                    done = self.download_custom()
+                if done:
+                    self.finished.emit(None)
+                else:
+                    self.error.emit("Download stopped; it will resume from where it left off.")
             
             elif self.task_type == 'transcribe':
-                self.log.emit(f"Loading model '{self.model_name}'...")
-                model = whisper.load_model(self.model_name)
-                
                 if not self.file_path:
                     raise ValueError("No file path provided for transcription.")
-                
-                self.log.emit(f"Starting transcription for: {os.path.basename(self.file_path)}")
-                result = model.transcribe(self.file_path)
-                self.log.emit("Transcription complete.")
+                partial = self.open_partial(self.file_path)
+                try:
+                    with self.acquire_transcription(PRIORITY_NORMAL):
+                        result = transcribe_file(self.file_path, self.model_name, log=self.log.emit,
+                                                 options=self.options, on_segment=self.segment_sink(partial))
+                except Exception:
+                    self.keep_partial(partial)
+                    raise
+                if partial is not None:
+                    partial.discard()  # The full result goes to the page
                 self.finished.emit(result)
 
+            elif self.task_type == 'transcribe_batch':
+                self.run_batch()
+
         except Exception as e:
             self.error.emit(str(e))
+
+    def download_custom(self):
+        if not self.download_url:
+            raise ValueError("No URL provided for custom download.")
+
+        # Written to <name>.part and renamed once complete (and verified, for URLs that carry the SHA-256)
+        target_path = os.path.join(WHISPER_CACHE_DIR, self.model_name)
+        settings = QSettings("MacWhisper", "Config")
+        self.downloader = ModelDownloader(
+            self.download_url, target_path,
+            connections=int(settings.value("download_connections", DEFAULT_DOWNLOAD_CONNECTIONS)),
+            log=self.log.emit, progress=lambda pct, **stats: self.progress.emit(pct, stats)
+        )
+        if not self.is_running or self.downloader.run() is None:
+            return False  # Stopped; the .part file is kept
+
+        size_mb = os.path.getsize(target_path) / 1024 / 1024
+        self.log.emit(f"Custom model '{self.model_name}' downloaded successfully ({size_mb:.1f} MB).")
+        return True
+
+    def acquire(self, resource, owner="extraction", priority=PRIORITY_NORMAL, **kwargs):
+        # Waits (logging why) until core.scheduler lets this job start
+        return SCHEDULER.acquire(resource, owner=owner, priority=priority, log=self.log.emit, **kwargs)
+
+    def acquire_transcription(self, priority, should_continue=None):
+        return self.acquire("cpu", priority=priority, count=self.options.get('parallel') or 1,
+                            memory_mb=transcription_memory_mb(self.model_name, self.options),
+                            should_continue=should_continue)
+
+    def run_batch(self):
+        # Probe everything first so the page can show an ETA for the whole queue
+        for i, path in enumerate(self.file_paths):
+            self.file_duration.emit(i, probe_duration(path))
+
+        if self.options.get('parallel'):
+            # One pool for the whole queue, so each process loads the model once
+            from core.parallel import ParallelTranscriber
+            model = None
+            parallel = ParallelTranscriber(self.model_name, self.options['parallel'], log=self.log.emit)
+        else:
+            model = None  # Loaded once the scheduler admits the first file
+            parallel = None
+
+        try:
+            self.transcribe_queue(model, parallel)
+        finally:
+            if parallel is not None:
+                parallel.close()
+
+        self.finished.emit(None)
+
+    def transcribe_queue(self, model, parallel):
+        for i, path in enumerate(self.file_paths):
+            if not self.is_running:
+                self.log.emit("Batch stopped by user.")
+                break
+
+            # Between files other pages' jobs get their turn (fair queuing in core.scheduler)
+            lease = self.acquire_transcription(PRIORITY_BATCH, should_continue=lambda: self.is_running)
+            if lease is None:
+                self.log.emit("Batch stopped by user.")
+                break
+
+            with lease:
+                name = os.path.basename(path)
+                try:
+                    if not os.path.exists(path):
+                        raise FileNotFoundError(f"File not found: {path}")
+                    if not has_audio_stream(path):
+                        raise ValueError("No audio stream")
+                    if parallel is None and model is None:
+                        self.log.emit(f"Loading model '{self.model_name}'...")
+                        model = MODEL_CACHE.get(self.model_name, log=self.log.emit)
+
+                    self.file_status.emit(i, "Transcribing")
+                    self.log.emit(f"[{i + 1}/{len(self.file_paths)}] Transcribing: {name}")
+                    start = time.time()
+                    partial = self.open_partial(path)
+                    try:
+                        if parallel is not None:
+                            with AUDIO_CACHE.lease(path, log=self.log.emit) as pcm_path:
+                                result = parallel.transcribe(pcm_path, self.options,
+                                                             on_segment=self.segment_sink(partial))
+                        else:
+                            result = transcribe_audio(model, AUDIO_CACHE.load(path, log=self.log.emit), self.options,
+                                                      self.log.emit, on_segment=self.segment_sink(partial))
+                    except Exception:
+                        self.keep_partial(partial)
+                        raise
+                    elapsed = time.time() - start
+
+                    base = os.path.splitext(path)[0]
+                    write_srt(result['segments'], base + ".srt")
+                    write_txt(result['text'], base + ".txt")
+                    if partial is not None:
+                        partial.discard()
+
+                    audio_seconds = result['segments'][-1]['end'] if result['segments'] else 0.0
+                    self.log.emit(f"Saved: {base}.srt / .txt ({elapsed:.1f}s)")
+                    if parallel is None:
+                        self.log.emit(MODEL_CACHE.stats_line())
+                    self.file_done.emit(i, {"elapsed": elapsed, "audio_seconds": audio_seconds})
+
+                except Exception as e:
+                    self.log.emit(f"Error in {name}: {e}")
+                    self.file_status.emit(i, f"Error: {e}")
+
+    def open_partial(self, path):
+        # Segments go to <name>.partial.srt next to the input as they arrive; None when
+        # the options transcribe the file in one go
+        if not streams_segments(self.options):
+            return None
+        partial_path = partial_srt_path(os.path.splitext(path)[0])
+        try:
+            return SrtAppender(partial_path)
+        except OSError as e:
+            # A read-only folder: segments still stream to the UI, they just aren't kept on disk
+            self.log.emit(f"Can't write {partial_path} ({e}); segments won't be saved as they arrive.")
+            return None
+
+    def segment_sink(self, partial):
+        if not streams_segments(self.options):
+            return None
+
+        def on_segment(segment):
+            if partial is not None:
+                partial.append(segment)
+            self.segment.emit(segment)
+        return on_segment
+
+    def keep_partial(self, partial):
+        if partial is None:
+            return
+        partial.close()
+        if partial.count:
+            self.log.emit(f"Kept {partial.count} segments transcribed so far in {partial.path}")
+        else:
+            partial.discard()